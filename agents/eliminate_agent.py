@@ -1,6 +1,10 @@
 from typing import List
-from models.schemas import UserInput, ScamperResult, ScamperTechnique
+from models.schemas import UserInput, ScamperResult, ScamperTechnique, ResultStatus
 from utils.gemini_client import gemini_client
+from utils.errors import error_kind
+from utils.log import get_logger
+
+logger = get_logger("agents.eliminate")
 
 class EliminateAgent:
     """Agente especializado en la técnica SCAMPER de ELIMINAR"""
@@ -20,7 +24,7 @@ class EliminateAgent:
         Returns:
             Resultado con ideas de eliminación
         """
-        print(f"✂️ {self.name}: Identificando elementos para eliminar...")
+        logger.debug("✂️ %s: Identificando elementos para eliminar...", self.name)
         
         try:
             # Generar ideas específicas de eliminación
@@ -39,15 +43,18 @@ class EliminateAgent:
                 explanation=explanation
             )
             
-            print(f"✅ {self.name}: {len(ideas)} ideas de eliminación generadas")
+            logger.debug("✅ %s: %d ideas de eliminación generadas", self.name, len(ideas))
             return result
             
         except Exception as e:
-            print(f"❌ {self.name}: Error generando ideas - {e}")
+            logger.warning("❌ %s: Error generando ideas - %s", self.name, e)
             return ScamperResult(
                 technique=self.technique,
-                ideas=[f"Error en agente de eliminación: {str(e)}"],
-                explanation="No se pudieron generar ideas de eliminación debido a un error técnico."
+                ideas=[],
+                explanation="No se pudieron generar ideas de eliminación debido a un error técnico.",
+                status=ResultStatus.ERROR,
+                error_type=error_kind(e),
+                error=f"Error en agente de eliminación: {str(e)}"
             )
     
     def _create_explanation(self, problem: str) -> str:
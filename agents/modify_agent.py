@@ -1,6 +1,10 @@
 from typing import List
-from models.schemas import UserInput, ScamperResult, ScamperTechnique
+from models.schemas import UserInput, ScamperResult, ScamperTechnique, ResultStatus
 from utils.gemini_client import gemini_client
+from utils.errors import error_kind
+from utils.log import get_logger
+
+logger = get_logger("agents.modify")
 
 class ModifyAgent:
     """Agente especializado en la técnica SCAMPER de MODIFICAR/MAGNIFICAR"""
@@ -20,7 +24,7 @@ class ModifyAgent:
         Returns:
             Resultado con ideas de modificación
         """
-        print(f"🔧 {self.name}: Explorando modificaciones y amplificaciones...")
+        logger.debug("🔧 %s: Explorando modificaciones y amplificaciones...", self.name)
         
         try:
             # Generar ideas específicas de modificación
@@ -39,15 +43,18 @@ class ModifyAgent:
                 explanation=explanation
             )
             
-            print(f"✅ {self.name}: {len(ideas)} ideas de modificación generadas")
+            logger.debug("✅ %s: %d ideas de modificación generadas", self.name, len(ideas))
             return result
             
         except Exception as e:
-            print(f"❌ {self.name}: Error generando ideas - {e}")
+            logger.warning("❌ %s: Error generando ideas - %s", self.name, e)
             return ScamperResult(
                 technique=self.technique,
-                ideas=[f"Error en agente de modificación: {str(e)}"],
-                explanation="No se pudieron generar ideas de modificación debido a un error técnico."
+                ideas=[],
+                explanation="No se pudieron generar ideas de modificación debido a un error técnico.",
+                status=ResultStatus.ERROR,
+                error_type=error_kind(e),
+                error=f"Error en agente de modificación: {str(e)}"
             )
     
     def _create_explanation(self, problem: str) -> str:
@@ -1,9 +1,17 @@
 import asyncio
-from typing import List, Dict
-from models.schemas import UserInput, ScamperResponse, ScamperResult, ScamperTechnique
+import time
+from typing import List, Dict, Optional, Tuple, AsyncIterator
+from models.schemas import UserInput, ScamperResponse, ScamperResult, ScamperTechnique, ResultStatus
 from utils.gemini_client import gemini_client
+from utils.errors import LLMCircuitOpenError, error_kind
+from utils.metrics import AGENT_LATENCY, ANALYSES_IN_FLIGHT, STALE_RESULTS, SUMMARY_LATENCY, TECHNIQUE_ERRORS
+from utils.log import get_logger
+from utils.semantic_cache import semantic_cache
+from utils.tracing import tracer
 from config.settings import settings
 
+logger = get_logger("orchestrator")
+
 # Importar todos los agentes especializados
 from .substitute_agent import substitute_agent
 from .combine_agent import combine_agent
@@ -28,107 +36,389 @@ class OrchestratorAgent:
             ScamperTechnique.REVERSE: reverse_agent
         }
     
-    async def process_user_input(self, user_input: UserInput) -> ScamperResponse:
+    async def process_user_input(self, user_input: UserInput, time_budget: Optional[float] = None) -> ScamperResponse:
         """
         Procesa la entrada del usuario coordinando todos los agentes SCAMPER especializados
         
         Args:
             user_input: Entrada del usuario con problema y contexto
+            time_budget: Segundos disponibles para responder (opcional). Al agotarse se
+                retornan los resultados completos y el resto queda marcado como TIMEOUT
             
         Returns:
-            Respuesta completa con todas las ideas SCAMPER
+            Respuesta con las ideas SCAMPER (partial=True si alguna técnica no llegó a tiempo)
         """
-        print(f"🎯 {self.name}: Iniciando análisis multi-agente...")
-        print(f"   Problema: {user_input.problem}")
-        print(f"   Agentes disponibles: {len(self.specialized_agents)}")
+        # Continúa la traza de quien llama (petición web, fila del lote) o abre una nueva
+        with ANALYSES_IN_FLIGHT.track_inprogress(mode="full"), \
+                tracer.trace("orchestrator.process_user_input", mode=self._get_execution_mode(),
+                             time_budget=time_budget) as span:
+            # Un problema ya respondido (aunque esté redactado de otra forma) no llama al modelo
+            cached = self._lookup_similar_response(user_input)
+            if cached is not None:
+                span.set_attribute("semantic_cache", "hit")
+                return cached
+            response = await self._process_user_input(user_input, time_budget)
+            span.set_attribute("partial", response.partial)
+            self._remember_response(user_input, response)
+            return response
+    
+    def _semantic_cache_enabled(self) -> bool:
+        return settings.ENABLE_CACHE and settings.ENABLE_SEMANTIC_CACHE
+    
+    def _lookup_similar_response(self, user_input: UserInput) -> Optional[ScamperResponse]:
+        """Respuesta guardada de un problema parecido, con el problema de esta petición (None si no hay)"""
+        if not self._semantic_cache_enabled():
+            return None
+        with tracer.span("cache.semantic_lookup") as span:
+            match = semantic_cache.get(user_input)
+            span.set_attribute("hit", match is not None)
+            if match is None:
+                return None
+            response, score = match
+            span.set_attribute("similarity", score)
+        logger.info("♻️ %s: Respuesta reutilizada de un problema similar (similitud %.2f)", self.name, score,
+                    extra={"similarity": score})
+        return response.model_copy(update={"original_problem": user_input.problem})
+    
+    def _remember_response(self, user_input: UserInput, response: ScamperResponse):
+        if self._semantic_cache_enabled():
+            semantic_cache.set(user_input, response)
+    
+    async def _process_user_input(self, user_input: UserInput, time_budget: Optional[float]) -> ScamperResponse:
+        logger.debug("🎯 %s: Iniciando análisis multi-agente con %d agentes. Problema: %s",
+                     self.name, len(self.specialized_agents), user_input.problem)
+        
+        start = time.perf_counter()
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
         
         # Ejecutar todos los agentes especializados
-        if settings.ENABLE_PARALLEL_EXECUTION:
-            results = await self._coordinate_parallel_agents(user_input)
+        summary = None
+        if settings.ENABLE_COMBINED_GENERATION:
+            results, summary = await self._coordinate_combined_generation(user_input, deadline)
+        elif settings.ENABLE_PARALLEL_EXECUTION:
+            results = await self._coordinate_parallel_agents(user_input, deadline=deadline)
         else:
-            results = await self._coordinate_sequential_agents(user_input)
+            results = await self._coordinate_sequential_agents(user_input, deadline=deadline)
         
-        # Generar resumen ejecutivo
-        summary = await self._generate_executive_summary(user_input.problem, results)
+        # Generar resumen ejecutivo (salvo que ya venga en la respuesta combinada)
+        if not summary:
+            remaining = self._remaining(deadline)
+            if remaining is not None and remaining < settings.SUMMARY_MIN_TIME_BUDGET:
+                # Sin tiempo para otra llamada al modelo se usa el resumen local
+                logger.info("⏱️ Plazo casi agotado, resumen sin llamada al modelo")
+                with SUMMARY_LATENCY.time(source="fallback"), tracer.span("orchestrator.summary", source="fallback"):
+                    summary = self._create_fallback_summary(user_input.problem, results)
+            else:
+                summary = await self._generate_executive_summary(user_input.problem, results, timeout=remaining)
         
         # Crear respuesta completa
-        response = ScamperResponse(
-            original_problem=user_input.problem,
-            results=results,
-            summary=summary
-        )
+        with tracer.span("orchestrator.validate"):
+            response = ScamperResponse(
+                original_problem=user_input.problem,
+                results=results,
+                summary=summary,
+                partial=any(result.status == ResultStatus.TIMEOUT for result in results)
+            )
         
-        print(f"✅ {self.name}: Análisis multi-agente completado.")
-        print(f"   Resultados obtenidos: {len(results)} técnicas")
+        logger.info(
+            "✅ %s: Análisis multi-agente completado (%d técnicas)", self.name, len(results),
+            extra={
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "techniques_ok": sum(result.status == ResultStatus.OK for result in results),
+                "partial": response.partial,
+            }
+        )
         return response
     
-    async def _coordinate_parallel_agents(self, user_input: UserInput) -> List[ScamperResult]:
-        """Coordina todos los agentes especializados en paralelo"""
-        print(f"🚀 {self.name}: Coordinando agentes en paralelo...")
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        """Segundos que quedan hasta el plazo (None si no hay plazo)"""
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+    
+    async def _coordinate_combined_generation(self, user_input: UserInput, deadline: Optional[float] = None) -> Tuple[List[ScamperResult], Optional[str]]:
+        """Genera todas las técnicas con una sola llamada y usa los agentes como respaldo"""
+        logger.debug("📦 %s: Generando %d técnicas en una sola llamada...", self.name, len(self.specialized_agents))
         
-        # Crear tareas para todos los agentes especializados
-        tasks = []
+        with tracer.span("orchestrator.combined_generation") as span:
+            try:
+                ideas_by_technique, summary = await asyncio.wait_for(
+                    gemini_client.generate_all_scamper_ideas(
+                        problem=user_input.problem,
+                        context=user_input.context
+                    ),
+                    timeout=self._remaining(deadline)
+                )
+            except asyncio.TimeoutError:
+                logger.info("⏱️ La llamada combinada no terminó dentro del plazo")
+                ideas_by_technique, summary = {}, None
+            span.set_attribute("techniques", len(ideas_by_technique))
+        
+        results = {}
+        missing_techniques = []
         for technique, agent in self.specialized_agents.items():
-            print(f"   📋 Asignando tarea a {agent.name}")
-            task = agent.generate_ideas(user_input)
-            tasks.append(task)
-        
-        # Ejecutar todas las tareas en paralelo
-        print(f"   ⚡ Ejecutando {len(tasks)} agentes simultáneamente...")
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Procesar resultados y manejar excepciones
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                technique = list(self.specialized_agents.keys())[i]
-                agent_name = list(self.specialized_agents.values())[i].name
-                print(f"   ❌ {agent_name}: Falló con error - {result}")
-                # Crear resultado de error
-                error_result = ScamperResult(
+            ideas = ideas_by_technique.get(technique.value)
+            if ideas:
+                results[technique] = ScamperResult(
                     technique=technique,
-                    ideas=[f"Error en {agent_name}: {str(result)}"],
-                    explanation=f"El agente {agent_name} no pudo completar su análisis."
+                    ideas=ideas,
+                    explanation=agent._create_explanation(user_input.problem)
                 )
-                processed_results.append(error_result)
             else:
-                processed_results.append(result)
+                missing_techniques.append(technique)
         
-        return processed_results
-    
-    async def _coordinate_sequential_agents(self, user_input: UserInput) -> List[ScamperResult]:
-        """Coordina todos los agentes especializados secuencialmente"""
-        print(f"⏳ {self.name}: Coordinando agentes secuencialmente...")
+        # Las técnicas ausentes en la respuesta combinada pasan por su agente
+        if missing_techniques:
+            logger.info("↩️ %d técnicas sin respuesta combinada, usando sus agentes...", len(missing_techniques))
+            if settings.ENABLE_PARALLEL_EXECUTION:
+                fallback_results = await self._coordinate_parallel_agents(user_input, missing_techniques, deadline)
+            else:
+                fallback_results = await self._coordinate_sequential_agents(user_input, missing_techniques, deadline)
+            for result in fallback_results:
+                results[result.technique] = result
+            # El resumen combinado no contempla las técnicas que faltaban
+            summary = None
         
-        results = []
-        for technique, agent in self.specialized_agents.items():
-            print(f"   🔄 Ejecutando {agent.name}...")
+        ordered_results = [results[technique] for technique in self.specialized_agents if technique in results]
+        return ordered_results, summary
+    
+    def _select_agents(self, techniques: Optional[List[ScamperTechnique]] = None) -> Dict[ScamperTechnique, object]:
+        """Devuelve los agentes de las técnicas indicadas (todos por defecto)"""
+        if techniques is None:
+            return self.specialized_agents
+        return {technique: agent for technique, agent in self.specialized_agents.items() if technique in techniques}
+    
+    async def _run_agent(self, technique: ScamperTechnique, agent, user_input: UserInput) -> ScamperResult:
+        """Ejecuta un agente convirtiendo cualquier excepción en un resultado de error"""
+        start = time.perf_counter()
+        with tracer.span("agent.generate_ideas", technique=technique.value, agent=agent.name) as span:
             try:
                 result = await agent.generate_ideas(user_input)
-                results.append(result)
             except Exception as e:
-                print(f"   ❌ {agent.name}: Error - {e}")
-                # Crear resultado de error
-                error_result = ScamperResult(
-                    technique=technique,
-                    ideas=[f"Error en {agent.name}: {str(e)}"],
-                    explanation=f"El agente {agent.name} no pudo completar su análisis."
-                )
-                results.append(error_result)
+                result = self._create_error_result(technique, agent, e)
+            result = await self._with_stale_fallback(result, agent, user_input)
+            self._record_result(result, time.perf_counter() - start, span)
+        return result
+    
+    async def _with_stale_fallback(self, result: ScamperResult, agent, user_input: UserInput) -> ScamperResult:
+        """Con el circuito del modelo abierto, cambia el error por las ideas caducadas de la caché (si las hay)"""
+        if result.error_type != LLMCircuitOpenError.kind:
+            return result
+        ideas = await gemini_client.get_stale_ideas(result.technique.value, user_input.problem, user_input.context)
+        if not ideas:
+            return result
+        STALE_RESULTS.inc(technique=result.technique.value)
+        logger.info("🕰️ %s: Modelo no disponible, se sirven ideas caducadas de la caché", agent.name)
+        return ScamperResult(
+            technique=result.technique,
+            ideas=ideas,
+            explanation=agent._create_explanation(user_input.problem),
+            stale=True
+        )
+    
+    def _record_result(self, result: ScamperResult, elapsed: Optional[float] = None, span=None):
+        """Latencia del agente y tipo de error, si lo hubo, en las métricas y en su span"""
+        if span is not None:
+            span.set_attribute("status", result.status.value)
+            span.set_attribute("ideas", len(result.ideas))
+            if result.error_type:
+                span.set_attribute("error.type", result.error_type)
+            if result.stale:
+                span.set_attribute("stale", True)
+        if elapsed is not None:
+            AGENT_LATENCY.observe(elapsed, technique=result.technique.value, status=result.status.value)
+        if result.status != ResultStatus.OK:
+            TECHNIQUE_ERRORS.inc(technique=result.technique.value, kind=result.error_type or "unknown")
+    
+    def _create_error_result(self, technique: ScamperTechnique, agent, error: Exception) -> ScamperResult:
+        """Crea el resultado de un agente que falló"""
+        logger.warning("❌ %s: Falló con error - %s", agent.name, error)
+        return ScamperResult(
+            technique=technique,
+            ideas=[],
+            explanation=f"El agente {agent.name} no pudo completar su análisis.",
+            status=ResultStatus.ERROR,
+            error_type=error_kind(error),
+            error=f"Error en {agent.name}: {str(error)}"
+        )
+    
+    def _create_timeout_result(self, technique: ScamperTechnique, agent) -> ScamperResult:
+        """Crea el resultado de un agente que no terminó antes del plazo"""
+        logger.info("⏱️ %s: Sin terminar al agotarse el plazo", agent.name)
+        result = ScamperResult(
+            technique=technique,
+            ideas=[],
+            explanation=f"El agente {agent.name} no completó su análisis dentro del plazo.",
+            status=ResultStatus.TIMEOUT,
+            error_type="deadline",
+            error="Plazo de la petición agotado antes de completar la técnica"
+        )
+        self._record_result(result)
+        return result
+    
+    async def _coordinate_parallel_agents(self, user_input: UserInput, techniques: Optional[List[ScamperTechnique]] = None,
+                                          deadline: Optional[float] = None) -> List[ScamperResult]:
+        """Coordina los agentes especializados en paralelo"""
+        logger.debug("🚀 %s: Coordinando agentes en paralelo...", self.name)
+        
+        # Crear tareas para todos los agentes especializados
+        agents = self._select_agents(techniques)
+        tasks = {}
+        for technique, agent in agents.items():
+            logger.debug("📋 Asignando tarea a %s", agent.name)
+            tasks[technique] = asyncio.create_task(self._run_agent(technique, agent, user_input))
+        
+        if not tasks:
+            return []
+        
+        # Ejecutar todas las tareas en paralelo hasta que terminen o se agote el plazo
+        logger.debug("⚡ Ejecutando %d agentes simultáneamente...", len(tasks))
+        try:
+            done, _ = await asyncio.wait(tasks.values(), timeout=self._remaining(deadline))
+        finally:
+            # Los agentes rezagados (o todos, si se cancela la petición) no siguen consumiendo cuota
+            for task in tasks.values():
+                task.cancel()
+        
+        return [
+            task.result() if task in done else self._create_timeout_result(technique, agents[technique])
+            for technique, task in tasks.items()
+        ]
+    
+    async def _coordinate_sequential_agents(self, user_input: UserInput, techniques: Optional[List[ScamperTechnique]] = None,
+                                            deadline: Optional[float] = None) -> List[ScamperResult]:
+        """Coordina los agentes especializados secuencialmente"""
+        logger.debug("⏳ %s: Coordinando agentes secuencialmente...", self.name)
+        
+        results = []
+        for technique, agent in self._select_agents(techniques).items():
+            remaining = self._remaining(deadline)
+            if remaining == 0:
+                results.append(self._create_timeout_result(technique, agent))
+                continue
+            logger.debug("🔄 Ejecutando %s...", agent.name)
+            try:
+                results.append(await asyncio.wait_for(self._run_agent(technique, agent, user_input), timeout=remaining))
+            except asyncio.TimeoutError:
+                results.append(self._create_timeout_result(technique, agent))
         
         return results
     
-    async def _generate_executive_summary(self, problem: str, results: List[ScamperResult]) -> str:
-        """Genera un resumen ejecutivo inteligente de todos los resultados"""
+    async def stream_user_input(self, user_input: UserInput) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Procesa la entrada del usuario emitiendo cada idea y cada resultado en cuanto están listos
         
-        # Contar métricas
-        total_ideas = sum(len(result.ideas) for result in results)
-        successful_agents = len([r for r in results if not any("Error" in idea for idea in r.ideas)])
+        Args:
+            user_input: Entrada del usuario con problema y contexto
+            
+        Yields:
+            Tuplas ("idea", (ScamperTechnique, idea)) a medida que el modelo las escribe,
+            ("result", ScamperResult) cuando una técnica termina y, al final,
+            ("summary", resumen ejecutivo)
+        """
+        with ANALYSES_IN_FLIGHT.track_inprogress(mode="stream"):
+            span = tracer.start_span("orchestrator.stream_user_input", parent=tracer.current_span())
+            events = tracer.traced(span, self._stream_user_input(user_input))
+            try:
+                async for event in events:
+                    yield event
+            finally:
+                # Cerrar ya el generador interno cancela los agentes si el cliente se fue
+                await events.aclose()
+    
+    async def _stream_user_input(self, user_input: UserInput) -> AsyncIterator[Tuple[str, object]]:
+        logger.debug("🎯 %s: Iniciando análisis multi-agente en streaming. Problema: %s", self.name, user_input.problem)
+        start = time.perf_counter()
+        
+        cached = self._lookup_similar_response(user_input)
+        if cached is not None:
+            # Se reproduce la respuesta guardada con los mismos eventos que una generación
+            for result in cached.results:
+                for idea in result.ideas:
+                    yield "idea", (result.technique, idea)
+                yield "result", result
+            yield "summary", cached.summary
+            return
+        
+        results = []
+        if settings.ENABLE_PARALLEL_EXECUTION:
+            queue = asyncio.Queue()
+            
+            async def forward(technique, agent):
+                async for event in self._traced_agent_stream(technique, agent, user_input):
+                    queue.put_nowait(event)
+            
+            tasks = [
+                asyncio.create_task(forward(technique, agent))
+                for technique, agent in self.specialized_agents.items()
+            ]
+            try:
+                while len(results) < len(tasks):
+                    event, payload = await queue.get()
+                    if event == "result":
+                        results.append(payload)
+                    yield event, payload
+            finally:
+                # Si el consumidor abandona el stream no se dejan agentes huérfanos
+                for task in tasks:
+                    task.cancel()
+        else:
+            for technique, agent in self.specialized_agents.items():
+                async for event, payload in self._traced_agent_stream(technique, agent, user_input):
+                    if event == "result":
+                        results.append(payload)
+                    yield event, payload
+        
+        summary = await self._generate_executive_summary(user_input.problem, results)
+        yield "summary", summary
+        self._remember_response(user_input, ScamperResponse(
+            original_problem=user_input.problem, results=results, summary=summary))
+        logger.info(
+            "✅ %s: Análisis multi-agente en streaming completado (%d técnicas)", self.name, len(results),
+            extra={
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "techniques_ok": sum(result.status == ResultStatus.OK for result in results),
+            }
+        )
+    
+    def _traced_agent_stream(self, technique: ScamperTechnique, agent, user_input: UserInput) -> AsyncIterator[Tuple[str, object]]:
+        """_stream_agent dentro de su propio span, activo mientras el agente trabaja"""
+        span = tracer.child_span("agent.stream_ideas", technique=technique.value, agent=agent.name)
+        return tracer.traced(span, self._stream_agent(technique, agent, user_input))
+    
+    async def _stream_agent(self, technique: ScamperTechnique, agent, user_input: UserInput) -> AsyncIterator[Tuple[str, object]]:
+        """Emite las ideas de un agente una a una y al final su resultado completo"""
+        logger.debug("📋 Asignando tarea a %s", agent.name)
+        ideas = []
+        start = time.perf_counter()
+        try:
+            async for idea in gemini_client.stream_scamper_ideas(
+                technique=technique.value,
+                problem=user_input.problem,
+                context=user_input.context
+            ):
+                ideas.append(idea)
+                yield "idea", (technique, idea)
+            result = ScamperResult(
+                technique=technique,
+                ideas=ideas,
+                explanation=agent._create_explanation(user_input.problem)
+            )
+        except Exception as e:
+            result = await self._with_stale_fallback(self._create_error_result(technique, agent, e), agent, user_input)
+            for idea in result.ideas if result.stale else ():
+                yield "idea", (technique, idea)
+        # Dentro de _traced_agent_stream el span activo es el del agente
+        self._record_result(result, time.perf_counter() - start, tracer.current_span())
+        yield "result", result
+    
+    async def _generate_executive_summary(self, problem: str, results: List[ScamperResult], timeout: Optional[float] = None) -> str:
+        """Genera un resumen ejecutivo inteligente de todos los resultados"""
         
         # Extraer las mejores ideas de cada técnica para el resumen
         best_ideas = []
         for result in results:
-            if result.ideas and not any("Error" in idea for idea in result.ideas):
+            if result.ideas and result.status == ResultStatus.OK:
                 # Tomar la primera idea de cada técnica exitosa
                 best_ideas.append(f"{result.technique.value.replace('_', ' ').title()}: {result.ideas[0]}")
         
@@ -150,12 +440,25 @@ class OrchestratorAgent:
         Resumen ejecutivo:
         """
         
-        try:
-            summary = await gemini_client.generate_response(summary_prompt)
-            return summary.strip()
-        except Exception as e:
-            print(f"   ⚠️ Error generando resumen: {e}")
-            return f"El análisis multi-agente SCAMPER generó {total_ideas} ideas utilizando {successful_agents} técnicas especializadas. Las ideas exploran sustituciones estratégicas, combinaciones sinérgicas, adaptaciones cross-industry, modificaciones de escala, nuevos usos, simplificaciones y enfoques contraintuitivos para abordar '{problem}' desde múltiples perspectivas innovadoras."
+        start = time.perf_counter()
+        with tracer.span("orchestrator.summary", source="model") as span:
+            try:
+                summary = await asyncio.wait_for(gemini_client.generate_response(summary_prompt), timeout=timeout)
+                SUMMARY_LATENCY.observe(time.perf_counter() - start, source="model")
+                return summary.strip()
+            except Exception as e:
+                logger.warning("⚠️ Error generando resumen: %s", e)
+                span.set_attribute("source", "fallback")
+                span.set_attribute("error.type", error_kind(e))
+                summary = self._create_fallback_summary(problem, results)
+                SUMMARY_LATENCY.observe(time.perf_counter() - start, source="fallback")
+                return summary
+    
+    def _create_fallback_summary(self, problem: str, results: List[ScamperResult]) -> str:
+        """Resumen local, sin llamar al modelo, para errores o plazos agotados"""
+        total_ideas = sum(len(result.ideas) for result in results)
+        successful_agents = len([r for r in results if r.status == ResultStatus.OK])
+        return f"El análisis multi-agente SCAMPER generó {total_ideas} ideas utilizando {successful_agents} técnicas especializadas. Las ideas exploran sustituciones estratégicas, combinaciones sinérgicas, adaptaciones cross-industry, modificaciones de escala, nuevos usos, simplificaciones y enfoques contraintuitivos para abordar '{problem}' desde múltiples perspectivas innovadoras."
     
     def get_system_status(self) -> Dict[str, any]:
         """Retorna el estado del sistema multi-agente"""
@@ -170,14 +473,25 @@ class OrchestratorAgent:
         return {
             "orchestrator_name": self.name,
             "total_agents": len(self.specialized_agents),
-            "execution_mode": "Parallel" if settings.ENABLE_PARALLEL_EXECUTION else "Sequential",
+            "execution_mode": self._get_execution_mode(),
             "max_ideas_per_agent": settings.MAX_IDEAS_PER_TECHNIQUE,
+            "cache": gemini_client.cache.get_stats(),
+            "semantic_cache": semantic_cache.get_stats(),
+            "single_flight": gemini_client.single_flight.get_stats(),
+            "scheduler": gemini_client.scheduler.get_stats(),
+            "upstream_calls": gemini_client.get_call_stats(),
             "specialized_agents": agent_status
         }
     
+    def _get_execution_mode(self) -> str:
+        """Nombre del modo de ejecución configurado"""
+        if settings.ENABLE_COMBINED_GENERATION:
+            return "Combined"
+        return "Parallel" if settings.ENABLE_PARALLEL_EXECUTION else "Sequential"
+    
     async def test_all_agents(self) -> Dict[str, bool]:
         """Prueba que todos los agentes especializados funcionen correctamente"""
-        print(f"🧪 {self.name}: Probando todos los agentes especializados...")
+        logger.info("🧪 %s: Probando todos los agentes especializados...", self.name)
         
         test_input = UserInput(
             problem="Mejorar la comunicación en equipos remotos",
@@ -187,24 +501,24 @@ class OrchestratorAgent:
         agent_health = {}
         for technique, agent in self.specialized_agents.items():
             try:
-                print(f"   🔍 Probando {agent.name}...")
+                logger.info("🔍 Probando %s...", agent.name)
                 result = await agent.generate_ideas(test_input)
                 # Verificar que el resultado sea válido
                 is_healthy = (
                     len(result.ideas) > 0 and 
-                    not any("Error" in idea for idea in result.ideas) and
+                    result.status == ResultStatus.OK and
                     result.explanation is not None
                 )
                 agent_health[agent.name] = is_healthy
                 status = "✅ OK" if is_healthy else "❌ FALLO"
-                print(f"     {status}")
+                logger.info("%s: %s", agent.name, status)
             except Exception as e:
                 agent_health[agent.name] = False
-                print(f"     ❌ EXCEPCIÓN: {e}")
+                logger.warning("❌ %s: EXCEPCIÓN: %s", agent.name, e)
         
         healthy_count = sum(agent_health.values())
         total_count = len(agent_health)
-        print(f"🏥 Estado del sistema: {healthy_count}/{total_count} agentes funcionando")
+        logger.info("🏥 Estado del sistema: %d/%d agentes funcionando", healthy_count, total_count)
         
         return agent_health
 
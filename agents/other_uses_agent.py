@@ -1,6 +1,10 @@
 from typing import List
-from models.schemas import UserInput, ScamperResult, ScamperTechnique
+from models.schemas import UserInput, ScamperResult, ScamperTechnique, ResultStatus
 from utils.gemini_client import gemini_client
+from utils.errors import error_kind
+from utils.log import get_logger
+
+logger = get_logger("agents.put_to_other_uses")
 
 class OtherUsesAgent:
     """Agente especializado en la técnica SCAMPER de OTROS USOS"""
@@ -20,7 +24,7 @@ class OtherUsesAgent:
         Returns:
             Resultado con ideas de otros usos
         """
-        print(f"🎯 {self.name}: Explorando nuevos usos y aplicaciones...")
+        logger.debug("🎯 %s: Explorando nuevos usos y aplicaciones...", self.name)
         
         try:
             # Generar ideas específicas de otros usos
@@ -39,15 +43,18 @@ class OtherUsesAgent:
                 explanation=explanation
             )
             
-            print(f"✅ {self.name}: {len(ideas)} ideas de otros usos generadas")
+            logger.debug("✅ %s: %d ideas de otros usos generadas", self.name, len(ideas))
             return result
             
         except Exception as e:
-            print(f"❌ {self.name}: Error generando ideas - {e}")
+            logger.warning("❌ %s: Error generando ideas - %s", self.name, e)
             return ScamperResult(
                 technique=self.technique,
-                ideas=[f"Error en agente de otros usos: {str(e)}"],
-                explanation="No se pudieron generar ideas de otros usos debido a un error técnico."
+                ideas=[],
+                explanation="No se pudieron generar ideas de otros usos debido a un error técnico.",
+                status=ResultStatus.ERROR,
+                error_type=error_kind(e),
+                error=f"Error en agente de otros usos: {str(e)}"
             )
     
     def _create_explanation(self, problem: str) -> str:
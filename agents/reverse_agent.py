@@ -1,6 +1,10 @@
 from typing import List
-from models.schemas import UserInput, ScamperResult, ScamperTechnique
+from models.schemas import UserInput, ScamperResult, ScamperTechnique, ResultStatus
 from utils.gemini_client import gemini_client
+from utils.errors import error_kind
+from utils.log import get_logger
+
+logger = get_logger("agents.reverse")
 
 class ReverseAgent:
     """Agente especializado en la técnica SCAMPER de INVERTIR/REORGANIZAR"""
@@ -20,7 +24,7 @@ class ReverseAgent:
         Returns:
             Resultado con ideas de inversión/reorganización
         """
-        print(f"🔄 {self.name}: Explorando inversiones y reorganizaciones...")
+        logger.debug("🔄 %s: Explorando inversiones y reorganizaciones...", self.name)
         
         try:
             # Generar ideas específicas de inversión/reorganización
@@ -39,15 +43,18 @@ class ReverseAgent:
                 explanation=explanation
             )
             
-            print(f"✅ {self.name}: {len(ideas)} ideas de inversión generadas")
+            logger.debug("✅ %s: %d ideas de inversión generadas", self.name, len(ideas))
             return result
             
         except Exception as e:
-            print(f"❌ {self.name}: Error generando ideas - {e}")
+            logger.warning("❌ %s: Error generando ideas - %s", self.name, e)
             return ScamperResult(
                 technique=self.technique,
-                ideas=[f"Error en agente de inversión: {str(e)}"],
-                explanation="No se pudieron generar ideas de inversión debido a un error técnico."
+                ideas=[],
+                explanation="No se pudieron generar ideas de inversión debido a un error técnico.",
+                status=ResultStatus.ERROR,
+                error_type=error_kind(e),
+                error=f"Error en agente de inversión: {str(e)}"
             )
     
     def _create_explanation(self, problem: str) -> str:
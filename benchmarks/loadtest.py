@@ -0,0 +1,298 @@
+"""
+Prueba de carga de extremo a extremo de /api/scamper y /api/scamper/stream
+
+Arranca la aplicación web real (Flask o ASGI) con el backend simulado y la
+somete a carga con un generador asyncio propio, en bucle cerrado: cada cliente
+lanza una petición en cuanto termina la anterior. Barre varios niveles de
+concurrencia e informa por cada uno del rendimiento (peticiones/s), las
+latencias p50/p95/p99, el tiempo hasta el primer resultado y la tasa de errores.
+
+Uso:
+    python -m benchmarks.loadtest --target flask --levels 1,10,50,200 --out report.json
+    python -m benchmarks.loadtest --target asgi --endpoint stream --duration 20
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000   # servidor ya arrancado
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    "scamper": "/api/scamper",
+    "stream": "/api/scamper/stream",
+}
+DEFAULT_LEVELS = (1, 10, 50, 200)
+
+# Cada petición lleva un problema distinto (también entre niveles y ejecuciones) para
+# que pase por el modelo y no por la caché. El sufijo aleatorio en palabras cortas lo
+# aleja también de la caché semántica, que trataría "tienda 1" y "tienda 2" como iguales
+_RUN_ID = uuid.uuid4().hex[:8]
+_PROBLEM_IDS = itertools.count()
+
+def _unique_problem() -> str:
+    tag = uuid.uuid4().hex
+    return (f"Reducir el tiempo de espera en la tienda {_RUN_ID}-{next(_PROBLEM_IDS)} "
+            + " ".join(tag[start:start + 4] for start in range(0, 16, 4)))
+
+# El servidor Flask de desarrollo, con un hilo por petición y sin log por petición
+_FLASK_SERVER = (
+    "import logging, sys; logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+    "from werkzeug.serving import run_simple; from webapp.app import app; "
+    "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"
+)
+
+def percentile(values: List[float], quantile: float) -> Optional[float]:
+    """Percentil por rango más cercano (None si no hay valores)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(quantile * len(ordered))) - 1))
+    return ordered[index]
+
+class LoadTestServer:
+    """Arranca la aplicación web en un subproceso con el modelo simulado"""
+
+    def __init__(self, target: str, latency_ms: float, extra_env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            target: flask (webapp/app.py) o asgi (webapp/asgi.py con un worker de uvicorn)
+            latency_ms: Latencia mediana de cada llamada al modelo simulado
+            extra_env: Variables de entorno adicionales para el servidor
+        """
+        self.target = target
+        self.latency_ms = latency_ms
+        self.extra_env = extra_env or {}
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._process = None
+        self._tmpdir = None
+
+    def __enter__(self) -> "LoadTestServer":
+        self._tmpdir = tempfile.TemporaryDirectory()
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get("PYTHONPATH")])),
+            SCAMPER_LLM_BACKEND="stub",
+            SCAMPER_STUB_LATENCY_MS=str(self.latency_ms),
+            # Caché vacía y propia: no se mezcla con la del usuario ni con otras ejecuciones
+            SCAMPER_CACHE_DB=os.path.join(self._tmpdir.name, "cache.sqlite3"),
+            # La prueba no usa /api/jobs: sin workers, y con una cola propia para no drenar la real con el stub
+            SCAMPER_JOBS_DB=os.path.join(self._tmpdir.name, "jobs.sqlite3"),
+            SCAMPER_JOB_WORKERS="0",
+            # Sin cuota por minuto: se mide el servidor, no el límite del proveedor
+            GEMINI_REQUESTS_PER_MINUTE=str(10 ** 9),
+            GEMINI_TOKENS_PER_MINUTE=str(10 ** 12),
+        )
+        env.update(self.extra_env)
+        if self.target == "flask":
+            command = [sys.executable, "-c", _FLASK_SERVER, str(self.port)]
+        elif self.target == "asgi":
+            command = [sys.executable, os.path.join(PROJECT_ROOT, "webapp", "serve.py"),
+                       "--port", str(self.port), "--workers", "1", "--log-level", "warning"]
+        else:
+            raise ValueError(f"Servidor desconocido: {self.target} (usa flask o asgi)")
+
+        self._process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_until_ready(self.url, self._process)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def _wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al arrancar (código {process.returncode})")
+        try:
+            with urllib.request.urlopen(url + "/", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"El servidor no respondió en {timeout:.0f}s")
+
+async def send_request(url: str, path: str, body: dict, timeout: float) -> Tuple[Optional[str], float, Optional[float]]:
+    """
+    Envía una petición POST con un cliente HTTP/1.1 mínimo sobre asyncio
+
+    Returns:
+        (error o None, latencia total, tiempo hasta el primer resultado o None)
+    """
+    parsed = urllib.parse.urlsplit(url)
+    payload = json.dumps(body).encode("utf-8")
+    start = time.perf_counter()
+    first_result = None
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(parsed.hostname, parsed.port), timeout)
+        writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {parsed.netloc}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("ascii") + payload
+        )
+        await writer.drain()
+
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        status = int(status_line.split()[1])
+        streaming = path == ENDPOINTS["stream"]
+        received = b""
+        while True:
+            chunk = await asyncio.wait_for(reader.read(65536), timeout)
+            if not chunk:
+                break
+            received += chunk
+            # En el stream, el primer resultado es la primera idea o técnica completa
+            if streaming and first_result is None and (b"event: idea" in received or b"event: result" in received):
+                first_result = time.perf_counter() - start
+    except (OSError, asyncio.TimeoutError, ValueError, IndexError) as e:
+        return type(e).__name__, time.perf_counter() - start, None
+    finally:
+        if writer is not None:
+            writer.close()
+
+    latency = time.perf_counter() - start
+    if status != 200:
+        return f"http_{status}", latency, None
+    if streaming:
+        if b"event: error" in received:
+            return "stream_error", latency, first_result
+        if b"event: done" not in received:
+            return "stream_incomplete", latency, first_result
+        return None, latency, first_result
+    # La respuesta JSON llega entera: el primer resultado es la respuesta completa
+    return None, latency, latency
+
+async def run_level(url: str, endpoint: str, concurrency: int, duration: float, timeout: float = 120.0) -> Dict[str, object]:
+    """
+    Mantiene `concurrency` clientes en bucle cerrado durante `duration` segundos
+
+    Returns:
+        Métricas del nivel (rendimiento, latencias en ms, errores por tipo)
+    """
+    path = ENDPOINTS[endpoint]
+    latencies, first_results = [], []
+    errors = Counter()
+    stop_at = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < stop_at:
+            body = {"problem": _unique_problem()}
+            error, latency, first_result = await send_request(url, path, body, timeout)
+            if error is not None:
+                errors[error] += 1
+                continue
+            latencies.append(latency)
+            if first_result is not None:
+                first_results.append(first_result)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    completed = len(latencies)
+    total = completed + sum(errors.values())
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "completed": completed,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {f"p{int(q * 100)}": ms(percentile(latencies, q)) for q in (0.5, 0.95, 0.99)},
+        "first_result_ms": {f"p{int(q * 100)}": ms(percentile(first_results, q)) for q in (0.5, 0.95, 0.99)},
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        "errors": dict(errors),
+    }
+
+async def run_sweep(url: str, endpoints: List[str], levels: List[int], duration: float) -> List[Dict[str, object]]:
+    """Ejecuta cada nivel de concurrencia para cada endpoint, uno detrás de otro"""
+    results = []
+    for endpoint in endpoints:
+        for concurrency in levels:
+            result = await run_level(url, endpoint, concurrency, duration)
+            print(format_result(result), file=sys.stderr)
+            results.append(result)
+    return results
+
+def format_result(result: Dict[str, object]) -> str:
+    latency, first = result["latency_ms"], result["first_result_ms"]
+    return (f"{result['endpoint']:<8} c={result['concurrency']:<4} {result['throughput_rps']:>8.2f} req/s | "
+            f"p50 {latency['p50']} ms p95 {latency['p95']} ms p99 {latency['p99']} ms | "
+            f"1er resultado p50 {first['p50']} ms | errores {result['error_rate'] * 100:.1f}%")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API web de SCAMPER con el modelo simulado")
+    parser.add_argument("--target", choices=["flask", "asgi"], default="flask", help="Aplicación a arrancar")
+    parser.add_argument("--url", help="Usar un servidor ya arrancado en lugar de lanzar uno")
+    parser.add_argument("--endpoint", choices=["scamper", "stream", "both"], default="both")
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)), help="Niveles de concurrencia separados por comas")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por nivel")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Latencia mediana del modelo simulado")
+    parser.add_argument("--out", help="Archivo JSON del informe (por defecto, salida estándar)")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    endpoints = list(ENDPOINTS) if args.endpoint == "both" else [args.endpoint]
+
+    def sweep(url):
+        return asyncio.run(run_sweep(url, endpoints, levels, args.duration))
+
+    if args.url:
+        results = sweep(args.url.rstrip("/"))
+        target, backend = args.url, None  # el backend es el que tenga configurado ese servidor
+    else:
+        with LoadTestServer(args.target, args.latency_ms) as server:
+            results = sweep(server.url)
+        target, backend = args.target, {"name": "stub", "latency_ms": args.latency_ms}
+
+    report = {
+        "target": target,
+        "backend": backend,
+        "duration_per_level_s": args.duration,
+        "levels": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as report_file:
+            report_file.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
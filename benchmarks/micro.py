@@ -0,0 +1,257 @@
+"""
+Micro-benchmarks de los caminos calientes del orquestador
+
+Mide el coste por llamada (mejor de varias repeticiones) y la memoria que
+reserva cada llamada (pico de tracemalloc), y los compara con la línea base
+guardada en benchmarks/baselines.json: una regresión hace fallar la ejecución.
+
+Uso:
+    python -m benchmarks.micro                    # compara con la línea base
+    python -m benchmarks.micro --update-baseline  # guarda los resultados como nueva línea base
+    python -m benchmarks.micro --json             # informe legible por máquina
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from agents.orchestrator import orchestrator
+from models.schemas import ScamperResponse, ScamperResult, ScamperTechnique, UserInput
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.rate_limiter import RequestScheduler
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Margen sobre la línea base antes de considerar una regresión. Los tiempos se
+# normalizan con una carga de calibración, pero en máquinas compartidas varían
+# bastante; la memoria reservada es casi determinista
+TIME_TOLERANCE = 1.0
+ALLOC_TOLERANCE = 0.25
+ALLOC_SLACK_BYTES = 512  # ruido del propio tracemalloc en llamadas muy pequeñas
+
+PROBLEM = "Quiero aumentar la participación de los empleados en las reuniones de equipo"
+CONTEXT = "Empresa de tecnología, equipos remotos, reuniones virtuales semanales"
+
+SMALL_RESPONSE = "1. Rotar la moderación de cada reunión\n2. Agenda colaborativa previa\n3. Cerrar con acuerdos visibles"
+# Muchas líneas, prefijos raros y ninguna lista: los casos que más trabajo dan al parser
+LONG_RESPONSE = "\n".join(f"{i % 5 + 1}. Idea número {i} con bastante texto de relleno alrededor" for i in range(2000))
+UNFORMATTED_RESPONSE = "Texto sin ningún formato de lista " * 3000
+NUMERIC_RESPONSE = "\n".join("1234567890" * 8 for _ in range(2000))
+
+# Entrada de la línea base con la velocidad de la máquina en que se midió
+CALIBRATION = "_calibration"
+
+# nombre -> (función de n iteraciones, iteraciones por repetición)
+BENCHMARKS: Dict[str, tuple] = {}
+
+def benchmark(name: str, number: int):
+    """Registra una función que ejecuta n iteraciones del caso medido"""
+    def register(function: Callable[[int], None]):
+        BENCHMARKS[name] = (function, number)
+        return function
+    return register
+
+@benchmark("create_scamper_prompt", 20000)
+def bench_create_prompt(n: int):
+    techniques = [technique.value for technique in ScamperTechnique]
+    for i in range(n):
+        gemini_client._create_scamper_prompt(techniques[i % 7], PROBLEM, CONTEXT)
+
+@benchmark("parse_ideas_small", 20000)
+def bench_parse_small(n: int):
+    for _ in range(n):
+        gemini_client._parse_ideas_from_response(SMALL_RESPONSE)
+
+@benchmark("parse_ideas_long", 20)
+def bench_parse_long(n: int):
+    for _ in range(n):
+        gemini_client._parse_ideas_from_response(LONG_RESPONSE)
+
+@benchmark("parse_ideas_unformatted", 200)
+def bench_parse_unformatted(n: int):
+    for _ in range(n):
+        gemini_client._parse_ideas_from_response(UNFORMATTED_RESPONSE)
+
+@benchmark("parse_ideas_numeric", 20)
+def bench_parse_numeric(n: int):
+    for _ in range(n):
+        gemini_client._parse_ideas_from_response(NUMERIC_RESPONSE)
+
+def _sample_results() -> List[ScamperResult]:
+    return [
+        ScamperResult(technique=technique, ideas=SMALL_RESPONSE.split("\n"), explanation=f"Aplicación de {technique.value}")
+        for technique in ScamperTechnique
+    ]
+
+@benchmark("response_build", 5000)
+def bench_response_build(n: int):
+    for _ in range(n):
+        ScamperResponse(original_problem=PROBLEM, results=_sample_results(), summary="Resumen ejecutivo")
+
+@benchmark("response_dump_json", 5000)
+def bench_response_dump(n: int):
+    response = ScamperResponse(original_problem=PROBLEM, results=_sample_results(), summary="Resumen ejecutivo")
+    for _ in range(n):
+        json.dumps(response.model_dump(mode="json"), ensure_ascii=False)
+
+@benchmark("orchestrator_fanout", 50)
+def bench_orchestrator_fanout(n: int):
+    # Backend sin latencia: solo queda el coste propio del reparto entre los 7 agentes y el resumen
+    scheduler = RequestScheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12,
+                                 max_concurrency=settings.GEMINI_MAX_CONCURRENCY)
+    user_input = UserInput(problem=PROBLEM, context=CONTEXT)
+
+    async def run():
+        for _ in range(n):
+            await orchestrator.process_user_input(user_input)
+
+    # Con LLM_BACKEND=stub, parchear el modelo no llega a importar el SDK de Gemini
+    with patch.object(settings, "LLM_BACKEND", "stub"), \
+            patch.object(gemini_client, "model", StubBackend(latency_ms=0, distribution="fixed")), \
+            patch.object(gemini_client, "scheduler", scheduler), \
+            patch.object(settings, "ENABLE_CACHE", False), \
+            contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run())
+
+def calibrate(repeat: int = 5) -> float:
+    """Microsegundos de una carga fija en Python puro: mide la velocidad de esta máquina"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total = 0
+        for i in range(100000):
+            total += len(str(i))
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1e6, 3)
+
+def measure(function: Callable[[int], None], number: int, repeat: int = 5) -> Dict[str, float]:
+    """
+    Mide una función de benchmark
+
+    Returns:
+        us_per_call: Microsegundos por llamada (la mejor repetición)
+        alloc_bytes: Pico de memoria reservada durante una llamada
+    """
+    function(max(1, number // 10))  # calentamiento (cachés, imports perezosos)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(number)
+        timings.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        function(1)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"us_per_call": round(min(timings) * 1e6, 3), "alloc_bytes": max(0, peak - baseline)}
+
+def run_benchmarks(names: Optional[List[str]] = None, scale: float = 1.0, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Ejecuta los benchmarks indicados (todos por defecto)
+
+    Args:
+        names: Benchmarks a ejecutar
+        scale: Factor sobre las iteraciones de cada uno (p. ej. 0.01 para una pasada rápida)
+        repeat: Repeticiones de las que se toma la mejor
+    """
+    results = {CALIBRATION: {"us_per_call": calibrate(repeat), "alloc_bytes": 0}}
+    for name, (function, number) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results[name] = measure(function, max(1, int(number * scale)), repeat)
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]],
+            time_tolerance: float = TIME_TOLERANCE, alloc_tolerance: float = ALLOC_TOLERANCE) -> List[str]:
+    """
+    Compara los resultados con la línea base
+
+    Returns:
+        Una descripción por cada regresión encontrada (vacía si no hay)
+    """
+    # Una máquina el doble de lenta no es una regresión: la línea base se escala por la calibración
+    speed = 1.0
+    if results.get(CALIBRATION) and baselines.get(CALIBRATION):
+        speed = results[CALIBRATION]["us_per_call"] / baselines[CALIBRATION]["us_per_call"]
+
+    regressions = []
+    for name, result in results.items():
+        base = baselines.get(name)
+        if base is None or name == CALIBRATION:
+            continue
+        expected = base["us_per_call"] * speed
+        if result["us_per_call"] > expected * (1 + time_tolerance):
+            regressions.append(f"{name}: {result['us_per_call']:.1f} µs/llamada (línea base ajustada {expected:.1f})")
+        if result["alloc_bytes"] > base["alloc_bytes"] * (1 + alloc_tolerance) + ALLOC_SLACK_BYTES:
+            regressions.append(f"{name}: {result['alloc_bytes']} bytes reservados (línea base {base['alloc_bytes']})")
+    return regressions
+
+def load_baselines(path: str = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+def save_baselines(results: Dict[str, Dict[str, float]], path: str = BASELINE_PATH):
+    baselines = load_baselines(path)
+    baselines.update(results)
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+def print_report(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]]):
+    print(f"{'benchmark':<26} {'µs/llamada':>12} {'base':>12} {'bytes':>10} {'base':>10}")
+    for name, result in results.items():
+        base = baselines.get(name, {})
+        print(f"{name:<26} {result['us_per_call']:>12.1f} {base.get('us_per_call', float('nan')):>12.1f} "
+              f"{result['alloc_bytes']:>10} {base.get('alloc_bytes', '-'):>10}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de SCAMPER")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks a ejecutar ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Archivo de línea base")
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar los resultados como línea base")
+    parser.add_argument("--scale", type=float, default=1.0, help="Factor sobre las iteraciones")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--alloc-tolerance", type=float, default=ALLOC_TOLERANCE)
+    parser.add_argument("--json", action="store_true", help="Imprimir el informe en JSON")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Benchmarks desconocidos: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.names, scale=args.scale)
+    baselines = load_baselines(args.baseline)
+    regressions = [] if args.update_baseline else compare(results, baselines, args.time_tolerance, args.alloc_tolerance)
+
+    if args.json:
+        print(json.dumps({"results": results, "baselines": baselines, "regressions": regressions}, indent=2))
+    else:
+        print_report(results, baselines)
+        for regression in regressions:
+            print(f"❌ Regresión: {regression}")
+
+    if args.update_baseline:
+        save_baselines(results, args.baseline)
+        print(f"💾 Línea base guardada en {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
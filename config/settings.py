@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 # Cargar variables de entorno
 load_dotenv()
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Settings:
     """Configuración global del sistema"""
     
@@ -14,24 +16,136 @@ class Settings:
     GEMINI_MODEL = "gemini-1.5-flash"
     GEMINI_TEMPERATURE = 0.7
     GEMINI_MAX_TOKENS = 1000
+    GEMINI_COMBINED_MAX_TOKENS = 4000  # respuesta JSON con las 7 técnicas y el resumen
+    
+    # Backend del modelo: gemini (API real), stub (simulado en el proceso) o http (servidor simulado local)
+    LLM_BACKEND = os.getenv("SCAMPER_LLM_BACKEND", "gemini")
+    LLM_HTTP_URL = os.getenv("SCAMPER_LLM_HTTP_URL", "http://127.0.0.1:8765")  # python -m utils.llm_backends
+    
+    # Modelo simulado (backends stub y http), para pruebas de carga sin red ni coste
+    STUB_LATENCY_MS = float(os.getenv("SCAMPER_STUB_LATENCY_MS", "800"))  # mediana por llamada
+    STUB_LATENCY_DISTRIBUTION = os.getenv("SCAMPER_STUB_LATENCY_DISTRIBUTION", "lognormal")  # fixed, uniform o lognormal
+    STUB_LATENCY_SPREAD = float(os.getenv("SCAMPER_STUB_LATENCY_SPREAD", "0.5"))  # sigma (lognormal) o ±fracción (uniform)
+    STUB_ERROR_RATE = float(os.getenv("SCAMPER_STUB_ERROR_RATE", "0"))  # probabilidad de 503 por llamada
+    STUB_RATE_LIMIT_EVERY = int(os.getenv("SCAMPER_STUB_RATE_LIMIT_EVERY", "0"))  # cada cuántas llamadas hay ráfaga de 429 (0 = nunca)
+    STUB_RATE_LIMIT_BURST = int(os.getenv("SCAMPER_STUB_RATE_LIMIT_BURST", "5"))  # 429 seguidos por ráfaga
+    STUB_TOKENS_PER_CALL = int(os.getenv("SCAMPER_STUB_TOKENS_PER_CALL", "0"))  # 0 = estimados del texto
+    STUB_SEED = int(os.environ["SCAMPER_STUB_SEED"]) if os.getenv("SCAMPER_STUB_SEED") else None
     
     # Configuración del sistema
     MAX_IDEAS_PER_TECHNIQUE = 3
     ENABLE_PARALLEL_EXECUTION = True
+    GEMINI_MAX_CONCURRENCY = 16  # llamadas simultáneas a Gemini por proceso
+    GEMINI_MIN_CONCURRENCY = 1  # suelo del límite adaptativo tras errores 429
+    GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "1000"))
+    GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+    GEMINI_SHARED_BUDGET_PATH = os.getenv("SCAMPER_SHARED_BUDGET")  # archivo para repartir la cuota entre procesos
+    ENABLE_COMBINED_GENERATION = False  # una sola llamada para las 7 técnicas y el resumen
+    ENABLE_STREAMING_OUTPUT = os.getenv("SCAMPER_STREAMING_OUTPUT", "0").lower() in ("1", "true", "on")  # la CLI muestra cada idea en cuanto se genera
+    BATCH_CONCURRENCY = 4  # problemas simultáneos en el modo --batch (por proceso)
+    
+    # Resiliencia de las llamadas a Gemini
+    API_TIMEOUT = float(os.getenv("GEMINI_API_TIMEOUT", "30"))  # segundos por llamada
+    MAX_RETRIES = 3  # reintentos ante timeouts, 429 y errores 5xx
+    RETRY_BASE_DELAY = 0.5  # segundos; se duplica en cada reintento (con jitter)
+    RETRY_MAX_DELAY = 8.0
+    ENABLE_HEDGED_REQUESTS = False  # duplica la llamada si supera el p95 observado
+    HEDGE_MIN_SAMPLES = 20  # latencias necesarias antes de empezar a duplicar
+    HEDGE_QUANTILE = 0.95
+
+    # Micro-batching: las técnicas pedidas a la vez por distintas peticiones comparten una llamada estructurada
+    ENABLE_MICRO_BATCHING = os.getenv("SCAMPER_MICRO_BATCHING", "0").lower() in ("1", "true", "on")
+    MICRO_BATCH_MAX_SIZE = int(os.getenv("SCAMPER_MICRO_BATCH_MAX_SIZE", "8"))  # tareas por llamada
+    MICRO_BATCH_WINDOW_MS = float(os.getenv("SCAMPER_MICRO_BATCH_WINDOW_MS", "20"))  # espera máxima de la primera tarea del lote
+
+    # Circuit breaker: tras varios fallos seguidos las llamadas fallan al instante y se sirve la caché caducada
+    ENABLE_CIRCUIT_BREAKER = os.getenv("SCAMPER_CIRCUIT_BREAKER", "1").lower() in ("1", "true", "on")
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("SCAMPER_BREAKER_FAILURES", "5"))  # timeouts o 5xx seguidos
+    BREAKER_OPEN_SECONDS = float(os.getenv("SCAMPER_BREAKER_OPEN_SECONDS", "30"))  # antes de la llamada de prueba
+    BREAKER_SLOW_CALL_SECONDS = float(os.getenv("SCAMPER_BREAKER_SLOW_CALL_SECONDS", "20")) or None  # cuenta como fallo
+    CACHE_STALE_MAX_SECONDS = 30 * 24 * 3600  # antigüedad máxima de una idea caducada servida con el circuito abierto
+    STALE_REVALIDATION_MAX_KEYS = 200  # técnicas servidas caducadas pendientes de refrescar
+    
+    # Plazos de respuesta
+    SUMMARY_MIN_TIME_BUDGET = 3.0  # segundos mínimos restantes para pedir el resumen a Gemini
+    WEB_DEFAULT_DEADLINE_MS = int(os.getenv("SCAMPER_WEB_DEADLINE_MS", "0")) or None  # plazo de /api/scamper si el cliente no indica uno
+    
+    # Control de admisión de /api/scamper y /api/scamper/stream: por encima de los límites la petición no espera en cola
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv("SCAMPER_MAX_IN_FLIGHT", "64"))  # análisis web simultáneos por proceso (0 = sin límite)
+    ADMISSION_MAX_QUEUE_DEPTH = int(os.getenv("SCAMPER_MAX_QUEUE_DEPTH", "64"))  # llamadas interactivas esperando al planificador (0 = sin límite)
+    ADMISSION_OVERFLOW = os.getenv("SCAMPER_ADMISSION_OVERFLOW", "reject")  # reject (429) o job (202 y /api/jobs; solo /api/scamper)
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("SCAMPER_RETRY_AFTER_SECONDS", "2"))  # cabecera Retry-After del 429
+    
+    # Caché de ideas (memoria + SQLite)
+    ENABLE_CACHE = True
+    ENABLE_SINGLE_FLIGHT = True  # peticiones idénticas simultáneas comparten una llamada a Gemini
+    CACHE_MAX_ENTRIES = 1000
+    CACHE_TTL_SECONDS = 3600
+    CACHE_DB_PATH = os.getenv("SCAMPER_CACHE_DB", os.path.join(PROJECT_ROOT, "data", "scamper_cache.sqlite3"))
+    CACHE_DB_TTL_SECONDS = 7 * 24 * 3600
+    
+    # Trabajos asíncronos (/api/jobs): cola SQLite que sobrevive a reinicios, drenada por workers en segundo plano
+    JOBS_DB_PATH = os.getenv("SCAMPER_JOBS_DB", os.path.join(PROJECT_ROOT, "data", "scamper_jobs.sqlite3"))
+    JOB_WORKERS = int(os.getenv("SCAMPER_JOB_WORKERS", "2"))  # análisis simultáneos por proceso web (0 = solo encolar)
+    JOB_LEASE_SECONDS = 300  # sin latido durante este tiempo, otro worker retoma el trabajo
+    JOB_MAX_ATTEMPTS = 3  # intentos por trabajo si su worker muere a mitad
+    JOB_POLL_INTERVAL = 1.0  # segundos entre consultas a la cola de un worker ocioso
+    JOB_RETENTION_SECONDS = 24 * 3600  # los trabajos terminados se borran pasado este tiempo
+    
+    # Caché semántica: respuestas completas para problemas parafraseados (MinHash/LSH en memoria)
+    ENABLE_SEMANTIC_CACHE = os.getenv("SCAMPER_SEMANTIC_CACHE", "0").lower() in ("1", "true", "on")
+    # Dos umbrales: THRESHOLD elige candidatas por la similitud estimada (palabras y trigramas) y
+    # VERIFY_THRESHOLD exige después esa similitud de Jaccard entre las palabras completas. Con 0.9,
+    # en un problema corto una sola palabra distinta ya impide el acierto: las paráfrasis deben
+    # conservar casi las mismas palabras; bajarlo acepta más paráfrasis y más falsos aciertos
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SCAMPER_SEMANTIC_CACHE_THRESHOLD", "0.8"))  # similitud de Jaccard estimada
+    SEMANTIC_CACHE_VERIFY_THRESHOLD = float(os.getenv("SCAMPER_SEMANTIC_CACHE_VERIFY_THRESHOLD", "0.9"))
+    SEMANTIC_CACHE_MAX_ENTRIES = 500
+    
+    # Trazas por petición: none, jsonl (TRACING_JSONL_PATH) u otlp (colector local por OTLP/HTTP)
+    TRACING_EXPORTER = os.getenv("SCAMPER_TRACING", "none")
+    TRACING_JSONL_PATH = os.getenv("SCAMPER_TRACING_PATH", os.path.join(PROJECT_ROOT, "data", "traces.jsonl"))
+    TRACING_OTLP_ENDPOINT = os.getenv("SCAMPER_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+    TRACING_SERVICE_NAME = "scamper"
+    
+    # Registro: por defecto según el modo (cli, batch o server); DEBUG muestra el detalle de cada agente
+    LOG_LEVEL = os.getenv("SCAMPER_LOG_LEVEL")
+    LOG_FORMAT = os.getenv("SCAMPER_LOG_FORMAT")  # text o json (json por defecto en el servidor web)
+    
+    # Vigilancia del bucle de eventos (diagnóstico): retraso y llamadas que lo bloquean, en /metrics y el registro
+    LOOP_MONITOR = os.getenv("SCAMPER_LOOP_MONITOR", "0").lower() in ("1", "true", "on")
+    LOOP_MONITOR_INTERVAL_MS = float(os.getenv("SCAMPER_LOOP_MONITOR_INTERVAL_MS", "50"))
+    LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("SCAMPER_LOOP_BLOCK_THRESHOLD_MS", "100"))
     
     # Validación
     @classmethod
     def validate(cls):
-        if not cls.GEMINI_API_KEY:
+        if cls.LLM_BACKEND not in ("gemini", "stub", "http"):
+            raise ValueError(f"SCAMPER_LLM_BACKEND debe ser gemini, stub o http (es {cls.LLM_BACKEND})")
+        if cls.TRACING_EXPORTER.lower() not in ("none", "off", "", "jsonl", "otlp"):
+            raise ValueError(f"SCAMPER_TRACING debe ser none, jsonl u otlp (es {cls.TRACING_EXPORTER})")
+        if not 0 < cls.SEMANTIC_CACHE_THRESHOLD <= 1:
+            raise ValueError(f"SCAMPER_SEMANTIC_CACHE_THRESHOLD debe estar entre 0 y 1 (es {cls.SEMANTIC_CACHE_THRESHOLD})")
+        if not 0 < cls.SEMANTIC_CACHE_VERIFY_THRESHOLD <= 1:
+            raise ValueError("SCAMPER_SEMANTIC_CACHE_VERIFY_THRESHOLD debe estar entre 0 y 1 "
+                             f"(es {cls.SEMANTIC_CACHE_VERIFY_THRESHOLD})")
+        if cls.MICRO_BATCH_MAX_SIZE < 1 or cls.MICRO_BATCH_WINDOW_MS < 0:
+            raise ValueError("SCAMPER_MICRO_BATCH_MAX_SIZE debe ser al menos 1 y SCAMPER_MICRO_BATCH_WINDOW_MS no negativo")
+        if cls.ADMISSION_OVERFLOW not in ("reject", "job"):
+            raise ValueError(f"SCAMPER_ADMISSION_OVERFLOW debe ser reject o job (es {cls.ADMISSION_OVERFLOW})")
+        if cls.LOG_FORMAT and cls.LOG_FORMAT.lower() not in ("text", "json"):
+            raise ValueError(f"SCAMPER_LOG_FORMAT debe ser text o json (es {cls.LOG_FORMAT})")
+        # Los backends simulados no necesitan API key
+        if cls.LLM_BACKEND == "gemini" and not cls.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY no está configurada. Crear archivo .env con tu API key.")
         return True
 
 # Instancia global
 settings = Settings()
 
-# En settings.py
-API_TIMEOUT = 30  # segundos
-MAX_RETRIES = 3
+# Alias de compatibilidad; la configuración vive en Settings
+API_TIMEOUT = settings.API_TIMEOUT  # segundos
+MAX_RETRIES = settings.MAX_RETRIES
 
 def validate_input(problema: str, contexto: str) -> bool:
     if not problema or len(problema) < 10:
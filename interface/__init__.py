@@ -1,3 +1,5 @@
 from .chatbot import ScamperChatbot, chatbot
+from .batch import BatchRunner
+from .jobs import JobWorkerPool, job_workers
 
-__all__ = ["ScamperChatbot", "chatbot"]
\ No newline at end of file
+__all__ = ["ScamperChatbot", "chatbot", "BatchRunner", "JobWorkerPool", "job_workers"]
\ No newline at end of file
@@ -0,0 +1,375 @@
+import asyncio
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from pydantic import ValidationError
+from models.schemas import UserInput
+from agents.orchestrator import orchestrator
+from config.settings import settings
+from utils.gemini_client import gemini_client
+from utils.log import configure_logging, get_logger
+from utils.loop_monitor import monitored
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.rate_limiter import Priority, SharedRateBudget, priority_scope
+
+logger = get_logger("batch")
+
+def iter_input_rows(path: str, partition: Tuple[int, int] = (0, 1)) -> Iterator[Tuple[int, Union[UserInput, str]]]:
+    """
+    Lee el archivo de entrada fila a fila, sin cargarlo entero en memoria
+
+    Acepta JSONL (un objeto por línea) o CSV (.csv) con columnas problem y context.
+
+    Args:
+        path: Archivo de entrada
+        partition: (índice, total); solo se leen las filas con fila % total == índice
+
+    Yields:
+        Tuplas (número de fila, UserInput o mensaje de error si la fila no es válida)
+    """
+    index, count = partition
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as input_file:
+            for row, record in enumerate(csv.DictReader(input_file)):
+                if row % count == index:
+                    yield row, _build_user_input(record)
+        return
+
+    with open(path, encoding="utf-8") as input_file:
+        row = -1
+        for line in input_file:
+            if not line.strip():
+                continue
+            row += 1
+            # Las filas de otras particiones no se llegan a parsear
+            if row % count != index:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row, f"JSON inválido: {e}"
+            else:
+                yield row, _build_user_input(record)
+
+def _build_user_input(record) -> Union[UserInput, str]:
+    """Convierte una fila en UserInput, o retorna el motivo por el que no es válida"""
+    if not isinstance(record, dict):
+        return "La fila debe ser un objeto con el campo 'problem'"
+    problem = record.get("problem")
+    if not isinstance(problem, str) or not problem.strip():
+        return "Falta el campo 'problem'"
+    context = record.get("context")
+    if isinstance(context, str):
+        context = context.strip() or None  # En CSV una celda vacía equivale a sin contexto
+    try:
+        return UserInput(problem=problem.strip(), context=context)
+    except ValidationError as e:
+        return f"Fila inválida: {e.errors()[0]['msg']}"
+
+def load_checkpoint(path: str) -> Set[int]:
+    """
+    Filas ya escritas en la salida de una ejecución anterior
+
+    Si la ejecución se interrumpió a mitad de una línea, esa línea se descarta
+    para que la fila se vuelva a procesar. Las filas marcadas con "retry" (fallos
+    del modelo, no de la entrada) se quitan de la salida y también se repiten.
+    """
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+
+    valid_size = 0
+    retry_rows = False
+    with open(path, "rb") as output_file:
+        for line in output_file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+                row = record["row"]
+            except (ValueError, KeyError, TypeError):
+                break
+            if record.get("retry"):
+                retry_rows = True
+            else:
+                completed.add(row)
+            valid_size += len(line)
+
+    if retry_rows:
+        _drop_retry_rows(path, valid_size)
+    elif valid_size < os.path.getsize(path):
+        with open(path, "r+b") as output_file:
+            output_file.truncate(valid_size)
+    return completed
+
+def _drop_retry_rows(path: str, valid_size: int):
+    """Reescribe la salida sin las filas a repetir (ni la última línea a medias)"""
+    tmp_path = path + ".tmp"
+    with open(path, "rb") as output_file, open(tmp_path, "wb") as compacted:
+        size = 0
+        for line in output_file:
+            size += len(line)
+            if size > valid_size:
+                break
+            if not json.loads(line).get("retry"):
+                compacted.write(line)
+    os.replace(tmp_path, path)
+
+def format_duration(seconds: float) -> str:
+    """Duración legible (1h02m, 3m05s, 12s)"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+class BatchRunner:
+    """Procesa un archivo de problemas con concurrencia acotada y salida JSONL incremental"""
+
+    def __init__(self, input_path: str, output_path: str, concurrency: Optional[int] = None,
+                 time_budget: Optional[float] = None, progress_interval: float = 10.0,
+                 partition: Tuple[int, int] = (0, 1), done_rows: Optional[Set[int]] = None):
+        """
+        Args:
+            input_path: Archivo JSONL o CSV con los problemas
+            output_path: Archivo JSONL de salida; también sirve de checkpoint para reanudar
+            concurrency: Problemas procesados a la vez (por defecto BATCH_CONCURRENCY)
+            time_budget: Plazo en segundos para cada problema (opcional)
+            progress_interval: Segundos entre informes de progreso
+            partition: (índice, total) de las filas que procesa este runner
+            done_rows: Filas ya completadas fuera de output_path (p. ej. en una salida ya unida)
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = concurrency or settings.BATCH_CONCURRENCY
+        self.time_budget = time_budget
+        self.progress_interval = progress_interval
+        self.partition = partition
+        self.done_rows = done_rows or set()
+        self.label = f"[{partition[0] + 1}/{partition[1]}] " if partition[1] > 1 else ""
+        self.total = 0
+        self.skipped = 0
+        self.processed = 0
+        self.failed = 0
+        self._started = None
+
+    async def run(self) -> Dict[str, int]:
+        """
+        Procesa todas las filas pendientes
+
+        Returns:
+            Contadores de la ejecución (total, ya hechas, procesadas y fallidas)
+        """
+        completed = load_checkpoint(self.output_path) | self.done_rows
+        # Contar filas es una pasada rápida y permite estimar el tiempo restante
+        self.total = sum(1 for _ in iter_input_rows(self.input_path, self.partition))
+        if completed:
+            logger.info("%s↩️ Reanudando: %d filas ya procesadas", self.label, len(completed))
+
+        # Cola acotada: la lectura nunca va muy por delante del procesamiento
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        self._started = time.monotonic()
+
+        # Las tareas creadas dentro heredan la prioridad BATCH
+        with open(self.output_path, "a", encoding="utf-8") as output_file, priority_scope(Priority.BATCH):
+            workers = [asyncio.create_task(self._worker(queue, output_file)) for _ in range(self.concurrency)]
+            progress = asyncio.create_task(self._report_progress())
+            try:
+                for row, item in iter_input_rows(self.input_path, self.partition):
+                    if row in completed:
+                        self.skipped += 1
+                        continue
+                    await queue.put((row, item))
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers + [progress]:
+                    task.cancel()
+
+        self._print_progress()
+        return self.get_stats()
+
+    async def _worker(self, queue: asyncio.Queue, output_file):
+        """Toma filas de la cola y escribe cada respuesta en cuanto está lista"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            row, user_input = item
+
+            if isinstance(user_input, str):
+                record = {"row": row, "error": user_input}
+            else:
+                # Una traza por fila: el atributo row la enlaza con su línea de salida
+                with tracer.trace("batch.row", row=row, input=self.input_path) as span:
+                    try:
+                        response = await orchestrator.process_user_input(user_input, time_budget=self.time_budget)
+                        record = {"row": row, "response": response.model_dump(mode="json")}
+                        failure = response.failure_reason()
+                        if failure:
+                            # Técnicas fallidas o sin terminar (caída del modelo, plazo): la fila se repite al reanudar
+                            record.update(error=failure, retry=True)
+                            span.set_attribute("failure", failure)
+                    except Exception as e:
+                        span.record_error(e)
+                        record = {"row": row, "error": str(e), "retry": True}
+
+            if "error" in record:
+                self.failed += 1
+            # Una línea completa por fila: el checkpoint es la propia salida
+            output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output_file.flush()
+            self.processed += 1
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self._print_progress()
+
+    def _print_progress(self):
+        """Imprime filas hechas, ritmo y tiempo estimado restante"""
+        elapsed = time.monotonic() - self._started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        done = self.skipped + self.processed
+        remaining = max(0, self.total - done)
+        eta = format_duration(remaining / rate) if rate > 0 else "--"
+        logger.info("%s📊 %d/%d filas | %.1f filas/min | %d fallidas | transcurrido %s | ETA %s",
+                    self.label, done, self.total, rate * 60, self.failed, format_duration(elapsed), eta)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "processed": self.processed,
+            "failed": self.failed
+        }
+
+def merge_outputs(output_path: str, shard_paths: List[str]):
+    """
+    Une la salida existente y los fragmentos en output_path, ordenados por fila
+
+    Solo se guarda en memoria la posición de cada línea, no su contenido. Si una
+    fila aparece varias veces gana la primera (primero la salida, luego los
+    fragmentos en orden), así que el resultado es determinista.
+    """
+    sources = [path for path in [output_path] + shard_paths if os.path.exists(path)]
+    index = {}
+    for source, path in enumerate(sources):
+        offset = 0
+        with open(path, "rb") as source_file:
+            for line in source_file:
+                if line.endswith(b"\n"):
+                    try:
+                        row = json.loads(line)["row"]
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                    else:
+                        index.setdefault(row, (source, offset, len(line)))
+                offset += len(line)
+
+    tmp_path = output_path + ".tmp"
+    source_files = [open(path, "rb") for path in sources]
+    try:
+        with open(tmp_path, "wb") as merged:
+            for row in sorted(index):
+                source, offset, length = index[row]
+                source_files[source].seek(offset)
+                merged.write(source_files[source].read(length))
+    finally:
+        for source_file in source_files:
+            source_file.close()
+    os.replace(tmp_path, output_path)
+
+def _run_partition(input_path: str, shard_path: str, partition: Tuple[int, int], done_rows: Set[int],
+                   concurrency: Optional[int], time_budget: Optional[float], budget_path: str) -> Tuple[Dict[str, int], Dict]:
+    """
+    Proceso de trabajo: procesa una partición con el presupuesto por minuto compartido
+
+    Returns:
+        Contadores de la partición y las métricas del proceso, para sumarlas en el padre
+    """
+    # Con spawn el proceso no hereda la configuración del padre
+    configure_logging("batch")
+    gemini_client.scheduler.set_budget(SharedRateBudget(
+        budget_path, settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE
+    ))
+    runner = BatchRunner(input_path, shard_path, concurrency=concurrency, time_budget=time_budget,
+                         partition=partition, done_rows=done_rows)
+    stats = asyncio.run(monitored(runner.run()))
+    tracer.flush()  # el proceso termina en cuanto el padre recoge el resultado
+    return stats, metrics.snapshot()
+
+class ParallelBatchRunner:
+    """Reparte un lote entre varios procesos que comparten una única cuota del proveedor"""
+
+    def __init__(self, input_path: str, output_path: str, workers: int, concurrency: Optional[int] = None,
+                 time_budget: Optional[float] = None):
+        """
+        Args:
+            input_path: Archivo JSONL o CSV con los problemas
+            output_path: Archivo JSONL final, ordenado por fila
+            workers: Número de procesos; el proceso i toma las filas con fila % workers == i
+            concurrency: Problemas simultáneos por proceso
+            time_budget: Plazo en segundos para cada problema (opcional)
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.workers = workers
+        self.concurrency = concurrency
+        self.time_budget = time_budget
+
+    def shard_path(self, index: int) -> str:
+        return f"{self.output_path}.shard-{index}-of-{self.workers}"
+
+    def run(self) -> Dict[str, int]:
+        """
+        Procesa el lote en paralelo y une los fragmentos al terminar
+
+        Returns:
+            Contadores sumados de todos los procesos
+        """
+        # Los fragmentos de una ejecución interrumpida (con cualquier número de procesos)
+        # se unen primero, así las filas ya hechas no se repiten
+        leftover_shards = sorted(glob.glob(glob.escape(self.output_path) + ".shard-*"))
+        for path in [self.output_path] + leftover_shards:
+            load_checkpoint(path)  # descarta la última línea a medias y las filas a repetir
+        if leftover_shards:
+            merge_outputs(self.output_path, leftover_shards)
+            for path in leftover_shards:
+                os.remove(path)
+        done_rows = load_checkpoint(self.output_path)
+        budget_path = self.output_path + ".budget"
+        shard_paths = [self.shard_path(index) for index in range(self.workers)]
+
+        # spawn: el proceso padre ya tiene hilos (pool de Gemini) y fork no es seguro con ellos
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(
+                    _run_partition, self.input_path, shard_paths[index], (index, self.workers),
+                    {row for row in done_rows if row % self.workers == index},
+                    self.concurrency, self.time_budget, budget_path
+                )
+                for index in range(self.workers)
+            ]
+            results = []
+            for future in futures:
+                stats, snapshot = future.result()
+                metrics.merge(snapshot)  # las métricas del lote son las de todos los procesos
+                results.append(stats)
+
+        logger.info("🔗 Uniendo %d fragmentos en %s...", len(shard_paths), self.output_path)
+        merge_outputs(self.output_path, shard_paths)
+        for path in shard_paths + [budget_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+        return {key: sum(result[key] for result in results) for key in results[0]}
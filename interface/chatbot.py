@@ -1,7 +1,8 @@
 import asyncio
 from typing import Optional
-from models.schemas import UserInput, ScamperResponse
+from models.schemas import UserInput, ScamperResponse, ScamperTechnique, ResultStatus
 from agents.orchestrator import orchestrator
+from config.settings import settings
 
 class ScamperChatbot:
     """Interfaz conversacional para el sistema SCAMPER"""
@@ -46,10 +47,14 @@ Describe tu problema o desafío creativo y yo aplicaré todas las técnicas SCAM
                 print("\n🚀 Aplicando técnicas SCAMPER...")
                 print("=" * 50)
                 
-                response = await orchestrator.process_user_input(user_input)
-                
-                # Mostrar resultados
-                self._display_results(response)
+                if settings.ENABLE_STREAMING_OUTPUT:
+                    # Mostrar cada idea en cuanto se genera
+                    await self.stream_problem(user_input)
+                else:
+                    response = await orchestrator.process_user_input(user_input)
+                    
+                    # Mostrar resultados
+                    self._display_results(response)
                 
                 # Preguntar si quiere continuar
                 if not self._ask_continue():
@@ -103,11 +108,21 @@ Describe tu problema o desafío creativo y yo aplicaré todas las técnicas SCAM
             print(f"\n{i}. 🔧 {technique_name}")
             print("-" * 50)
             print(f"💭 {result.explanation}")
+            if result.status != ResultStatus.OK:
+                print(f"\n⚠️ {result.error}")
+                continue
+            if result.stale:
+                print("\n🕰️ El modelo no está disponible: ideas guardadas de una consulta anterior")
             print("\n💡 Ideas generadas:")
             
             for j, idea in enumerate(result.ideas, 1):
                 print(f"   {j}. {idea}")
         
+        self._display_summary(response)
+    
+    def _display_summary(self, response: ScamperResponse):
+        """Muestra el resumen ejecutivo y las estadísticas"""
+        
         # Mostrar resumen
         print("\n" + "=" * 70)
         print("📊 RESUMEN EJECUTIVO")
@@ -116,13 +131,52 @@ Describe tu problema o desafío creativo y yo aplicaré todas las técnicas SCAM
         
         # Estadísticas
         total_ideas = sum(len(result.ideas) for result in response.results)
-        successful_techniques = len([r for r in response.results if not any("Error" in idea for idea in r.ideas)])
+        successful_techniques = len([r for r in response.results if r.status == ResultStatus.OK])
         
         print(f"\n📈 ESTADÍSTICAS:")
         print(f"   • Total de ideas generadas: {total_ideas}")
         print(f"   • Técnicas aplicadas exitosamente: {successful_techniques}/7")
         print(f"   • Promedio de ideas por técnica: {total_ideas/7:.1f}")
     
+    async def stream_problem(self, user_input: UserInput) -> ScamperResponse:
+        """
+        Muestra cada idea en cuanto el modelo la genera
+        
+        Returns:
+            Respuesta completa, una vez terminadas todas las técnicas
+        """
+        print(f"\n🎯 PROBLEMA ANALIZADO:")
+        print(f"   {user_input.problem}")
+        print("\n" + "=" * 70)
+        print("🚀 IDEAS GENERADAS CON SCAMPER (en tiempo real)")
+        print("=" * 70)
+        
+        results = {}
+        summary = ""
+        async for event, payload in orchestrator.stream_user_input(user_input):
+            if event == "idea":
+                technique, idea = payload
+                technique_name = self._get_technique_display_name(technique.value).split(" - ")[0]
+                print(f"   💡 [{technique_name}] {idea}")
+            elif event == "result":
+                results[payload.technique] = payload
+                technique_name = self._get_technique_display_name(payload.technique.value).split(" - ")[0]
+                if payload.status != ResultStatus.OK:
+                    print(f"   ⚠️ [{technique_name}] {payload.error}")
+                else:
+                    # La explicación llega con el resultado, cuando ya se mostraron sus ideas
+                    print(f"   💭 [{technique_name}] {payload.explanation}")
+            elif event == "summary":
+                summary = payload
+        
+        response = ScamperResponse(
+            original_problem=user_input.problem,
+            results=[results[technique] for technique in ScamperTechnique if technique in results],
+            summary=summary
+        )
+        self._display_summary(response)
+        return response
+    
     def _get_technique_display_name(self, technique: str) -> str:
         """Convierte el nombre técnico a nombre para mostrar"""
         display_names = {
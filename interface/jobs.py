@@ -0,0 +1,239 @@
+import asyncio
+import os
+import secrets
+import socket
+import threading
+from typing import List, Optional
+
+from models.schemas import ScamperResponse, ScamperTechnique
+from agents.orchestrator import orchestrator
+from config.settings import settings
+from utils.job_queue import ClaimedJob, JobStore, job_store
+from utils.log import get_logger
+from utils.metrics import JOB_QUEUE_WAIT, JOBS_FINISHED
+from utils.rate_limiter import Priority, priority_scope
+from utils.tracing import tracer
+
+logger = get_logger("jobs")
+
+_TECHNIQUE_ORDER = {technique: index for index, technique in enumerate(ScamperTechnique)}
+
+class JobWorkerPool:
+    """
+    Workers que drenan la cola de trabajos de /api/jobs
+
+    Cada worker reclama un trabajo, lo analiza con el orquestador en streaming
+    y guarda la respuesta parcial cada vez que termina una técnica, de modo que
+    GET /api/jobs/<id> muestra el progreso. Los análisis usan la prioridad de
+    lote: las peticiones síncronas de la web pasan antes en el planificador.
+    """
+
+    def __init__(self, store: JobStore = None, workers: Optional[int] = None, poll_interval: Optional[float] = None):
+        """
+        Args:
+            store: Cola de trabajos (por defecto la global)
+            workers: Análisis simultáneos (por defecto JOB_WORKERS)
+            poll_interval: Segundos entre consultas de un worker ocioso (por defecto JOB_POLL_INTERVAL)
+        """
+        self.store = store or job_store
+        self.workers = workers if workers is not None else settings.JOB_WORKERS
+        self.poll_interval = poll_interval if poll_interval is not None else settings.JOB_POLL_INTERVAL
+        # Identifica a los workers de este proceso en la cola (y los distingue de un proceso anterior con el mismo pid)
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._main: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._main is not None and not self._main.done()
+
+    async def run(self):
+        """Ejecuta los workers en el bucle actual hasta que se cancele; los trabajos a medias vuelven a la cola"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Los workers de trabajos ya están en marcha")
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._main = asyncio.current_task()
+        purged = await asyncio.to_thread(self.store.purge)
+        if purged:
+            logger.info("🧹 %d trabajos terminados borrados de la cola", purged)
+        logger.info("Workers de trabajos en marcha: %d", self.workers, extra={"workers": self.workers})
+        tasks = [asyncio.create_task(self._work(index)) for index in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self) -> bool:
+        """
+        Arranca los workers en un hilo con su propio bucle de eventos, si no lo estaban ya
+
+        Lo usa la app Flask, que no tiene un bucle propio entre peticiones.
+
+        Returns:
+            True si los workers están en marcha (False con JOB_WORKERS = 0)
+        """
+        with self._lock:
+            if self.workers <= 0:
+                return False
+            if self._thread is not None or self.running:
+                return True
+            started = threading.Event()
+
+            async def main():
+                started.set()
+                await self.run()
+
+            def target():
+                try:
+                    asyncio.run(main())
+                except asyncio.CancelledError:
+                    pass
+
+            self._thread = threading.Thread(target=target, name="scamper-jobs", daemon=True)
+            self._thread.start()
+        started.wait(5)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Detiene los workers (desde otro hilo) y espera a que devuelvan a la cola lo que tenían a medias"""
+        loop, main, thread = self._loop, self._main, self._thread
+        if loop is not None and main is not None:
+            try:
+                loop.call_soon_threadsafe(main.cancel)
+            except RuntimeError:
+                pass  # El bucle ya se cerró
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def notify(self):
+        """Avisa a los workers ociosos de que hay un trabajo nuevo (sin esperar a la siguiente consulta)"""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            pass
+
+    async def _work(self, index: int):
+        worker = f"{self._worker_prefix}:{index}"
+        with priority_scope(Priority.BATCH):
+            while True:
+                job = await self._claim(worker)
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run_job(job, worker)
+
+    async def _claim(self, worker: str) -> Optional[ClaimedJob]:
+        """Reclama un trabajo en un hilo; si se cancela a mitad, lo que se llegó a reclamar vuelve a la cola"""
+        claim = asyncio.ensure_future(asyncio.to_thread(self.store.claim, worker))
+        try:
+            return await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            # El hilo sigue hasta confirmar la transacción: sin esto el trabajo quedaría en curso hasta que venza su plazo
+            try:
+                job = await claim
+            except Exception:
+                job = None
+            if job is not None:
+                self.store.release(job.id, worker)
+            raise
+
+    async def _run_job(self, job: ClaimedJob, worker: str):
+        """Analiza un trabajo guardando el progreso; si se cancela, lo devuelve a la cola"""
+        JOB_QUEUE_WAIT.observe(job.queued_seconds)
+        heartbeat = asyncio.create_task(self._heartbeat(job, worker))
+        try:
+            with tracer.trace("job.run", job_id=job.id, attempt=job.attempt):
+                response = await self._analyze(job, worker)
+        except asyncio.CancelledError:
+            # Parada del proceso: otro worker (o este mismo al volver) lo retoma sin gastar un intento
+            self.store.release(job.id, worker)
+            raise
+        except Exception as e:
+            logger.exception("Error en el trabajo %s: %s", job.id, e, extra={"job_id": job.id})
+            if await asyncio.to_thread(self.store.fail, job.id, worker, str(e) or type(e).__name__):
+                self.failed += 1
+                JOBS_FINISHED.inc(status="failed")
+            return
+        finally:
+            heartbeat.cancel()
+
+        if response is None:
+            return
+        failure = response.failure_reason()
+        if failure:
+            # Los agentes devuelven los errores del modelo como técnicas fallidas, sin excepción
+            logger.warning("Trabajo %s incompleto: %s", job.id, failure, extra={"job_id": job.id})
+            if await asyncio.to_thread(self.store.fail, job.id, worker, failure, response):
+                self.failed += 1
+                JOBS_FINISHED.inc(status="failed")
+            return
+        if await asyncio.to_thread(self.store.complete, job.id, worker, response):
+            self.completed += 1
+            JOBS_FINISHED.inc(status="done")
+            logger.info("✅ Trabajo %s completado", job.id, extra={"job_id": job.id, "attempt": job.attempt})
+
+    async def _analyze(self, job: ClaimedJob, worker: str) -> Optional[ScamperResponse]:
+        """
+        Análisis en streaming con la respuesta parcial guardada tras cada técnica
+
+        Returns:
+            La respuesta completa, o None si el trabajo dejó de ser de este worker
+        """
+        user_input = job.user_input
+        results: List = []
+        summary = ""
+        events = orchestrator.stream_user_input(user_input)
+        try:
+            async for event, payload in events:
+                if event == "result":
+                    results.append(payload)
+                    partial = ScamperResponse(original_problem=user_input.problem, results=self._ordered(results),
+                                              summary="", partial=True)
+                    if not await asyncio.to_thread(self.store.heartbeat, job.id, worker, partial):
+                        logger.warning("El trabajo %s pasó a otro worker; se abandona", job.id, extra={"job_id": job.id})
+                        return None
+                elif event == "summary":
+                    summary = payload
+        finally:
+            # Cerrar el stream cancela los agentes que queden si se abandona a mitad
+            await events.aclose()
+        return ScamperResponse(original_problem=user_input.problem, results=self._ordered(results), summary=summary)
+
+    async def _heartbeat(self, job: ClaimedJob, worker: str):
+        """Renueva el plazo del trabajo aunque ninguna técnica termine en mucho tiempo"""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            await asyncio.to_thread(self.store.heartbeat, job.id, worker)
+
+    def _ordered(self, results: List) -> List:
+        # Las técnicas terminan en cualquier orden; la respuesta las lista como /api/scamper
+        return sorted(results, key=lambda result: _TECHNIQUE_ORDER[result.technique])
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue": self.store.counts(),
+        }
+
+# Instancia global
+job_workers = JobWorkerPool()
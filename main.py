@@ -5,9 +5,11 @@ Potencia tu creatividad con técnicas de innovación sistemática
 """
 
 import asyncio
+import json
 import sys
-from config.settings import settings
-from interface.chatbot import chatbot
+
+# Los módulos del sistema (pydantic, agentes, SDK de Gemini) se importan dentro
+# de cada modo: así --help, --version y los procesos auxiliares arrancan rápido
 
 def print_banner():
     """Imprime el banner del sistema"""
@@ -25,6 +27,8 @@ def print_banner():
 
 def validate_environment():
     """Valida que el entorno esté configurado correctamente"""
+    from config.settings import settings
+    
     try:
         settings.validate()
         print("✅ Configuración validada correctamente")
@@ -39,6 +43,12 @@ def validate_environment():
 
 async def main():
     """Función principal del sistema"""
+    from config.settings import settings
+    from interface.chatbot import chatbot
+    from utils.log import configure_logging
+    from utils.loop_monitor import loop_monitor
+    
+    configure_logging("cli")
     print_banner()
     
     # Validar configuración
@@ -47,13 +57,16 @@ async def main():
     
     # Mostrar información del sistema
     print(f"🤖 Modelo: {settings.GEMINI_MODEL}")
+    if settings.LLM_BACKEND != "gemini":
+        print(f"🧪 Backend simulado: {settings.LLM_BACKEND}")
     print(f"🎛️  Temperatura: {settings.GEMINI_TEMPERATURE}")
     print(f"💭 Ideas máximas por técnica: {settings.MAX_IDEAS_PER_TECHNIQUE}")
     print(f"⚡ Ejecución paralela: {'Habilitada' if settings.ENABLE_PARALLEL_EXECUTION else 'Deshabilitada'}")
     
     try:
-        # Iniciar chatbot
-        await chatbot.start_conversation()
+        # Iniciar chatbot (con SCAMPER_LOOP_MONITOR=1 se vigilan los bloqueos del bucle de eventos)
+        async with loop_monitor.watch():
+            await chatbot.start_conversation()
         
     except KeyboardInterrupt:
         print("\n\n👋 Sistema cerrado por el usuario")
@@ -63,6 +76,11 @@ async def main():
 
 def run_demo():
     """Ejecuta una demostración rápida del sistema"""
+    from interface.chatbot import chatbot
+    from utils.log import configure_logging
+    from utils.loop_monitor import monitored
+    
+    configure_logging("cli")
     print_banner()
     print("🚀 MODO DEMOSTRACIÓN")
     print("=" * 50)
@@ -86,18 +104,169 @@ def run_demo():
         except Exception as e:
             print(f"❌ Error en demostración: {e}")
     
-    asyncio.run(demo())
+    asyncio.run(monitored(demo()))
+
+def run_cache_warmup(path: str):
+    """Pre-carga la caché de ideas con los problemas de un archivo JSONL"""
+    from config.settings import settings
+    from models.schemas import UserInput, ScamperTechnique
+    from utils.gemini_client import gemini_client
+    from utils.errors import LLMError
+    from utils.log import configure_logging
+    from utils.rate_limiter import Priority, priority_scope
+    
+    configure_logging("cli")
+    print_banner()
+    print("🔥 PRECARGA DE CACHÉ")
+    print("=" * 50)
+    
+    async def warmup():
+        # Validar configuración
+        if not validate_environment():
+            return
+        
+        # Cada línea: {"problem": "...", "context": "..."}
+        problems = []
+        with open(path, encoding="utf-8") as input_file:
+            for line_number, line in enumerate(input_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    problems.append(UserInput(**json.loads(line)))
+                except Exception as e:
+                    print(f"⚠️  Línea {line_number} ignorada: {e}")
+        
+        print(f"📝 Problemas a precargar: {len(problems)}")
+        semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+        failures = 0
+        
+        async def warm_technique(user_input: UserInput, technique: ScamperTechnique):
+            nonlocal failures
+            async with semaphore:
+                try:
+                    await gemini_client.generate_scamper_ideas(
+                        technique=technique.value,
+                        problem=user_input.problem,
+                        context=user_input.context
+                    )
+                except LLMError as e:
+                    failures += 1
+                    print(f"⚠️ {technique.value}: {e}")
+        
+        # La precarga cede el paso a las peticiones interactivas del mismo proceso
+        with priority_scope(Priority.BATCH):
+            await asyncio.gather(*[
+                warm_technique(user_input, technique)
+                for user_input in problems
+                for technique in ScamperTechnique
+            ])
+        
+        stats = gemini_client.cache.get_stats()
+        print(f"✅ Caché precargada: {stats['misses']} técnicas generadas, "
+              f"{stats['memory_hits'] + stats['disk_hits']} ya estaban en caché, {failures} fallidas")
+    
+    asyncio.run(warmup())
+
+def run_batch(input_path: str, output_path: str, concurrency: int = None, time_budget: float = None,
+              workers: int = 1, metrics_path: str = None):
+    """Procesa un archivo JSONL/CSV de problemas escribiendo las respuestas en JSONL"""
+    from interface.batch import BatchRunner, ParallelBatchRunner
+    from utils.log import configure_logging
+    from utils.loop_monitor import monitored
+    from utils.metrics import metrics
+    
+    # El progreso del lote se registra en stderr; el detalle de cada fila solo con SCAMPER_LOG_LEVEL
+    configure_logging("batch")
+    
+    print("📦 PROCESAMIENTO POR LOTES")
+    print("=" * 50)
+    
+    if not validate_environment():
+        sys.exit(1)
+    
+    try:
+        if workers > 1:
+            print(f"⚙️ {workers} procesos con cuota compartida")
+            runner = ParallelBatchRunner(input_path, output_path, workers, concurrency=concurrency, time_budget=time_budget)
+            stats = runner.run()
+        else:
+            runner = BatchRunner(input_path, output_path, concurrency=concurrency, time_budget=time_budget)
+            stats = asyncio.run(monitored(runner.run()))
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrumpido: vuelve a ejecutar el mismo comando para continuar desde {output_path}")
+        sys.exit(130)
+    
+    print(f"✅ Lote terminado: {stats['processed']} filas procesadas "
+          f"({stats['failed']} fallidas, {stats['skipped']} ya estaban hechas)")
+    
+    if metrics_path:
+        with open(metrics_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(metrics.render())
+        print(f"📈 Métricas guardadas en {metrics_path}")
+
+def run_job_worker(concurrency: int = None):
+    """Drena la cola de /api/jobs en un proceso aparte del servidor web"""
+    from config.settings import settings
+    from interface.jobs import JobWorkerPool
+    from utils.log import configure_logging
+    from utils.loop_monitor import monitored
+    
+    configure_logging("batch")
+    
+    print("🗂️ WORKER DE TRABAJOS")
+    print("=" * 50)
+    
+    if not validate_environment():
+        sys.exit(1)
+    
+    # Con SCAMPER_JOB_WORKERS=0 el servidor solo encola y este proceso analiza
+    pool = JobWorkerPool(workers=concurrency or settings.JOB_WORKERS or 1)
+    print(f"⚙️ {pool.workers} análisis simultáneos de {settings.JOBS_DB_PATH}")
+    try:
+        asyncio.run(monitored(pool.run()))
+    except KeyboardInterrupt:
+        # Los trabajos a medias vuelven a la cola
+        print("\n👋 Worker detenido")
+
+def show_traces(path: str, count: int = 5):
+    """Imprime el árbol de spans de las trazas más lentas de un archivo JSONL"""
+    from utils.tracing import format_trace, load_traces, slowest_traces
+    
+    traces = load_traces(path)
+    print(f"🔎 {len(traces)} trazas en {path}; las {min(count, len(traces))} más lentas:")
+    for spans in slowest_traces(traces, count):
+        print(f"\ntraza {spans[0]['trace_id']}")
+        print(format_trace(spans))
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Sistema Multi-Agente SCAMPER")
     parser.add_argument("--demo", action="store_true", help="Ejecutar demostración")
+    parser.add_argument("--warm-cache", metavar="JSONL", help="Precargar la caché con los problemas de un archivo JSONL")
+    parser.add_argument("--batch", metavar="INPUT", help="Procesar los problemas de un archivo JSONL o CSV")
+    parser.add_argument("--out", metavar="OUTPUT", help="Archivo JSONL de salida del modo --batch (permite reanudar)")
+    parser.add_argument("--job-worker", action="store_true", help="Procesar la cola de trabajos de /api/jobs")
+    parser.add_argument("--concurrency", type=int, help="Problemas simultáneos en los modos --batch y --job-worker")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos del modo --batch (comparten la cuota de Gemini)")
+    parser.add_argument("--row-deadline", type=float, metavar="SECONDS", help="Plazo por problema en el modo --batch")
+    parser.add_argument("--metrics", metavar="FILE", help="Guardar las métricas (formato Prometheus) al terminar el modo --batch")
+    parser.add_argument("--traces", metavar="JSONL", help="Mostrar las trazas más lentas de un archivo (SCAMPER_TRACING=jsonl)")
     parser.add_argument("--version", action="version", version="SCAMPER System v1.0")
     
     args = parser.parse_args()
+    if args.batch and not args.out:
+        parser.error("--batch requiere --out")
     
     if args.demo:
         run_demo()
+    elif args.warm_cache:
+        run_cache_warmup(args.warm_cache)
+    elif args.traces:
+        show_traces(args.traces)
+    elif args.job_worker:
+        run_job_worker(args.concurrency)
+    elif args.batch:
+        run_batch(args.batch, args.out, args.concurrency, args.row_deadline, args.workers, args.metrics)
     else:
         asyncio.run(main())
\ No newline at end of file
@@ -12,6 +12,12 @@ class ScamperTechnique(str, Enum):
     ELIMINATE = "eliminate"
     REVERSE = "reverse"
 
+class ResultStatus(str, Enum):
+    """Estado del resultado de una técnica SCAMPER"""
+    OK = "ok"
+    ERROR = "error"
+    TIMEOUT = "timeout"  # no terminó antes del plazo de la petición
+
 class UserInput(BaseModel):
     """Entrada del usuario con el problema a resolver"""
     problem: str = Field(..., description="Descripción del problema o desafío creativo")
@@ -22,12 +28,32 @@ class ScamperResult(BaseModel):
     technique: ScamperTechnique = Field(..., description="Técnica SCAMPER utilizada")
     ideas: List[str] = Field(..., description="Lista de ideas generadas")
     explanation: str = Field(..., description="Explicación de cómo se aplicó la técnica")
+    status: ResultStatus = Field(ResultStatus.OK, description="Estado de la técnica")
+    error_type: Optional[str] = Field(None, description="Tipo de error (timeout, rate_limited, unavailable, ...)")
+    error: Optional[str] = Field(None, description="Detalle del error si la técnica falló")
+    stale: bool = Field(False, description="Ideas de la caché caducada, servidas porque el modelo no estaba disponible")
 
 class ScamperResponse(BaseModel):
     """Respuesta completa del sistema SCAMPER"""
     original_problem: str = Field(..., description="Problema original del usuario")
     results: List[ScamperResult] = Field(..., description="Resultados de cada técnica SCAMPER")
     summary: str = Field(..., description="Resumen ejecutivo de todas las ideas")
+    partial: bool = Field(False, description="Alguna técnica no terminó antes del plazo")
+
+    def failure_reason(self) -> Optional[str]:
+        """
+        Motivo por el que la respuesta no vale como resultado final, o None si todas las técnicas terminaron bien
+
+        Los agentes convierten los fallos del modelo en resultados con estado de error,
+        así que una caída del proveedor no lanza excepción: el lote y los trabajos lo comprueban aquí.
+        """
+        if not self.results:
+            return "Ninguna técnica generó ideas"
+        failed = [result for result in self.results if result.status != ResultStatus.OK]
+        if not failed:
+            return None
+        techniques = ", ".join(result.technique.value for result in failed)
+        return f"{len(failed)} de {len(self.results)} técnicas no terminaron ({techniques}): {failed[0].error or failed[0].status.value}"
 
 class AgentMessage(BaseModel):
     """Mensaje entre agentes"""
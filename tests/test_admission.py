@@ -0,0 +1,197 @@
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch, AsyncMock
+
+# Add project root to Python path to allow imports from utils, config, webapp
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.testclient import TestClient
+from werkzeug.test import EnvironBuilder
+
+from config.settings import settings
+from interface.jobs import JobWorkerPool
+from models.schemas import ScamperResponse
+from utils.admission import IN_FLIGHT, UPSTREAM_QUEUE, AdmissionController
+from utils.job_queue import QUEUED, JobStore
+from utils.metrics import HTTP_SHED
+from utils.rate_limiter import Priority, RequestScheduler
+from webapp.app import app as flask_app
+from webapp.asgi import app as asgi_app
+
+PAYLOAD = {"problem": "Reducir las colas en el comedor", "context": "Universidad"}
+
+
+class AdmissionControllerTests(unittest.TestCase):
+
+    def test_in_flight_limit_frees_slots_on_release(self):
+        controller = AdmissionController(max_in_flight=2, max_queue_depth=0)
+        first, second = controller.admit(), controller.admit()
+        self.assertTrue(first.admitted and second.admitted)
+
+        rejected = controller.admit()
+        self.assertFalse(rejected.admitted)
+        self.assertEqual(rejected.reason, IN_FLIGHT)
+
+        first.release()
+        first.release()  # idempotent
+        rejected.release()  # no slot to give back
+        self.assertEqual(controller.in_flight, 1)
+        with controller.admit() as ticket:
+            self.assertTrue(ticket.admitted)
+        self.assertEqual(controller.in_flight, 1)
+        self.assertEqual(controller.get_stats()["rejected"], {IN_FLIGHT: 1, UPSTREAM_QUEUE: 0})
+
+    def test_upstream_queue_depth_limit(self):
+        depth = [3]
+        controller = AdmissionController(max_in_flight=0, max_queue_depth=3, queue_depth=lambda: depth[0])
+        ticket = controller.admit()
+        self.assertEqual((ticket.admitted, ticket.reason), (False, UPSTREAM_QUEUE))
+
+        depth[0] = 2
+        self.assertTrue(controller.admit().admitted)
+
+    def test_only_interactive_waiters_count_as_queue_depth(self):
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=1)
+
+        async def scenario():
+            permit = await scheduler.acquire()
+            waiters = [asyncio.create_task(scheduler.acquire(priority=priority))
+                       for priority in (Priority.BATCH, Priority.BATCH, Priority.INTERACTIVE)]
+            await asyncio.sleep(0.01)
+            depths = (scheduler.queue_depth(), scheduler.queue_depth(Priority.INTERACTIVE))
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            permit.release()
+            return depths
+
+        self.assertEqual(asyncio.run(scenario()), (3, 1))
+
+    def test_default_queue_depth_reads_the_client_scheduler(self):
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=4)
+        with patch('utils.admission.gemini_client.scheduler', scheduler), \
+                patch.object(scheduler, 'queue_depth', return_value=10) as queue_depth:
+            ticket = AdmissionController(max_in_flight=0, max_queue_depth=10).admit()
+        self.assertEqual(ticket.reason, UPSTREAM_QUEUE)
+        queue_depth.assert_called_once_with(Priority.INTERACTIVE)
+
+
+class SheddingEndpointTests(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AdmissionController(max_in_flight=1, max_queue_depth=0)
+        patcher = patch('webapp.common.admission', self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def shed_count(self, endpoint, action):
+        return HTTP_SHED.value(endpoint=endpoint, reason=IN_FLIGHT, action=action)
+
+    def check_rejects_when_full(self, client):
+        before = self.shed_count('/api/scamper', 'rejected')
+        with self.controller.admit():
+            start = time.perf_counter()
+            response = client.post('/api/scamper', json=PAYLOAD)
+            self.assertLess(time.perf_counter() - start, 1.0)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers['Retry-After'], str(settings.ADMISSION_RETRY_AFTER_SECONDS))
+
+            response = client.post('/api/scamper/stream', json=PAYLOAD)
+            self.assertEqual(response.status_code, 429)
+            # Validation still comes first on the stream endpoint
+            self.assertEqual(client.post('/api/scamper/stream', json={"problem": "x"}).status_code, 400)
+        self.assertEqual(self.shed_count('/api/scamper', 'rejected'), before + 1)
+        self.assertEqual(self.controller.in_flight, 0)
+
+    def check_admitted_requests_release_their_slot(self, client):
+        response_model = ScamperResponse(original_problem=PAYLOAD["problem"], results=[], summary="ok")
+        with patch('agents.orchestrator.orchestrator.process_user_input', new_callable=AsyncMock,
+                   return_value=response_model):
+            self.assertEqual(client.post('/api/scamper', json=PAYLOAD).status_code, 200)
+            self.assertEqual(client.post('/api/scamper', json=PAYLOAD).status_code, 200)
+
+        async def events(user_input):
+            yield "summary", "ok"
+
+        with patch('agents.orchestrator.orchestrator.stream_user_input', events):
+            response = client.post('/api/scamper/stream', json=PAYLOAD)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("event: done", response.text if hasattr(response, 'text') else response.get_data(as_text=True))
+        self.assertEqual(self.controller.in_flight, 0)
+        self.assertEqual(self.controller.admitted, 3)
+
+    def test_flask_sheds_over_the_limit(self):
+        flask_app.testing = True
+        self.check_rejects_when_full(flask_app.test_client())
+
+    def test_asgi_sheds_over_the_limit(self):
+        self.check_rejects_when_full(TestClient(asgi_app))
+
+    def test_flask_admitted_requests_release_their_slot(self):
+        flask_app.testing = True
+        self.check_admitted_requests_release_their_slot(flask_app.test_client())
+
+    def test_asgi_admitted_requests_release_their_slot(self):
+        self.check_admitted_requests_release_their_slot(TestClient(asgi_app))
+
+    def test_flask_stream_closed_unread_releases_its_slot(self):
+        flask_app.testing = True
+
+        async def events(user_input):
+            yield "summary", "ok"
+
+        # Called as a WSGI app directly: the test client would already start the body
+        environ = EnvironBuilder(path='/api/scamper/stream', method='POST', json=PAYLOAD).get_environ()
+        with patch('agents.orchestrator.orchestrator.stream_user_input', events):
+            body = flask_app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+            self.assertEqual(self.controller.in_flight, 1)
+            body.close()
+        self.assertEqual(self.controller.in_flight, 0)
+
+
+class OverflowToJobsTests(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = JobStore(os.path.join(directory.name, "jobs.sqlite3"))
+        self.controller = AdmissionController(max_in_flight=0, max_queue_depth=1, queue_depth=lambda: 5)
+        patches = [
+            patch.object(settings, 'ADMISSION_OVERFLOW', 'job'),
+            patch('webapp.common.admission', self.controller),
+            patch('webapp.common.job_store', self.store),
+            # No workers: the test only checks the request lands in the queue
+            patch('webapp.common.job_workers', JobWorkerPool(self.store, workers=0)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def check_overflow(self, client):
+        before = HTTP_SHED.value(endpoint='/api/scamper', reason=UPSTREAM_QUEUE, action='job')
+        response = client.post('/api/scamper', json=PAYLOAD)
+        self.assertEqual(response.status_code, 202)
+        body = response.json() if callable(response.json) else response.json
+        self.assertEqual(response.headers['Location'], body['status_url'])
+        self.assertEqual(self.store.get(body['id'])['status'], QUEUED)
+        self.assertEqual(HTTP_SHED.value(endpoint='/api/scamper', reason=UPSTREAM_QUEUE, action='job'), before + 1)
+
+        # The stream endpoint still answers 429, and an invalid payload is not queued
+        self.assertEqual(client.post('/api/scamper/stream', json=PAYLOAD).status_code, 429)
+        self.assertEqual(client.post('/api/scamper', json={"problem": "x"}).status_code, 400)
+        self.assertEqual(self.store.counts()[QUEUED], 1)
+
+    def test_flask_routes_overflow_to_the_job_queue(self):
+        flask_app.testing = True
+        self.check_overflow(flask_app.test_client())
+
+    def test_asgi_routes_overflow_to_the_job_queue(self):
+        self.check_overflow(TestClient(asgi_app))
+
+
+if __name__ == '__main__':
+    unittest.main()
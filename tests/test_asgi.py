@@ -0,0 +1,79 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch, AsyncMock
+
+# Add project root to Python path to allow imports from webapp, agents, models
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.testclient import TestClient
+
+from webapp.asgi import app
+from models.schemas import ScamperResponse, ScamperResult, ScamperTechnique
+
+
+class AsgiAppTests(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_index_renders_shared_template(self):
+        response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/static/js/script.js', response.text)
+        self.assertEqual(self.client.get('/static/js/script.js').status_code, 200)
+
+    @patch('webapp.asgi.orchestrator.process_user_input', new_callable=AsyncMock)
+    def test_scamper_api_success(self, mock_process_user_input):
+        mock_process_user_input.return_value = ScamperResponse(
+            original_problem="Test problem",
+            results=[ScamperResult(technique=ScamperTechnique.SUBSTITUTE, explanation="Substituted.", ideas=["Idea 1"])],
+            summary="Test summary"
+        )
+
+        response = self.client.post('/api/scamper', json={"problem": "Test problem", "context": "Test context"})
+
+        self.assertEqual(response.status_code, 200)
+        response_data = response.json()
+        self.assertEqual(response_data['original_problem'], "Test problem")
+        self.assertEqual(response_data['results'][0]['technique'], "substitute")
+        self.assertEqual(response_data['summary'], "Test summary")
+        mock_process_user_input.assert_called_once()
+
+    def test_scamper_api_validation_matches_flask(self):
+        response = self.client.post('/api/scamper', json={"context": "Test context"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("El campo 'problem' es obligatorio", response.json()['error'])
+
+        response = self.client.post('/api/scamper', json={"problem": "Valid problem", "context": 123})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("El contexto debe ser un texto", response.json()['error'])
+
+    @patch('webapp.asgi.orchestrator.process_user_input', new_callable=AsyncMock)
+    def test_scamper_api_orchestrator_exception(self, mock_process_user_input):
+        mock_process_user_input.side_effect = Exception("Orchestrator failed")
+
+        response = self.client.post('/api/scamper', json={"problem": "A valid problem for this test"})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("Ocurrió un error procesando tu solicitud", response.json()['error'])
+
+    @patch('webapp.asgi.orchestrator.stream_user_input')
+    def test_scamper_stream(self, mock_stream_user_input):
+        async def fake_stream(user_input):
+            yield "idea", (ScamperTechnique.COMBINE, "Idea A")
+            yield "result", ScamperResult(technique=ScamperTechnique.COMBINE, explanation="Combined.", ideas=["Idea A"])
+            yield "summary", "Test summary"
+        mock_stream_user_input.side_effect = fake_stream
+
+        response = self.client.post('/api/scamper/stream', json={"problem": "Test problem"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['content-type'].startswith('text/event-stream'))
+        events = [frame.split('\n')[0][len('event: '):] for frame in response.text.strip().split('\n\n')]
+        self.assertEqual(events, ["start", "idea", "result", "summary", "done"])
+
+
+if __name__ == '__main__':
+    unittest.main()
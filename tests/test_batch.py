@@ -0,0 +1,182 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from interface, models
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import ScamperResponse, ScamperResult, ScamperTechnique
+from interface.batch import BatchRunner, iter_input_rows, load_checkpoint, merge_outputs
+from utils.circuit_breaker import CircuitBreaker
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.rate_limiter import RequestScheduler
+
+
+class FakeOrchestrator:
+    """Records which problems were processed and how many ran at once."""
+
+    def __init__(self, latency=0.01):
+        self.latency = latency
+        self.problems = []
+        self.active = 0
+        self.max_active = 0
+
+    async def process_user_input(self, user_input, time_budget=None):
+        self.problems.append(user_input.problem)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.latency)
+        self.active -= 1
+        result = ScamperResult(technique=ScamperTechnique.SUBSTITUTE, ideas=["Idea"], explanation="Explicación")
+        return ScamperResponse(original_problem=user_input.problem, results=[result], summary="Resumen")
+
+
+class BatchRunnerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.output_path = os.path.join(self.tmpdir.name, "out.jsonl")
+
+    def write_input(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as input_file:
+            input_file.write(content)
+        return path
+
+    def write_jsonl_input(self, count):
+        lines = [json.dumps({"problem": f"Problema número {i}"}) for i in range(count)]
+        return self.write_input("in.jsonl", "\n".join(lines) + "\n")
+
+    def run_batch(self, input_path, fake, concurrency=3):
+        runner = BatchRunner(input_path, self.output_path, concurrency=concurrency, progress_interval=60)
+        with patch('interface.batch.orchestrator', fake):
+            return asyncio.run(runner.run())
+
+    def read_output(self):
+        with open(self.output_path, encoding="utf-8") as output_file:
+            return [json.loads(line) for line in output_file]
+
+    def test_processes_every_row_with_bounded_concurrency(self):
+        input_path = self.write_jsonl_input(10)
+        fake = FakeOrchestrator()
+        stats = self.run_batch(input_path, fake, concurrency=3)
+
+        self.assertEqual(stats["processed"], 10)
+        self.assertEqual(fake.max_active, 3)
+        rows = self.read_output()
+        self.assertEqual(sorted(record["row"] for record in rows), list(range(10)))
+        self.assertEqual(rows[0]["response"]["summary"], "Resumen")
+
+    def test_resumes_after_interruption(self):
+        input_path = self.write_jsonl_input(6)
+        # A previous run wrote rows 0 and 3, and was killed while writing row 1
+        with open(self.output_path, "w", encoding="utf-8") as output_file:
+            output_file.write(json.dumps({"row": 0, "response": {}}) + "\n")
+            output_file.write(json.dumps({"row": 3, "response": {}}) + "\n")
+            output_file.write('{"row": 1, "resp')
+
+        fake = FakeOrchestrator()
+        stats = self.run_batch(input_path, fake)
+
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(sorted(fake.problems), [f"Problema número {i}" for i in (1, 2, 4, 5)])
+        self.assertEqual(sorted(record["row"] for record in self.read_output()), list(range(6)))
+
+    def test_invalid_rows_are_reported_not_fatal(self):
+        input_path = self.write_input("in.jsonl", '{"problem": "Problema válido"}\n{no es json\n\n{"context": "sin problema"}\n')
+        stats = self.run_batch(input_path, FakeOrchestrator())
+
+        self.assertEqual(stats["processed"], 3)
+        self.assertEqual(stats["failed"], 2)
+        errors = {record["row"]: record.get("error") for record in self.read_output()}
+        self.assertIsNone(errors[0])
+        self.assertIn("JSON inválido", errors[1])
+        self.assertIn("problem", errors[2])
+
+    def test_rows_whose_techniques_failed_are_retried_on_resume(self):
+        input_path = self.write_jsonl_input(3)
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        # The agents turn every upstream error into an error result, so the orchestrator never raises
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),
+            patch.object(settings, 'ENABLE_CACHE', False),
+            patch.object(settings, 'ENABLE_SEMANTIC_CACHE', False),
+            patch.object(settings, 'MAX_RETRIES', 0),
+            patch.object(gemini_client, 'model', StubBackend(latency_ms=1, distribution="fixed", error_rate=1.0)),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(gemini_client, 'breaker', CircuitBreaker()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        runner = BatchRunner(input_path, self.output_path, concurrency=3, progress_interval=60)
+        stats = asyncio.run(runner.run())
+
+        self.assertEqual((stats["processed"], stats["failed"]), (3, 3))
+        records = self.read_output()
+        self.assertTrue(all(record["retry"] and record["error"] for record in records))
+        self.assertEqual(len(records[0]["response"]["results"]), len(ScamperTechnique))
+        self.assertEqual(load_checkpoint(self.output_path), set())
+
+        # Once the provider is back, resuming redoes those rows and the output keeps one line per row
+        fake = FakeOrchestrator()
+        stats = self.run_batch(input_path, fake)
+        self.assertEqual((stats["skipped"], stats["processed"], stats["failed"]), (0, 3, 0))
+        records = self.read_output()
+        self.assertEqual(sorted(record["row"] for record in records), [0, 1, 2])
+        self.assertTrue(all("error" not in record for record in records))
+
+    def test_checkpoint_keeps_input_errors_and_drops_retryable_rows(self):
+        with open(self.output_path, "w", encoding="utf-8") as output_file:
+            output_file.write('{"row": 0}\n{"row": 1, "error": "Falta el campo", "retry": false}\n'
+                              '{"row": 2, "error": "503", "retry": true}\n{"row": 3}\n{"row"')
+
+        self.assertEqual(load_checkpoint(self.output_path), {0, 1, 3})
+        with open(self.output_path, encoding="utf-8") as output_file:
+            self.assertEqual([json.loads(line)["row"] for line in output_file], [0, 1, 3])
+
+    def test_reads_csv_input(self):
+        input_path = self.write_input("in.csv", 'problem,context\n"Reducir, con coma, el desperdicio",\nMejorar la logística,Retail\n')
+        rows = list(iter_input_rows(input_path))
+
+        self.assertEqual(rows[0][1].problem, "Reducir, con coma, el desperdicio")
+        self.assertIsNone(rows[0][1].context)
+        self.assertEqual(rows[1][1].context, "Retail")
+
+    def test_checkpoint_truncates_partial_line(self):
+        with open(self.output_path, "w", encoding="utf-8") as output_file:
+            output_file.write('{"row": 0}\n{"row": 1}\n{"row"')
+
+        self.assertEqual(load_checkpoint(self.output_path), {0, 1})
+        with open(self.output_path, encoding="utf-8") as output_file:
+            self.assertEqual(output_file.read(), '{"row": 0}\n{"row": 1}\n')
+
+    def test_partitions_cover_every_row_once(self):
+        input_path = self.write_jsonl_input(10)
+        partitions = [[row for row, _ in iter_input_rows(input_path, (index, 3))] for index in range(3)]
+
+        self.assertEqual(partitions[1], [1, 4, 7])
+        self.assertEqual(sorted(sum(partitions, [])), list(range(10)))
+
+    def test_merge_orders_rows_and_keeps_first_copy(self):
+        shard_a = self.write_input("out.jsonl.shard-0-of-2", '{"row": 4, "v": "a"}\n{"row": 0, "v": "a"}\n')
+        shard_b = self.write_input("out.jsonl.shard-1-of-2", '{"row": 3, "v": "b"}\n{"row": 1, "v": "b"}\n{"row": 4, "v": "b"}\n')
+        with open(self.output_path, "w", encoding="utf-8") as output_file:
+            output_file.write('{"row": 2, "v": "out"}\n')
+
+        merge_outputs(self.output_path, [shard_a, shard_b])
+
+        rows = self.read_output()
+        self.assertEqual([record["row"] for record in rows], [0, 1, 2, 3, 4])
+        self.assertEqual([record["v"] for record in rows], ["a", "b", "out", "b", "a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import sys
+import os
+import unittest
+
+# Add project root to Python path to allow imports from benchmarks
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.micro import BENCHMARKS, CALIBRATION, compare, load_baselines, run_benchmarks
+
+
+class MicroBenchmarkTests(unittest.TestCase):
+
+    def test_every_benchmark_runs_and_reports_cost(self):
+        results = run_benchmarks(scale=0.001, repeat=1)
+
+        self.assertEqual(set(results), set(BENCHMARKS) | {CALIBRATION})
+        for name in BENCHMARKS:
+            self.assertGreater(results[name]["us_per_call"], 0)
+            self.assertGreater(results[name]["alloc_bytes"], 0)
+
+    def test_stored_baseline_covers_every_benchmark(self):
+        self.assertEqual(set(load_baselines()), set(BENCHMARKS) | {CALIBRATION})
+
+    def test_slower_calls_and_extra_allocations_are_regressions(self):
+        baselines = {CALIBRATION: {"us_per_call": 100.0}, "parse": {"us_per_call": 10.0, "alloc_bytes": 10000}}
+
+        self.assertEqual(compare({CALIBRATION: {"us_per_call": 100.0}, "parse": {"us_per_call": 12.0, "alloc_bytes": 10100}}, baselines), [])
+        regressions = compare({CALIBRATION: {"us_per_call": 100.0}, "parse": {"us_per_call": 25.0, "alloc_bytes": 20000}}, baselines)
+        self.assertEqual(len(regressions), 2)
+
+    def test_slower_machine_is_not_a_regression(self):
+        baselines = {CALIBRATION: {"us_per_call": 100.0}, "parse": {"us_per_call": 10.0, "alloc_bytes": 10000}}
+        results = {CALIBRATION: {"us_per_call": 300.0}, "parse": {"us_per_call": 30.0, "alloc_bytes": 10000}}
+
+        self.assertEqual(compare(results, baselines), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
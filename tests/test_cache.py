@@ -0,0 +1,109 @@
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from utils.cache import MemoryCache, SQLiteCache, IdeaCache, make_cache_key
+from utils.gemini_client import gemini_client
+
+
+class CacheKeyTests(unittest.TestCase):
+
+    def test_key_ignores_case_and_whitespace(self):
+        key_a = make_cache_key("substitute", "Mejorar  la comunicación ", None, "m", 0.7, 3)
+        key_b = make_cache_key("substitute", "mejorar la COMUNICACIÓN", "", "m", 0.7, 3)
+        self.assertEqual(key_a, key_b)
+
+    def test_key_depends_on_generation_settings(self):
+        base = make_cache_key("substitute", "problema", "contexto", "m", 0.7, 3)
+        self.assertNotEqual(base, make_cache_key("combine", "problema", "contexto", "m", 0.7, 3))
+        self.assertNotEqual(base, make_cache_key("substitute", "problema", "otro", "m", 0.7, 3))
+        self.assertNotEqual(base, make_cache_key("substitute", "problema", "contexto", "m", 0.9, 3))
+        self.assertNotEqual(base, make_cache_key("substitute", "problema", "contexto", "m", 0.7, 5))
+
+
+class MemoryCacheTests(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = MemoryCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", ["1"])
+        cache.set("b", ["2"])
+        cache.get("a")
+        cache.set("c", ["3"])
+        self.assertEqual(cache.get("a"), ["1"])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_entries_expire_after_ttl(self):
+        cache = MemoryCache(max_entries=10, ttl_seconds=60)
+        with patch('utils.cache.time.monotonic', return_value=1000.0):
+            cache.set("a", ["1"])
+        with patch('utils.cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+
+
+class IdeaCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_disk_tier_survives_restart_and_counts_hits(self):
+        first = IdeaCache(MemoryCache(10, 60), SQLiteCache(self.db_path, 3600))
+        asyncio.run(first.set("key", ["Idea 1", "Idea 2"]))
+
+        # A new process only has the disk tier
+        second = IdeaCache(MemoryCache(10, 60), SQLiteCache(self.db_path, 3600))
+        self.assertEqual(asyncio.run(second.get("key")), ["Idea 1", "Idea 2"])
+        self.assertEqual(asyncio.run(second.get("key")), ["Idea 1", "Idea 2"])
+        self.assertIsNone(asyncio.run(second.get("missing")))
+
+        stats = second.get_stats()
+        self.assertEqual(stats["disk_hits"], 1)
+        self.assertEqual(stats["memory_hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_expired_disk_entries_are_misses(self):
+        disk = SQLiteCache(self.db_path, ttl_seconds=60)
+        disk.set("key", ["Idea"])
+        with patch('utils.cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(disk.get("key"))
+
+
+class ClientCacheTests(unittest.TestCase):
+
+    def test_identical_requests_hit_the_cache(self):
+        class StubModel:
+            calls = 0
+
+            def generate_content(self, prompt, generation_config=None, **kwargs):
+                StubModel.calls += 1
+
+                class Response:
+                    text = "1. Idea uno\n2. Idea dos"
+                return Response()
+
+        cache = IdeaCache(MemoryCache(10, 60))
+        with patch.object(gemini_client, 'model', StubModel()), \
+                patch.object(gemini_client, 'cache', cache), \
+                patch.object(settings, 'ENABLE_CACHE', True):
+            first = asyncio.run(gemini_client.generate_scamper_ideas("substitute", "Un problema", "Contexto"))
+            second = asyncio.run(gemini_client.generate_scamper_ideas("substitute", "un  problema", "contexto"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(StubModel.calls, 1)
+        self.assertEqual(cache.get_stats()["memory_hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import sys
+import os
+import time
+import asyncio
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, agents, models
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import ResultStatus, UserInput
+from utils.cache import IdeaCache, MemoryCache
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from utils.errors import LLMCircuitOpenError, LLMRateLimitError, LLMResponseError, LLMUnavailableError
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.rate_limiter import RequestScheduler
+from agents.orchestrator import orchestrator
+
+PROBLEM = "Reducir el tiempo de espera en urgencias"
+
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=3, open_seconds=60, slow_call_seconds=5)
+
+    def trip(self):
+        for _ in range(3):
+            self.breaker.record_failure(LLMUnavailableError("503"))
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self.breaker.record_failure(LLMUnavailableError("503"))
+        self.breaker.record_success(0.1)  # a success in between resets the count
+        self.trip()
+
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(LLMCircuitOpenError):
+            self.breaker.before_call()
+
+    def test_quota_and_invalid_responses_do_not_trip(self):
+        for _ in range(5):
+            self.breaker.record_failure(LLMRateLimitError("429"))
+            self.breaker.record_failure(LLMResponseError("400"))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_latency_spikes_count_as_failures(self):
+        for _ in range(3):
+            self.breaker.record_success(6.0)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_lets_one_probe_through(self):
+        closed = []
+        self.breaker.on_close(lambda: closed.append(True))
+        self.trip()
+
+        with patch('utils.circuit_breaker.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertTrue(self.breaker.before_call())
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            with self.assertRaises(LLMCircuitOpenError):
+                self.breaker.before_call()  # only one probe at a time
+            self.breaker.record_success(0.1, probe=True)
+
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(closed, [True])
+        self.assertFalse(self.breaker.before_call())
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        with patch('utils.circuit_breaker.time.monotonic', return_value=time.monotonic() + 61):
+            probe = self.breaker.before_call()
+            self.breaker.record_failure(LLMUnavailableError("503"), probe)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(LLMCircuitOpenError):
+            self.breaker.before_call()
+
+    def test_abandoned_probe_frees_the_slot(self):
+        self.trip()
+        with patch('utils.circuit_breaker.time.monotonic', return_value=time.monotonic() + 61):
+            self.breaker.record_abandoned(self.breaker.before_call())
+            self.assertTrue(self.breaker.before_call())
+
+
+class DegradedServingTests(unittest.TestCase):
+    """While the breaker is open, agents fail fast and the orchestrator serves stale cached ideas."""
+
+    def setUp(self):
+        self.model = StubBackend(latency_ms=1, distribution="fixed")
+        # Every entry is expired as soon as it is written, so only stale lookups find it
+        self.cache = IdeaCache(MemoryCache(100, ttl_seconds=0))
+        self.breaker = CircuitBreaker(failure_threshold=2, open_seconds=60)
+        self.breaker.on_close(gemini_client._revalidate_in_background)
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),
+            patch.object(settings, 'ENABLE_CACHE', True),
+            patch.object(settings, 'ENABLE_SEMANTIC_CACHE', False),
+            patch.object(gemini_client, 'model', self.model),
+            patch.object(gemini_client, 'cache', self.cache),
+            patch.object(gemini_client, 'breaker', self.breaker),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(gemini_client, '_stale_served', type(gemini_client._stale_served)()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def open_breaker(self):
+        for _ in range(2):
+            self.breaker.record_failure(LLMUnavailableError("503"))
+
+    def test_open_breaker_serves_stale_ideas_without_calling_the_model(self):
+        fresh = asyncio.run(orchestrator.process_user_input(UserInput(problem=PROBLEM)))
+        self.open_breaker()
+        calls = self.model.calls
+
+        start = time.perf_counter()
+        degraded = asyncio.run(orchestrator.process_user_input(UserInput(problem=PROBLEM)))
+
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(self.model.calls, calls)
+        self.assertTrue(all(result.stale and result.status == ResultStatus.OK for result in degraded.results))
+        self.assertEqual([result.ideas for result in degraded.results], [result.ideas for result in fresh.results])
+        self.assertEqual(len(gemini_client._stale_served), 7)
+
+    def test_techniques_without_cached_ideas_fail_fast(self):
+        self.open_breaker()
+        response = asyncio.run(orchestrator.process_user_input(UserInput(problem=PROBLEM)))
+
+        self.assertEqual(self.model.calls, 0)
+        self.assertEqual({result.error_type for result in response.results}, {"circuit_open"})
+
+    def test_stream_serves_stale_ideas(self):
+        asyncio.run(orchestrator.process_user_input(UserInput(problem=PROBLEM)))
+        self.open_breaker()
+
+        async def consume():
+            return [event async for event in orchestrator.stream_user_input(UserInput(problem=PROBLEM))]
+
+        events = asyncio.run(consume())
+        results = [payload for event, payload in events if event == "result"]
+        self.assertEqual(len(results), 7)
+        self.assertTrue(all(result.stale for result in results))
+        self.assertEqual(sum(event == "idea" for event, _ in events), sum(len(result.ideas) for result in results))
+
+    def test_recovery_refreshes_stale_entries_in_the_background(self):
+        asyncio.run(orchestrator.process_user_input(UserInput(problem=PROBLEM)))
+        self.open_breaker()
+        asyncio.run(orchestrator.process_user_input(UserInput(problem=PROBLEM)))
+        calls = self.model.calls
+
+        async def probe_and_wait():
+            # Once the open period is over the next call is the probe; it succeeds and closes the circuit
+            with patch('utils.circuit_breaker.time.monotonic', return_value=time.monotonic() + 61):
+                await gemini_client.generate_response("probe")
+            await gemini_client._revalidation_task
+
+        asyncio.run(probe_and_wait())
+
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.model.calls, calls + 1 + 7)
+        self.assertEqual(len(gemini_client._stale_served), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
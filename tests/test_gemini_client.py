@@ -0,0 +1,283 @@
+import sys
+import os
+import time
+import threading
+import asyncio
+import unittest
+from collections import deque
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from agents, models, utils
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import UserInput
+from models.schemas import ResultStatus
+from utils.circuit_breaker import CircuitBreaker
+from utils.gemini_client import gemini_client, IdeaStreamParser
+from utils.errors import LLMRateLimitError, LLMResponseError, LLMTimeoutError, LLMUnavailableError
+from utils.rate_limiter import RequestScheduler
+from agents.substitute_agent import substitute_agent
+from agents.orchestrator import orchestrator
+
+
+class StubModel:
+    """Blocking stand-in for genai.GenerativeModel that records overlap between calls."""
+
+    def __init__(self, latency=0.3):
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)  # Same blocking behaviour as the real SDK call
+        with self._lock:
+            self.active -= 1
+
+        class Response:
+            text = "1. Idea uno\n2. Idea dos\n3. Idea tres"
+        return Response()
+
+
+class GeminiClientConcurrencyTests(unittest.TestCase):
+
+    def setUp(self):
+        cache_patch = patch.object(settings, 'ENABLE_CACHE', False)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def test_generate_response_does_not_block_event_loop(self):
+        stub = StubModel(latency=0.3)
+
+        async def run_test():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            ticker_task = asyncio.create_task(ticker())
+            await gemini_client.generate_response("prompt")
+            ticker_task.cancel()
+            return ticks
+
+        with patch.object(gemini_client, 'model', stub):
+            ticks = asyncio.run(run_test())
+
+        # The loop kept running other tasks while the upstream call was in flight
+        self.assertGreater(ticks, 10)
+
+    def test_parallel_agents_overlap_upstream_calls(self):
+        stub = StubModel(latency=0.3)
+        user_input = UserInput(problem="Mejorar la comunicación en equipos remotos")
+
+        async def run_test():
+            start = time.perf_counter()
+            results = await orchestrator._coordinate_parallel_agents(user_input)
+            return results, time.perf_counter() - start
+
+        with patch.object(gemini_client, 'model', stub):
+            results, elapsed = asyncio.run(run_test())
+
+        self.assertEqual(len(results), 7)
+        self.assertEqual(stub.calls, 7)
+        self.assertEqual(stub.max_active, 7)
+        # About one round trip instead of seven sequential ones
+        self.assertLess(elapsed, stub.latency * 3)
+        for result in results:
+            self.assertEqual(result.ideas, ["Idea uno", "Idea dos", "Idea tres"])
+
+
+    def test_quota_errors_shrink_the_shared_concurrency_limit(self):
+        class QuotaModel:
+            def generate_content(self, prompt, generation_config=None, **kwargs):
+                error = Exception("429 Quota exceeded")
+                error.code = 429
+                raise error
+
+        scheduler = RequestScheduler(requests_per_minute=1000, tokens_per_minute=10 ** 7, max_concurrency=8)
+        with patch.object(gemini_client, 'model', QuotaModel()), \
+                patch.object(gemini_client, 'scheduler', scheduler), \
+                patch.object(settings, 'MAX_RETRIES', 0):
+            with self.assertRaises(LLMRateLimitError):
+                asyncio.run(gemini_client.generate_response("prompt"))
+
+        stats = scheduler.get_stats()
+        self.assertEqual(stats["rate_limited"], 1)
+        self.assertEqual(stats["concurrency_limit"], 4)
+        self.assertEqual(stats["in_flight"], 0)
+
+
+class FlakyModel:
+    """Raises the given errors in order, then answers normally."""
+
+    def __init__(self, errors, latencies=()):
+        self.errors = list(errors)
+        self.latencies = list(latencies)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            error = self.errors.pop(0) if self.errors else None
+            latency = self.latencies.pop(0) if self.latencies else 0
+        time.sleep(latency)
+        if error is not None:
+            raise error
+
+        class Response:
+            text = "1. Idea uno"
+        return Response()
+
+
+def upstream_error(message, code):
+    error = Exception(message)
+    error.code = code
+    return error
+
+
+class ResilienceTests(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in [('ENABLE_CACHE', False), ('RETRY_BASE_DELAY', 0.01), ('RETRY_MAX_DELAY', 0.02)]:
+            settings_patch = patch.object(settings, name, value)
+            settings_patch.start()
+            self.addCleanup(settings_patch.stop)
+        # 429s and abandoned slow calls must not shrink the shared scheduler for other tests
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        scheduler_patch = patch.object(gemini_client, 'scheduler', scheduler)
+        scheduler_patch.start()
+        self.addCleanup(scheduler_patch.stop)
+        # Nor leave failures counted against the shared circuit breaker
+        breaker_patch = patch.object(gemini_client, 'breaker', CircuitBreaker())
+        breaker_patch.start()
+        self.addCleanup(breaker_patch.stop)
+
+    def test_transient_errors_are_retried(self):
+        stub = FlakyModel([upstream_error("503 Service Unavailable", 503), upstream_error("429 Quota exceeded", 429)])
+        with patch.object(gemini_client, 'model', stub):
+            response = asyncio.run(gemini_client.generate_response("prompt"))
+
+        self.assertEqual(response, "1. Idea uno")
+        self.assertEqual(stub.calls, 3)
+
+    def test_invalid_requests_are_not_retried(self):
+        stub = FlakyModel([upstream_error("400 Invalid argument", 400)])
+        with patch.object(gemini_client, 'model', stub):
+            with self.assertRaises(LLMResponseError):
+                asyncio.run(gemini_client.generate_response("prompt"))
+
+        self.assertEqual(stub.calls, 1)
+
+    def test_gives_up_after_max_retries(self):
+        stub = FlakyModel([upstream_error("503 Service Unavailable", 503)] * 10)
+        with patch.object(gemini_client, 'model', stub), \
+                patch.object(settings, 'MAX_RETRIES', 2):
+            with self.assertRaises(LLMUnavailableError):
+                asyncio.run(gemini_client.generate_response("prompt"))
+
+        self.assertEqual(stub.calls, 3)
+
+    def test_slow_calls_time_out(self):
+        stub = FlakyModel([], latencies=[0.5])
+        with patch.object(gemini_client, 'model', stub), \
+                patch.object(settings, 'API_TIMEOUT', 0.1), \
+                patch.object(settings, 'MAX_RETRIES', 0):
+            start = time.perf_counter()
+            with self.assertRaises(LLMTimeoutError):
+                asyncio.run(gemini_client.generate_response("prompt"))
+
+        self.assertLess(time.perf_counter() - start, 0.4)
+
+    def test_hedged_request_wins_over_slow_call(self):
+        # The first call hangs; the duplicate sent after the observed p95 answers quickly
+        stub = FlakyModel([], latencies=[1.0, 0.01])
+        with patch.object(gemini_client, 'model', stub), \
+                patch.object(gemini_client, '_latencies', deque([0.05] * 20, maxlen=200)), \
+                patch.object(settings, 'ENABLE_HEDGED_REQUESTS', True):
+            hedge_wins = gemini_client.get_call_stats()["hedge_wins"]
+            start = time.perf_counter()
+            response = asyncio.run(gemini_client.generate_response("prompt"))
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(response, "1. Idea uno")
+        self.assertEqual(stub.calls, 2)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(gemini_client.get_call_stats()["hedge_wins"], hedge_wins + 1)
+
+    def test_failed_agent_reports_typed_error_instead_of_ideas(self):
+        stub = FlakyModel([upstream_error("400 Invalid argument", 400)])
+        user_input = UserInput(problem="Mejorar la comunicación en equipos remotos")
+        with patch.object(gemini_client, 'model', stub):
+            result = asyncio.run(substitute_agent.generate_ideas(user_input))
+
+        self.assertEqual(result.status, ResultStatus.ERROR)
+        self.assertEqual(result.error_type, "invalid_response")
+        self.assertEqual(result.ideas, [])
+
+
+class StreamingStubModel:
+    """Streams a numbered list in small chunks with a delay between them."""
+
+    def __init__(self, chunks, delay=0.1):
+        self.chunks = chunks
+        self.delay = delay
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        class Chunk:
+            def __init__(self, text):
+                self.text = text
+
+        def iterate():
+            for chunk in self.chunks:
+                time.sleep(self.delay)
+                yield Chunk(chunk)
+        return iterate()
+
+
+class IdeaStreamingTests(unittest.TestCase):
+
+    def setUp(self):
+        cache_patch = patch.object(settings, 'ENABLE_CACHE', False)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def test_parser_emits_ideas_when_lines_complete(self):
+        parser = IdeaStreamParser()
+        self.assertEqual(parser.feed("Aquí tienes:\n1. Prim"), [])
+        self.assertEqual(parser.feed("era idea\n2. Segunda"), ["Primera idea"])
+        self.assertEqual(parser.close(), ["Segunda"])
+
+    def test_parser_falls_back_to_whole_text(self):
+        parser = IdeaStreamParser()
+        self.assertEqual(parser.feed("Sin formato de "), [])
+        self.assertEqual(parser.close(), ["Sin formato de"])
+
+    def test_first_idea_arrives_before_stream_ends(self):
+        stub = StreamingStubModel(["1. Idea uno\n2. Id", "ea dos\n", "3. Idea tres", "\n4. Idea cuatro"], delay=0.1)
+
+        async def run_test():
+            received = []
+            start = time.perf_counter()
+            async for idea in gemini_client.stream_scamper_ideas("substitute", "Un problema"):
+                received.append((idea, time.perf_counter() - start))
+            return received
+
+        with patch.object(gemini_client, 'model', stub):
+            received = asyncio.run(run_test())
+
+        self.assertEqual([idea for idea, _ in received], ["Idea uno", "Idea dos", "Idea tres"])
+        self.assertLess(received[0][1], 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, config, interface
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.testclient import TestClient
+
+from config.settings import settings
+from models.schemas import ScamperResponse, ScamperTechnique, UserInput
+from interface.jobs import JobWorkerPool
+from utils.circuit_breaker import CircuitBreaker
+from utils.gemini_client import gemini_client
+from utils.job_queue import ABANDONED_MESSAGE, DONE, FAILED, QUEUED, RUNNING, JobStore
+from utils.llm_backends import StubBackend
+from utils.rate_limiter import RequestScheduler
+from webapp.app import app as flask_app
+from webapp.asgi import app as asgi_app
+
+PROBLEM = UserInput(problem="Reducir las colas en el comedor", context="Universidad con 5000 estudiantes")
+
+
+def temp_store(test, **kwargs):
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return JobStore(os.path.join(directory.name, "jobs.sqlite3"), **kwargs)
+
+
+def stub_model_patches(latency_ms=5, error_rate=0.0):
+    scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+    return [
+        patch.object(settings, 'LLM_BACKEND', 'stub'),
+        patch.object(settings, 'ENABLE_CACHE', False),
+        patch.object(settings, 'ENABLE_SEMANTIC_CACHE', False),
+        patch.object(settings, 'MAX_RETRIES', 0),
+        patch.object(gemini_client, 'model', StubBackend(latency_ms=latency_ms, distribution="fixed", error_rate=error_rate)),
+        patch.object(gemini_client, 'scheduler', scheduler),
+        patch.object(gemini_client, 'breaker', CircuitBreaker()),
+    ]
+
+
+def wait_for_status(store, job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {store.get(job_id)['status']}")
+
+
+class JobStoreTests(unittest.TestCase):
+
+    def test_jobs_are_claimed_oldest_first_and_only_once(self):
+        store = temp_store(self)
+        first = store.enqueue(PROBLEM)
+        second = store.enqueue(UserInput(problem="Otro problema distinto"))
+
+        self.assertEqual(store.get(second)["queue_position"], 1)
+        claimed = store.claim("w1")
+        self.assertEqual((claimed.id, claimed.attempt), (first, 1))
+        self.assertEqual(claimed.user_input, PROBLEM)
+        self.assertEqual(store.claim("w2").id, second)
+        self.assertIsNone(store.claim("w3"))
+        self.assertEqual(store.counts()[RUNNING], 2)
+
+    def test_only_the_owner_can_update_a_running_job(self):
+        store = temp_store(self)
+        job_id = store.enqueue(PROBLEM)
+        store.claim("w1")
+        response = ScamperResponse(original_problem=PROBLEM.problem, results=[], summary="listo")
+
+        self.assertFalse(store.complete(job_id, "w2", response))
+        self.assertTrue(store.complete(job_id, "w1", response))
+        self.assertFalse(store.heartbeat(job_id, "w1"))
+
+        job = store.get(job_id)
+        self.assertEqual(job["status"], DONE)
+        self.assertEqual(job["response"]["summary"], "listo")
+        self.assertIsNotNone(job["finished_at"])
+
+    def test_expired_lease_is_reclaimed_until_attempts_run_out(self):
+        store = temp_store(self, lease_seconds=0.05, max_attempts=2)
+        job_id = store.enqueue(PROBLEM)
+        store.claim("w1")
+        self.assertIsNone(store.claim("w2"))
+
+        time.sleep(0.1)
+        reclaimed = store.claim("w2")
+        self.assertEqual((reclaimed.id, reclaimed.attempt), (job_id, 2))
+        # The first worker lost the job and can no longer write to it
+        self.assertFalse(store.heartbeat(job_id, "w1"))
+
+        time.sleep(0.1)
+        self.assertIsNone(store.claim("w3"))
+        job = store.get(job_id)
+        self.assertEqual((job["status"], job["error"]), (FAILED, ABANDONED_MESSAGE))
+
+    def test_released_job_goes_back_to_the_queue_without_spending_an_attempt(self):
+        store = temp_store(self)
+        job_id = store.enqueue(PROBLEM)
+        store.claim("w1")
+
+        self.assertTrue(store.release(job_id, "w1"))
+        job = store.get(job_id)
+        self.assertEqual((job["status"], job["attempts"]), (QUEUED, 0))
+        self.assertEqual(store.claim("w2").attempt, 1)
+
+    def test_queue_survives_reopening_the_file(self):
+        store = temp_store(self)
+        job_id = store.enqueue(PROBLEM)
+
+        reopened = JobStore(store.path)
+        self.assertEqual(reopened.claim("w1").id, job_id)
+
+    def test_purge_removes_only_old_finished_jobs(self):
+        store = temp_store(self)
+        finished = store.enqueue(PROBLEM)
+        store.claim("w1")
+        store.fail(finished, "w1", "boom")
+        pending = store.enqueue(PROBLEM)
+
+        self.assertEqual(store.purge(max_age=3600), 0)
+        self.assertEqual(store.purge(max_age=0), 1)
+        self.assertIsNone(store.get(finished))
+        self.assertEqual(store.get(pending)["status"], QUEUED)
+
+
+class JobWorkerPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        for patcher in stub_model_patches():
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.store = temp_store(self)
+
+    def test_pool_runs_queued_jobs_and_saves_partial_progress(self):
+        job_id = self.store.enqueue(PROBLEM)
+        pool = JobWorkerPool(self.store, workers=2, poll_interval=0.05)
+        heartbeats = []
+        original_heartbeat = self.store.heartbeat
+
+        def recording_heartbeat(job_id, worker, response=None):
+            if response is not None:
+                heartbeats.append(len(response.results))
+            return original_heartbeat(job_id, worker, response)
+
+        async def scenario():
+            task = asyncio.create_task(pool.run())
+            # The pool counts the job right after the store marks it done
+            while pool.completed < 1:
+                await asyncio.sleep(0.02)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with patch.object(self.store, 'heartbeat', recording_heartbeat):
+            asyncio.run(scenario())
+
+        job = self.store.get(job_id)
+        self.assertEqual(job["attempts"], 1)
+        self.assertFalse(job["response"]["partial"])
+        self.assertTrue(job["response"]["summary"])
+        self.assertEqual([result["technique"] for result in job["response"]["results"]],
+                         [technique.value for technique in ScamperTechnique])
+        self.assertEqual(heartbeats, list(range(1, len(ScamperTechnique) + 1)))
+        self.assertEqual(pool.get_stats()["completed"], 1)
+
+    def test_stopping_the_pool_returns_running_jobs_to_the_queue(self):
+        for patcher in stub_model_patches(latency_ms=2000):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        job_id = self.store.enqueue(PROBLEM)
+        pool = JobWorkerPool(self.store, workers=1, poll_interval=0.05)
+
+        self.assertTrue(pool.start())
+        wait_for_status(self.store, job_id, {RUNNING})
+        pool.stop()
+
+        job = self.store.get(job_id)
+        self.assertEqual((job["status"], job["attempts"]), (QUEUED, 0))
+        self.assertFalse(pool.running)
+
+    def test_failed_analysis_marks_the_job_failed(self):
+        job_id = self.store.enqueue(PROBLEM)
+        pool = JobWorkerPool(self.store, workers=1, poll_interval=0.05)
+
+        async def broken_stream(user_input):
+            raise RuntimeError("sin modelo")
+            yield
+
+        async def scenario():
+            task = asyncio.create_task(pool.run())
+            while pool.failed < 1:
+                await asyncio.sleep(0.02)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with patch('interface.jobs.orchestrator.stream_user_input', broken_stream):
+            asyncio.run(scenario())
+
+        self.assertEqual(self.store.get(job_id)["error"], "sin modelo")
+        self.assertEqual(pool.get_stats()["failed"], 1)
+
+    def test_job_claimed_while_stopping_goes_back_to_the_queue(self):
+        job_id = self.store.enqueue(PROBLEM)
+        pool = JobWorkerPool(self.store, workers=1, poll_interval=0.05)
+        claiming, proceed = threading.Event(), threading.Event()
+        original_claim = self.store.claim
+
+        def slow_claim(worker):
+            claiming.set()
+            proceed.wait(5)
+            return original_claim(worker)
+
+        async def scenario():
+            task = asyncio.create_task(pool.run())
+            await asyncio.to_thread(claiming.wait, 5)
+            # The pool stops while the claim is still committing in its thread
+            task.cancel()
+            await asyncio.sleep(0.01)
+            proceed.set()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with patch.object(self.store, 'claim', slow_claim):
+            asyncio.run(scenario())
+
+        job = self.store.get(job_id)
+        self.assertEqual((job["status"], job["attempts"]), (QUEUED, 0))
+
+    def test_failed_techniques_mark_the_job_failed(self):
+        for patcher in stub_model_patches(latency_ms=1, error_rate=1.0):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        job_id = self.store.enqueue(PROBLEM)
+        pool = JobWorkerPool(self.store, workers=1, poll_interval=0.05)
+
+        async def scenario():
+            task = asyncio.create_task(pool.run())
+            while pool.failed < 1:
+                await asyncio.sleep(0.02)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(scenario())
+
+        job = self.store.get(job_id)
+        self.assertEqual(job["status"], FAILED)
+        self.assertIn("7 de 7", job["error"])
+        self.assertEqual(len(job["response"]["results"]), len(ScamperTechnique))
+        self.assertEqual(pool.completed, 0)
+
+    def test_zero_workers_only_enqueue(self):
+        pool = JobWorkerPool(self.store, workers=0)
+        self.assertFalse(pool.start())
+        self.assertFalse(pool.running)
+
+
+class JobEndpointTests(unittest.TestCase):
+
+    def setUp(self):
+        for patcher in stub_model_patches():
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.store = temp_store(self)
+        self.pool = JobWorkerPool(self.store, workers=2, poll_interval=0.05)
+        self.addCleanup(self.pool.stop)
+        for patcher in (patch('webapp.common.job_store', self.store), patch('webapp.common.job_workers', self.pool)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def check_job_api(self, client):
+        response = client.post('/api/jobs', json={"problem": PROBLEM.problem, "context": PROBLEM.context})
+        self.assertEqual(response.status_code, 202)
+        body = response.json() if callable(response.json) else response.json
+        self.assertEqual(body["status"], QUEUED)
+        self.assertEqual(response.headers["Location"], body["status_url"])
+
+        wait_for_status(self.store, body["id"], {DONE})
+        response = client.get(body["status_url"])
+        self.assertEqual(response.status_code, 200)
+        job = response.json() if callable(response.json) else response.json
+        self.assertEqual(job["status"], DONE)
+        self.assertEqual(job["response"]["original_problem"], PROBLEM.problem)
+        self.assertEqual(len(job["response"]["results"]), len(ScamperTechnique))
+
+        self.assertEqual(client.get('/api/jobs/unknown').status_code, 404)
+        self.assertEqual(client.post('/api/jobs', json={"problem": "x"}).status_code, 400)
+
+    def test_flask_job_api(self):
+        flask_app.testing = True
+        self.check_job_api(flask_app.test_client())
+
+    def test_asgi_job_api(self):
+        # Without the lifespan the ASGI app starts the pool on the first job, like Flask
+        self.check_job_api(TestClient(asgi_app))
+
+    def test_asgi_lifespan_runs_the_pool_on_the_app_loop(self):
+        with patch('webapp.asgi.job_workers', self.pool), TestClient(asgi_app) as client:
+            self.assertTrue(self.pool.running)
+            self.assertIsNone(self.pool._thread)
+            self.check_job_api(client)
+        self.assertFalse(self.pool.running)
+
+
+if __name__ == '__main__':
+    unittest.main()
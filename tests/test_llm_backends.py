@@ -0,0 +1,135 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, config, agents
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import UserInput, ResultStatus
+from utils.errors import LLMRateLimitError, LLMTimeoutError, LLMUnavailableError, classify_error
+from utils.gemini_client import gemini_client
+from utils.llm_backends import BackendError, GenerationConfig, HttpBackend, StubBackend, create_backend, serve_stub_http
+from utils.rate_limiter import RequestScheduler
+from agents.orchestrator import orchestrator
+
+TECHNIQUE_PROMPT = gemini_client._create_scamper_prompt("substitute", "Reducir el desperdicio en la cafetería")
+
+
+def config(**kwargs):
+    return GenerationConfig(temperature=0.7, max_output_tokens=1000, **kwargs)
+
+
+class StubBackendTests(unittest.TestCase):
+
+    def test_returns_numbered_scamper_ideas_with_token_count(self):
+        backend = StubBackend(latency_ms=1, distribution="fixed")
+        response = backend.generate_content(TECHNIQUE_PROMPT, config())
+
+        ideas = gemini_client._parse_ideas_from_response(response.text)
+        self.assertEqual(len(ideas), settings.MAX_IDEAS_PER_TECHNIQUE)
+        self.assertIn("sustituir", ideas[0])
+        self.assertGreater(response.usage_metadata.total_token_count, 0)
+
+    def test_combined_request_returns_parsable_json(self):
+        backend = StubBackend(latency_ms=1, distribution="fixed")
+        response = backend.generate_content("Problema: Mejorar las reuniones", config(response_mime_type="application/json"))
+
+        ideas_by_technique, summary = gemini_client._parse_combined_response(response.text)
+        self.assertEqual(len(ideas_by_technique), 7)
+        self.assertIsNotNone(summary)
+
+    def test_same_seed_gives_same_latencies(self):
+        first, second = StubBackend(seed=7), StubBackend(seed=7)
+        self.assertEqual([first._sample_latency() for _ in range(5)], [second._sample_latency() for _ in range(5)])
+
+    def test_rate_limit_bursts_and_errors_are_classified(self):
+        backend = StubBackend(latency_ms=1, distribution="fixed", rate_limit_every=4, rate_limit_burst=2)
+        outcomes = []
+        for _ in range(8):
+            try:
+                backend.generate_content(TECHNIQUE_PROMPT, config())
+                outcomes.append("ok")
+            except BackendError as e:
+                outcomes.append(classify_error(e))
+        self.assertEqual(outcomes[:2] + outcomes[4:6], ["ok"] * 4)
+        self.assertTrue(all(isinstance(outcome, LLMRateLimitError) for outcome in outcomes[2:4] + outcomes[6:]))
+
+        failing = StubBackend(latency_ms=1, error_rate=1.0)
+        with self.assertRaises(BackendError) as raised:
+            failing.generate_content(TECHNIQUE_PROMPT, config())
+        self.assertIsInstance(classify_error(raised.exception), LLMUnavailableError)
+
+    def test_slow_call_exceeding_request_timeout_is_a_timeout(self):
+        backend = StubBackend(latency_ms=500, distribution="fixed")
+        with self.assertRaises(BackendError) as raised:
+            backend.generate_content(TECHNIQUE_PROMPT, config(), request_options={"timeout": 0.05})
+        self.assertIsInstance(classify_error(raised.exception), LLMTimeoutError)
+
+    def test_stream_yields_chunks_spread_over_the_latency(self):
+        backend = StubBackend(latency_ms=200, distribution="fixed")
+        start = time.perf_counter()
+        chunks = list(backend.generate_content(TECHNIQUE_PROMPT, config(), stream=True))
+        elapsed = time.perf_counter() - start
+
+        self.assertGreater(len(chunks), 1)
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertEqual(backend.generate_content(TECHNIQUE_PROMPT, config()).text, "".join(chunk.text for chunk in chunks))
+        self.assertIsNotNone(chunks[-1].usage_metadata)
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_backend("otro")
+
+
+class HttpBackendTests(unittest.TestCase):
+
+    def start_server(self, backend):
+        server = serve_stub_http(port=0, backend=backend)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return HttpBackend(f"http://127.0.0.1:{server.server_address[1]}")
+
+    def test_round_trip_matches_the_stub(self):
+        backend = self.start_server(StubBackend(latency_ms=1, distribution="fixed"))
+        response = backend.generate_content(TECHNIQUE_PROMPT, config())
+        chunks = list(backend.generate_content(TECHNIQUE_PROMPT, config(), stream=True))
+
+        self.assertEqual(response.text, StubBackend().render(TECHNIQUE_PROMPT))
+        self.assertEqual("".join(chunk.text for chunk in chunks), response.text)
+        self.assertGreater(response.usage_metadata.total_token_count, 0)
+
+    def test_http_status_codes_keep_their_meaning(self):
+        backend = self.start_server(StubBackend(latency_ms=1, rate_limit_every=1, rate_limit_burst=1))
+        with self.assertRaises(BackendError) as raised:
+            backend.generate_content(TECHNIQUE_PROMPT, config())
+        self.assertIsInstance(classify_error(raised.exception), LLMRateLimitError)
+
+    def test_unreachable_server_is_unavailable(self):
+        backend = HttpBackend("http://127.0.0.1:9")
+        with self.assertRaises(ConnectionError) as raised:
+            backend.generate_content(TECHNIQUE_PROMPT, config(), request_options={"timeout": 1})
+        self.assertIsInstance(classify_error(raised.exception), LLMUnavailableError)
+
+
+class OfflineOrchestratorTests(unittest.TestCase):
+
+    def test_full_run_against_the_stub_backend(self):
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        with patch.object(gemini_client, 'model', StubBackend(latency_ms=20, seed=1)), \
+                patch.object(gemini_client, 'scheduler', scheduler), \
+                patch.object(settings, 'ENABLE_CACHE', False):
+            response = asyncio.run(orchestrator.process_user_input(UserInput(problem="Mejorar la logística del almacén")))
+
+        self.assertEqual(len(response.results), 7)
+        self.assertTrue(all(result.status == ResultStatus.OK for result in response.results))
+        self.assertTrue(all(len(result.ideas) == settings.MAX_IDEAS_PER_TECHNIQUE for result in response.results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import sys
+import os
+import asyncio
+import unittest
+
+# Add project root to Python path to allow imports from benchmarks
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.loadtest import LoadTestServer, percentile, run_sweep
+
+
+class PercentileTests(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+
+class LoadTestHarnessTests(unittest.TestCase):
+
+    def test_short_sweep_against_the_flask_app(self):
+        with LoadTestServer("flask", latency_ms=10) as server:
+            results = asyncio.run(run_sweep(server.url, ["scamper", "stream"], [1, 4], duration=0.5))
+
+        self.assertEqual([(result["endpoint"], result["concurrency"]) for result in results],
+                         [("scamper", 1), ("scamper", 4), ("stream", 1), ("stream", 4)])
+        for result in results:
+            self.assertEqual(result["error_rate"], 0.0, result["errors"])
+            self.assertGreater(result["throughput_rps"], 0)
+            self.assertLessEqual(result["first_result_ms"]["p50"], result["latency_ms"]["p50"])
+        # The stream shows its first idea before the whole analysis is done
+        self.assertLess(results[2]["first_result_ms"]["p50"], results[2]["latency_ms"]["p50"])
+
+
+if __name__ == '__main__':
+    unittest.main()
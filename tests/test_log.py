@@ -0,0 +1,143 @@
+import sys
+import os
+import io
+import json
+import asyncio
+import logging
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, agents
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import UserInput
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.log import ROOT_LOGGER, configure_logging, get_logger, shutdown_logging
+from utils.rate_limiter import RequestScheduler
+from utils.tracing import InMemoryExporter, tracer
+from agents.orchestrator import orchestrator
+
+
+class BlockedStream:
+    """A stream whose writes hang until released, like a full stdout pipe."""
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.lines = []
+
+    def write(self, text):
+        self.released.wait()
+        self.lines.append(text)
+
+    def flush(self):
+        pass
+
+
+class LoggingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(self.reset_logging)
+
+    def reset_logging(self):
+        shutdown_logging()
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.propagate = True
+        root.setLevel(logging.NOTSET)
+
+    def configure(self, mode, **kwargs):
+        stream = io.StringIO()
+        configure_logging(mode, stream=stream, **kwargs)
+        return stream
+
+    def written(self, stream):
+        shutdown_logging()  # waits for the writer thread
+        return stream.getvalue().splitlines()
+
+    def run_analysis(self):
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        with patch.object(settings, 'LLM_BACKEND', 'stub'), \
+                patch.object(gemini_client, 'model', StubBackend(latency_ms=1, distribution="fixed")), \
+                patch.object(gemini_client, 'scheduler', scheduler), \
+                patch.object(settings, 'ENABLE_CACHE', False):
+            asyncio.run(orchestrator.process_user_input(UserInput(problem="Reducir el ruido en la oficina")))
+
+
+class LoggingModeTests(LoggingTestCase):
+
+    def test_server_mode_writes_one_json_line_per_analysis_without_agent_chatter(self):
+        stream = self.configure("server")
+        self.run_analysis()
+
+        entries = [json.loads(line) for line in self.written(stream)]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["logger"], "scamper.orchestrator")
+        self.assertEqual(entries[0]["level"], "INFO")
+        self.assertEqual(entries[0]["techniques_ok"], 7)
+        self.assertIn("duration_ms", entries[0])
+
+    def test_cli_mode_only_shows_problems(self):
+        stream = self.configure("cli")
+        self.run_analysis()
+        get_logger("llm").warning("Reintento agotado")
+
+        self.assertEqual(self.written(stream), ["Reintento agotado"])
+
+    def test_debug_level_shows_every_agent(self):
+        stream = self.configure("cli", level="DEBUG")
+        self.run_analysis()
+
+        lines = self.written(stream)
+        self.assertTrue(any("Substitute Agent" in line for line in lines))
+        self.assertTrue(any("Reverse Agent" in line for line in lines))
+
+    def test_json_lines_carry_the_active_trace(self):
+        stream = self.configure("server")
+        tracer.configure(InMemoryExporter())
+        self.addCleanup(tracer.configure, None)
+        with tracer.trace("request") as span:
+            get_logger("webapp").info("dentro de la traza")
+
+        entry = json.loads(self.written(stream)[0])
+        self.assertEqual(entry["trace_id"], span.trace_id)
+        self.assertEqual(entry["span_id"], span.span_id)
+
+    def test_exceptions_are_logged_with_their_traceback(self):
+        stream = self.configure("server")
+        try:
+            raise ValueError("respuesta inválida")
+        except ValueError:
+            get_logger("webapp").exception("Error in /api/scamper")
+
+        entry = json.loads(self.written(stream)[0])
+        self.assertEqual(entry["message"], "Error in /api/scamper")
+        self.assertIn("ValueError: respuesta inválida", entry["exception"])
+
+
+class NonBlockingTests(LoggingTestCase):
+
+    def test_stuck_output_never_blocks_the_caller(self):
+        stream = BlockedStream()
+        configure_logging("server", stream=stream, max_queue=10)
+        logger = get_logger("orchestrator")
+
+        start = time.perf_counter()
+        for i in range(200):
+            logger.info("mensaje %d", i)
+        elapsed = time.perf_counter() - start
+
+        stream.released.set()
+        shutdown_logging()
+        self.assertLess(elapsed, 0.5)
+        # The queue kept what fit; the rest was dropped instead of waiting
+        self.assertLess(len(stream.lines), 200)
+        self.assertGreater(len(stream.lines), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import sys
+import os
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, webapp, agents
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import UserInput
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.loop_monitor import LoopMonitor, loop_monitor
+from utils.metrics import LOOP_BLOCKS, LOOP_LAG, metrics
+from utils.rate_limiter import RequestScheduler
+from agents.orchestrator import orchestrator
+from webapp.app import app as flask_app
+
+# Generous enough for a loaded CI machine; a synchronous model call takes far longer
+THRESHOLD = 0.1
+
+
+def block_the_loop_on_purpose():
+    time.sleep(0.3)
+
+
+class LoopMonitorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.monitor = LoopMonitor(interval=0.01, threshold=THRESHOLD)
+        self.monitor.configure(enabled=True)
+
+    def run_watched(self, coro):
+        async def watched():
+            async with self.monitor.watch():
+                return await coro
+        return asyncio.run(watched())
+
+
+class DetectionTests(LoopMonitorTestCase):
+
+    def test_blocking_call_is_reported_with_its_stack(self):
+        async def handler():
+            await asyncio.sleep(0.03)
+            block_the_loop_on_purpose()
+            await asyncio.sleep(0.03)  # lets the heartbeat see the loop come back
+
+        with self.assertLogs("scamper.loop_monitor", level="WARNING") as logs:
+            self.run_watched(handler())
+
+        finding, = self.monitor.findings
+        self.assertEqual(finding.site, "tests/test_loop_monitor.py:block_the_loop_on_purpose")
+        self.assertIn("time.sleep(0.3)", finding.stack)
+        self.assertGreaterEqual(finding.duration, 0.2)
+        self.assertEqual(LOOP_BLOCKS.value(site=finding.site), 1)
+        self.assertIn("block_the_loop_on_purpose", logs.output[0])
+
+    def test_lag_is_measured_while_the_loop_is_idle(self):
+        self.run_watched(asyncio.sleep(0.1))
+
+        self.assertGreater(LOOP_LAG.count(), 3)
+        self.assertEqual(list(self.monitor.findings), [])
+        self.assertIn("scamper_event_loop_lag_seconds_bucket", metrics.render())
+
+    def test_disabled_monitor_starts_nothing(self):
+        self.monitor.configure(enabled=False)
+        self.run_watched(asyncio.sleep(0.05))
+
+        self.assertEqual(LOOP_LAG.count(), 0)
+        self.assertIsNone(self.monitor._thread)
+
+
+class NoBlockingRegressionTests(LoopMonitorTestCase):
+    """Fails when agent or client code starts blocking the event loop again."""
+
+    def setUp(self):
+        super().setUp()
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        # The stub sleeps like a real call, so it only passes if model calls stay off the loop
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),
+            patch.object(gemini_client, 'model', StubBackend(latency_ms=2 * THRESHOLD * 1000, distribution="fixed")),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(settings, 'ENABLE_CACHE', False),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def assert_loop_never_blocked(self):
+        self.assertEqual([finding.to_dict() for finding in self.monitor.findings], [])
+        self.assertGreater(LOOP_LAG.count(), 0)
+
+    def test_analysis_never_blocks_the_loop(self):
+        self.run_watched(orchestrator.process_user_input(UserInput(problem="Reducir el ruido en la oficina")))
+        self.assert_loop_never_blocked()
+
+    def test_streamed_analysis_never_blocks_the_loop(self):
+        async def consume():
+            return [event async for event, _ in orchestrator.stream_user_input(
+                UserInput(problem="Reducir el ruido en la oficina"))]
+
+        events = self.run_watched(consume())
+        self.assertEqual(events[-1], "summary")
+        self.assert_loop_never_blocked()
+
+    def test_flask_endpoint_is_watched_when_enabled(self):
+        with patch.object(loop_monitor, 'enabled', True), patch.object(loop_monitor, 'threshold', THRESHOLD):
+            response = flask_app.test_client().post('/api/scamper', json={"problem": "Reducir colas en el comedor"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(loop_monitor.findings), [])
+        self.assertGreater(LOOP_LAG.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
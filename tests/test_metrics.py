@@ -0,0 +1,136 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, webapp, agents
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.testclient import TestClient
+
+from config.settings import settings
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.metrics import AGENT_LATENCY, CACHE_LOOKUPS, MetricsRegistry, cache_hit_ratio, metrics
+from utils.rate_limiter import RequestScheduler
+from webapp.app import app as flask_app
+from webapp.asgi import app as asgi_app
+
+
+class MetricsRegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge_render_in_prometheus_text_format(self):
+        errors = self.registry.counter("errors_total", "Errors", ["kind"])
+        in_flight = self.registry.gauge("in_flight", "In flight")
+        errors.inc(kind="timeout")
+        errors.inc(2, kind="rate_limit")
+        with in_flight.track_inprogress():
+            in_flight_while_running = in_flight.value()
+
+        text = self.registry.render()
+        self.assertEqual(in_flight_while_running, 1)
+        self.assertIn("# TYPE errors_total counter", text)
+        self.assertIn('errors_total{kind="rate_limit"} 2', text)
+        self.assertIn('errors_total{kind="timeout"} 1', text)
+        self.assertIn("in_flight 0", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram("latency_seconds", "Latency", ["technique"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            latency.observe(value, technique="substitute")
+
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{technique="substitute",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{technique="substitute",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{technique="substitute",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{technique="substitute"} 4', text)
+        self.assertIn('latency_seconds_sum{technique="substitute"} 4.25', text)
+
+    def test_wrong_labels_are_rejected(self):
+        errors = self.registry.counter("errors_total", "Errors", ["kind"])
+        with self.assertRaises(ValueError):
+            errors.inc(technique="substitute")
+
+    def test_snapshots_from_other_processes_are_summed(self):
+        def build():
+            registry = MetricsRegistry()
+            return registry, registry.counter("calls_total", "Calls"), registry.histogram("latency_seconds", "Latency")
+
+        parent, parent_calls, parent_latency = build()
+        worker, worker_calls, worker_latency = build()
+        parent_calls.inc()
+        worker_calls.inc(3)
+        parent_latency.observe(0.2)
+        worker_latency.observe(0.4)
+
+        parent.merge(worker.snapshot())
+        self.assertEqual(parent_calls.value(), 4)
+        self.assertEqual(parent_latency.count(), 2)
+
+    def test_collectors_are_evaluated_at_render_time(self):
+        depth = [0]
+        self.registry.register_collector(lambda: [("queue_depth", "gauge", "Queue depth", [({}, depth[0])])])
+        depth[0] = 5
+        self.assertIn("queue_depth 5", self.registry.render())
+
+
+class MetricsEndpointTests(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),  # the real backend is never built
+            patch.object(gemini_client, 'model', StubBackend(latency_ms=1, distribution="fixed")),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(settings, 'ENABLE_CACHE', False),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def assert_analysis_was_recorded(self, text):
+        self.assertEqual(AGENT_LATENCY.count(technique="substitute", status="ok"), 1)
+        self.assertIn('scamper_http_requests_total{endpoint="/api/scamper",status="200"} 1', text)
+        self.assertIn('scamper_upstream_latency_seconds_count{mode="generate",outcome="ok"} 8', text)
+        self.assertIn('scamper_summary_latency_seconds_count{source="model"} 1', text)
+        self.assertIn('scamper_tokens_total{direction="output"}', text)
+        self.assertIn('scamper_http_requests_in_flight{endpoint="/api/scamper"} 0', text)
+        self.assertIn("scamper_scheduler_queue_depth", text)
+
+    def test_flask_exposes_metrics_after_an_analysis(self):
+        client = flask_app.test_client()
+        self.assertEqual(client.post('/api/scamper', json={"problem": "Reducir colas en el comedor"}).status_code, 200)
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        self.assert_analysis_was_recorded(response.get_data(as_text=True))
+
+    def test_asgi_exposes_metrics_after_an_analysis(self):
+        client = TestClient(asgi_app)
+        self.assertEqual(client.post('/api/scamper', json={"problem": "Reducir colas en el comedor"}).status_code, 200)
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assert_analysis_was_recorded(response.text)
+
+    def test_invalid_requests_are_counted_by_status(self):
+        client = flask_app.test_client()
+        client.post('/api/scamper', json={"problem": ""})
+
+        self.assertIn('scamper_http_requests_total{endpoint="/api/scamper",status="400"} 1',
+                      client.get('/metrics').get_data(as_text=True))
+
+    def test_cache_hit_ratio(self):
+        self.assertIsNone(cache_hit_ratio())
+        CACHE_LOOKUPS.inc(result="memory_hit")
+        CACHE_LOOKUPS.inc(result="miss")
+        self.assertEqual(cache_hit_ratio(), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, config, agents
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import UserInput
+from utils.circuit_breaker import CircuitBreaker
+from utils.errors import LLMUnavailableError
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.micro_batch import MicroBatcher
+from utils.rate_limiter import Priority, RequestScheduler, current_priority, priority_scope
+from agents.orchestrator import orchestrator
+
+
+class RecordingRunner:
+    """Answers every task with its own value doubled and records each batch."""
+
+    def __init__(self, missing=(), error=None):
+        self.batches = []
+        self.priorities = []
+        self.missing = set(missing)
+        self.error = error
+
+    async def __call__(self, tasks):
+        self.batches.append(list(tasks))
+        self.priorities.append(current_priority())
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return [None if task in self.missing else task * 2 for task in tasks]
+
+
+def run_in_threads(batcher, tasks):
+    """Submits each task from its own thread and event loop, like concurrent Flask requests."""
+    results = {}
+
+    def worker(task):
+        try:
+            results[task] = asyncio.run(batcher.submit(task))
+        except Exception as e:
+            results[task] = e
+
+    threads = [threading.Thread(target=worker, args=(task,)) for task in tasks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+class MicroBatcherTests(unittest.TestCase):
+
+    def test_tasks_from_different_loops_share_one_batch(self):
+        runner = RecordingRunner()
+        batcher = MicroBatcher(runner, max_size=10, window_seconds=0.2)
+
+        results = run_in_threads(batcher, [1, 2, 3, 4])
+
+        self.assertEqual(results, {1: 2, 2: 4, 3: 6, 4: 8})
+        self.assertEqual(len(runner.batches), 1)
+        self.assertEqual(sorted(runner.batches[0]), [1, 2, 3, 4])
+        self.assertEqual(batcher.get_stats()["batched_tasks"], 4)
+
+    def test_full_batch_leaves_without_waiting_for_the_window(self):
+        runner = RecordingRunner()
+        batcher = MicroBatcher(runner, max_size=3, window_seconds=10)
+
+        start = time.perf_counter()
+        results = run_in_threads(batcher, [1, 2, 3])
+
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(results, {1: 2, 2: 4, 3: 6})
+
+    def test_window_caps_the_wait_of_a_lone_task(self):
+        runner = RecordingRunner()
+        batcher = MicroBatcher(runner, max_size=10, window_seconds=0.05)
+
+        start = time.perf_counter()
+        self.assertEqual(asyncio.run(batcher.submit(5)), 10)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(runner.batches, [[5]])
+
+    def test_missing_results_and_errors_reach_every_caller(self):
+        batcher = MicroBatcher(RecordingRunner(missing={2}), max_size=2, window_seconds=1)
+        self.assertEqual(run_in_threads(batcher, [1, 2]), {1: 2, 2: None})
+
+        error = LLMUnavailableError("503")
+        batcher = MicroBatcher(RecordingRunner(error=error), max_size=2, window_seconds=1)
+        self.assertEqual(run_in_threads(batcher, [1, 2]), {1: error, 2: error})
+
+    def test_cancelled_callers_are_dropped_from_the_batch(self):
+        runner = RecordingRunner()
+        batcher = MicroBatcher(runner, max_size=10, window_seconds=0.1)
+
+        async def scenario():
+            leaving = asyncio.ensure_future(batcher.submit(1))
+            staying = asyncio.ensure_future(batcher.submit(2))
+            await asyncio.sleep(0)
+            leaving.cancel()
+            return await staying
+
+        self.assertEqual(asyncio.run(scenario()), 4)
+        self.assertEqual(runner.batches, [[2]])
+
+    def test_batch_runs_with_the_highest_priority_of_its_tasks(self):
+        runner = RecordingRunner()
+        batcher = MicroBatcher(runner, max_size=10, window_seconds=0.05)
+
+        async def scenario():
+            async def batch_task():
+                with priority_scope(Priority.BATCH):
+                    return await batcher.submit(1)
+            return await asyncio.gather(batch_task(), batcher.submit(2))
+
+        asyncio.run(scenario())
+        self.assertEqual(runner.priorities, [Priority.INTERACTIVE])
+
+
+class ClientMicroBatchingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.model = StubBackend(latency_ms=20, distribution="fixed")
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),
+            patch.object(settings, 'ENABLE_CACHE', False),
+            patch.object(settings, 'ENABLE_MICRO_BATCHING', True),
+            patch.object(gemini_client, 'model', self.model),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(gemini_client, 'breaker', CircuitBreaker()),
+            patch.object(gemini_client, 'batcher', MicroBatcher(gemini_client._generate_idea_batch, 8, 0.05)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def analyze(self, problems):
+        async def run():
+            return await asyncio.gather(*[orchestrator.process_user_input(UserInput(problem=problem))
+                                          for problem in problems])
+        return asyncio.run(run())
+
+    def test_concurrent_analyses_need_far_fewer_upstream_calls(self):
+        problems = [f"Reducir las colas del servicio número {number}" for number in range(6)]
+        with patch.object(settings, 'ENABLE_MICRO_BATCHING', False):
+            unbatched = self.analyze(problems)
+        unbatched_calls = self.model.calls
+
+        batched = self.analyze(problems)
+
+        # 42 technique calls travel in 6 batches; the 6 summaries still go one by one
+        self.assertEqual(unbatched_calls, 48)
+        self.assertEqual(self.model.calls - unbatched_calls, 12)
+        self.assertEqual([response.results for response in batched], [response.results for response in unbatched])
+
+    def test_tasks_missing_from_the_batched_answer_fall_back_to_their_own_call(self):
+        problems = ["Reducir las colas del comedor", "Mejorar la comunicación en equipos remotos"]
+        with patch.object(gemini_client, '_parse_batch_response', lambda response, count: [None] * count):
+            responses = self.analyze(problems)
+
+        self.assertTrue(all(result.ideas for response in responses for result in response.results))
+        self.assertEqual(self.model.calls, 2 + 14 + 2)  # batches, individual fallbacks, summaries
+
+    def test_parser_ignores_malformed_entries(self):
+        response = ('{"results": [{"id": 1, "ideas": [" Una ", ""]}, {"id": 7, "ideas": ["Fuera"]},'
+                    ' {"id": true, "ideas": ["Bool"]}, {"ideas": ["Sin id"]}, "texto"]}')
+        self.assertEqual(gemini_client._parse_batch_response(response, 3), [None, ["Una"], None])
+        self.assertEqual(gemini_client._parse_batch_response("no es json", 2), [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
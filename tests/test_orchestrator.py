@@ -0,0 +1,209 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from agents, models, utils
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import UserInput, ScamperTechnique, ResultStatus
+from utils.gemini_client import gemini_client
+from utils.rate_limiter import RequestScheduler
+from agents.orchestrator import orchestrator
+
+
+class CombinedStubModel:
+    """Answers structured prompts with JSON for some techniques and plain prompts with a numbered list."""
+
+    def __init__(self, techniques, summary="Resumen combinado"):
+        self.techniques = techniques
+        self.summary = summary
+        self.json_calls = 0
+        self.text_calls = 0
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        class Response:
+            pass
+        response = Response()
+        if generation_config is not None and generation_config.response_mime_type == "application/json":
+            self.json_calls += 1
+            payload = {technique.value: [f"Idea {technique.value} {i}" for i in range(5)] for technique in self.techniques}
+            if self.summary:
+                payload["summary"] = self.summary
+            response.text = json.dumps(payload)
+        else:
+            self.text_calls += 1
+            response.text = "1. Idea individual uno\n2. Idea individual dos"
+        return response
+
+
+class CombinedGenerationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.user_input = UserInput(problem="Mejorar la comunicación en equipos remotos", context="Empresa distribuida")
+        cache_patch = patch.object(settings, 'ENABLE_CACHE', False)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def run_orchestrator(self, stub):
+        with patch.object(gemini_client, 'model', stub), \
+                patch.object(settings, 'ENABLE_COMBINED_GENERATION', True):
+            return asyncio.run(orchestrator.process_user_input(self.user_input))
+
+    def test_single_call_when_all_techniques_are_present(self):
+        stub = CombinedStubModel(list(ScamperTechnique))
+        response = self.run_orchestrator(stub)
+
+        self.assertEqual(stub.json_calls, 1)
+        self.assertEqual(stub.text_calls, 0)
+        self.assertEqual([r.technique for r in response.results], list(ScamperTechnique))
+        for result in response.results:
+            self.assertEqual(len(result.ideas), settings.MAX_IDEAS_PER_TECHNIQUE)
+            self.assertTrue(result.explanation)
+        self.assertEqual(response.summary, "Resumen combinado")
+
+    def test_missing_techniques_fall_back_to_agents(self):
+        present = [ScamperTechnique.SUBSTITUTE, ScamperTechnique.COMBINE, ScamperTechnique.ADAPT]
+        stub = CombinedStubModel(present)
+        response = self.run_orchestrator(stub)
+
+        # One combined call, one per missing technique and the summary
+        self.assertEqual(stub.json_calls, 1)
+        self.assertEqual(stub.text_calls, len(ScamperTechnique) - len(present) + 1)
+        self.assertEqual([r.technique for r in response.results], list(ScamperTechnique))
+        by_technique = {r.technique: r for r in response.results}
+        self.assertEqual(by_technique[ScamperTechnique.SUBSTITUTE].ideas[0], "Idea substitute 0")
+        self.assertEqual(by_technique[ScamperTechnique.REVERSE].ideas, ["Idea individual uno", "Idea individual dos"])
+
+    def test_invalid_json_uses_all_agents(self):
+        class BrokenModel(CombinedStubModel):
+            def generate_content(self, prompt, generation_config=None, **kwargs):
+                response = super().generate_content(prompt, generation_config)
+                if generation_config is not None and generation_config.response_mime_type == "application/json":
+                    response.text = "{no es json"
+                return response
+
+        stub = BrokenModel(list(ScamperTechnique))
+        response = self.run_orchestrator(stub)
+
+        self.assertEqual(stub.text_calls, len(ScamperTechnique) + 1)
+        self.assertEqual(len(response.results), len(ScamperTechnique))
+
+
+class SlowTechniqueModel:
+    """Blocking stub where the substitute prompt is much slower than the rest."""
+
+    def __init__(self, slow_latency=1.0, latency=0.02):
+        self.slow_latency = slow_latency
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.slow_latency if "SUSTITUIR" in prompt else self.latency)
+
+        class Response:
+            text = "1. Idea uno"
+        return [Response()] if stream else Response()
+
+
+class DeadlineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.user_input = UserInput(problem="Mejorar la comunicación en equipos remotos")
+        cache_patch = patch.object(settings, 'ENABLE_CACHE', False)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        # Calls abandoned at the deadline keep their scheduler slot until the thread returns
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        scheduler_patch = patch.object(gemini_client, 'scheduler', scheduler)
+        scheduler_patch.start()
+        self.addCleanup(scheduler_patch.stop)
+
+    def run_with_budget(self, stub, time_budget, parallel=True):
+        async def run_test():
+            start = time.perf_counter()
+            response = await orchestrator.process_user_input(self.user_input, time_budget=time_budget)
+            return response, time.perf_counter() - start
+
+        with patch.object(gemini_client, 'model', stub), \
+                patch.object(settings, 'ENABLE_PARALLEL_EXECUTION', parallel):
+            return asyncio.run(run_test())
+
+    def test_parallel_returns_partial_results_at_deadline(self):
+        stub = SlowTechniqueModel(slow_latency=1.0)
+        response, elapsed = self.run_with_budget(stub, time_budget=0.3)
+
+        self.assertLess(elapsed, 0.6)
+        self.assertTrue(response.partial)
+        by_technique = {r.technique: r for r in response.results}
+        self.assertEqual(by_technique[ScamperTechnique.SUBSTITUTE].status, ResultStatus.TIMEOUT)
+        self.assertEqual(by_technique[ScamperTechnique.SUBSTITUTE].ideas, [])
+        self.assertEqual(by_technique[ScamperTechnique.COMBINE].status, ResultStatus.OK)
+        self.assertEqual([r.technique for r in response.results], list(ScamperTechnique))
+        # The summary is built locally instead of spending a model call past the deadline
+        self.assertEqual(stub.calls, 7)
+        self.assertIn("6 técnicas", response.summary)
+
+    def test_sequential_marks_remaining_techniques_as_timed_out(self):
+        stub = SlowTechniqueModel(slow_latency=1.0)
+        response, elapsed = self.run_with_budget(stub, time_budget=0.3, parallel=False)
+
+        self.assertLess(elapsed, 0.6)
+        self.assertTrue(response.partial)
+        # Substitute runs first and uses up the whole budget
+        self.assertTrue(all(r.status == ResultStatus.TIMEOUT for r in response.results))
+
+    def test_generous_budget_is_not_partial(self):
+        stub = SlowTechniqueModel(slow_latency=0.05)
+        response, _ = self.run_with_budget(stub, time_budget=30)
+
+        self.assertFalse(response.partial)
+        self.assertTrue(all(r.status == ResultStatus.OK for r in response.results))
+        # Seven agents plus the model-written summary
+        self.assertEqual(stub.calls, 8)
+
+
+class StreamingTests(unittest.TestCase):
+
+    def test_results_are_yielded_as_agents_finish(self):
+        class SlowSubstituteModel:
+            def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+                # The substitute agent is the slowest one
+                time.sleep(0.4 if "SUSTITUIR" in prompt else 0.05)
+
+                class Response:
+                    text = "1. Idea uno"
+                return [Response()] if stream else Response()
+
+        user_input = UserInput(problem="Mejorar la comunicación en equipos remotos")
+
+        async def run_test():
+            events = []
+            start = time.perf_counter()
+            async for event, payload in orchestrator.stream_user_input(user_input):
+                events.append((event, payload, time.perf_counter() - start))
+            return events
+
+        with patch.object(gemini_client, 'model', SlowSubstituteModel()), \
+                patch.object(settings, 'ENABLE_CACHE', False):
+            events = asyncio.run(run_test())
+
+        results = [(payload, elapsed) for event, payload, elapsed in events if event == "result"]
+        self.assertEqual(len(results), 7)
+        self.assertEqual(events[-1][0], "summary")
+        self.assertEqual(results[-1][0].technique, ScamperTechnique.SUBSTITUTE)
+        # The first result does not wait for the slowest agent
+        self.assertLess(results[0][1], 0.3)
+        # Every idea is announced before the result of its technique
+        ideas = [payload for event, payload, _ in events if event == "idea"]
+        self.assertEqual(len(ideas), 7)
+        self.assertIn((ScamperTechnique.SUBSTITUTE, "Idea uno"), ideas)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,296 @@
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.rate_limiter import (
+    AdaptiveConcurrencyLimit,
+    Priority,
+    RequestScheduler,
+    SharedRateBudget,
+    TokenBucket,
+    priority_scope,
+)
+from utils.errors import is_rate_limit_error
+from config.settings import settings
+from models.schemas import UserInput
+from utils.circuit_breaker import CircuitBreaker
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.single_flight import SingleFlight
+from webapp.app import iterate_async
+from webapp.common import stream_scamper_events
+
+
+def acquire_shared(path, attempts):
+    """Runs in a separate process: counts the calls admitted by the shared budget."""
+    budget = SharedRateBudget(path, requests_per_minute=15, tokens_per_minute=10 ** 6)
+    return sum(1 for _ in range(attempts) if budget.try_acquire(10) == 0)
+
+
+def make_scheduler(max_concurrency=2, rpm=100000, tpm=10000000):
+    return RequestScheduler(requests_per_minute=rpm, tokens_per_minute=tpm, max_concurrency=max_concurrency)
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def test_refills_continuously(self):
+        bucket = TokenBucket(per_minute=60, capacity=2)
+        now = bucket.updated
+        bucket.consume(2, now)
+        self.assertAlmostEqual(bucket.time_until_available(1, now), 1.0)
+        self.assertEqual(bucket.time_until_available(1, now + 1.0), 0.0)
+
+    def test_actual_usage_adjusts_balance(self):
+        bucket = TokenBucket(per_minute=600, capacity=100)
+        now = bucket.updated
+        bucket.consume(100, now)
+        bucket.adjust(40)  # The call used 40 tokens less than estimated
+        self.assertEqual(bucket.time_until_available(40, now), 0.0)
+
+
+class AdaptiveConcurrencyTests(unittest.TestCase):
+
+    def test_halves_on_rate_limit_and_recovers_gradually(self):
+        limit = AdaptiveConcurrencyLimit(max_limit=16, min_limit=1)
+        limit.on_rate_limited()
+        self.assertEqual(limit.current, 8)
+        # A second 429 from the same burst is ignored
+        limit.on_rate_limited()
+        self.assertEqual(limit.current, 8)
+
+        # Roughly +1 after a full window of successful calls
+        for _ in range(9):
+            limit.on_success()
+        self.assertEqual(limit.current, 9)
+
+    def test_detects_quota_errors(self):
+        class ResourceExhausted(Exception):
+            code = 429
+        self.assertTrue(is_rate_limit_error(ResourceExhausted("Quota exceeded")))
+        self.assertTrue(is_rate_limit_error(Exception("429 Resource has been exhausted")))
+        self.assertFalse(is_rate_limit_error(Exception("500 Internal error")))
+
+
+class SharedRateBudgetTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "budget")
+
+    def test_instances_share_one_budget(self):
+        first = SharedRateBudget(self.path, requests_per_minute=60, tokens_per_minute=1000)
+        second = SharedRateBudget(self.path, requests_per_minute=60, tokens_per_minute=1000)
+
+        self.assertEqual(first.try_acquire(600), 0)
+        # The second instance sees the tokens consumed by the first one
+        self.assertGreater(second.try_acquire(600), 0)
+        second.adjust_tokens(500)  # The first call used fewer tokens than estimated
+        self.assertEqual(second.try_acquire(600), 0)
+
+    def test_processes_share_one_budget(self):
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=3, mp_context=context) as pool:
+            admitted = list(pool.map(acquire_shared, [self.path] * 3, [10] * 3))
+
+        # 15 requests per minute between all processes, not 15 each
+        self.assertEqual(sum(admitted), 15)
+
+    def test_scheduler_uses_shared_budget(self):
+        budget = SharedRateBudget(self.path, requests_per_minute=600, tokens_per_minute=10 ** 6)
+        scheduler = RequestScheduler(600, 10 ** 6, max_concurrency=1000, budget=budget)
+        other_process = SharedRateBudget(self.path, requests_per_minute=600, tokens_per_minute=10 ** 6)
+        for _ in range(600):
+            other_process.try_acquire(0)
+
+        async def run_test():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            permit = await scheduler.acquire(0)
+            permit.release()
+            return loop.time() - start
+
+        # The budget was used up elsewhere, so the next call waits for the refill
+        self.assertGreater(asyncio.run(run_test()), 0.05)
+
+
+class RequestSchedulerTests(unittest.TestCase):
+
+    def test_caps_concurrency(self):
+        scheduler = make_scheduler(max_concurrency=2)
+        active = 0
+        max_active = 0
+
+        async def call():
+            nonlocal active, max_active
+            permit = await scheduler.acquire(10)
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            permit.release()
+
+        async def run_test():
+            await asyncio.gather(*[call() for _ in range(6)])
+
+        asyncio.run(run_test())
+        self.assertEqual(max_active, 2)
+        self.assertEqual(scheduler.get_stats()["admitted"], 6)
+        self.assertEqual(scheduler.get_stats()["in_flight"], 0)
+
+    def test_interactive_calls_go_before_batch(self):
+        scheduler = make_scheduler(max_concurrency=1)
+        order = []
+
+        async def call(name, priority):
+            permit = await scheduler.acquire(10, priority=priority)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            permit.release()
+
+        async def run_test():
+            blocker = await scheduler.acquire(10)
+            tasks = [asyncio.create_task(call("batch-1", Priority.BATCH)),
+                     asyncio.create_task(call("batch-2", Priority.BATCH))]
+            await asyncio.sleep(0.01)
+            tasks.append(asyncio.create_task(call("interactive", Priority.INTERACTIVE)))
+            await asyncio.sleep(0.01)
+
+            stats = scheduler.get_stats()
+            self.assertEqual(stats["queue_depth"], 3)
+            self.assertEqual(stats["queue_depth_by_priority"], {"interactive": 1, "batch": 2})
+
+            blocker.release()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run_test())
+        self.assertEqual(order, ["interactive", "batch-1", "batch-2"])
+
+    def test_priority_comes_from_context(self):
+        scheduler = make_scheduler()
+
+        async def run_test():
+            with priority_scope(Priority.BATCH):
+                permit = await scheduler.acquire(10)
+            permit.release()
+            return permit.priority
+
+        self.assertEqual(asyncio.run(run_test()), Priority.BATCH)
+
+    def test_request_budget_delays_calls(self):
+        # 600 requests per minute with a full bucket of 600: the 601st waits ~0.1s
+        scheduler = make_scheduler(max_concurrency=1000, rpm=600)
+
+        async def run_test():
+            loop = asyncio.get_running_loop()
+            permits = [await scheduler.acquire(0) for _ in range(600)]
+            start = loop.time()
+            permits.append(await scheduler.acquire(0))
+            elapsed = loop.time() - start
+            for permit in permits:
+                permit.release()
+            return elapsed
+
+        self.assertGreater(asyncio.run(run_test()), 0.05)
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = make_scheduler(max_concurrency=1)
+
+        async def run_test():
+            blocker = await scheduler.acquire(10)
+            waiting = asyncio.create_task(scheduler.acquire(10))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual(scheduler.get_stats()["queue_depth"], 0)
+            blocker.release()
+
+        asyncio.run(run_test())
+
+    def test_waiters_of_a_closed_loop_leave_the_queue(self):
+        scheduler = make_scheduler(max_concurrency=1)
+        blocker = asyncio.run(scheduler.acquire(10))
+
+        # A loop closed with a call still queued never runs that call's cleanup
+        loop = asyncio.new_event_loop()
+        abandoned = loop.create_task(scheduler.acquire(10))
+        loop.run_until_complete(asyncio.sleep(0.01))
+        loop.close()
+        self.assertFalse(abandoned.done())
+
+        async def fresh_call():
+            blocker.release()
+            permit = await asyncio.wait_for(scheduler.acquire(10), timeout=2)
+            permit.release()
+
+        asyncio.run(fresh_call())
+        self.assertEqual(scheduler.get_stats()["queue_depth"], 0)
+
+    def test_abandoned_stream_does_not_block_later_calls(self):
+        scheduler = make_scheduler(max_concurrency=1)
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),
+            patch.object(settings, 'ENABLE_CACHE', False),
+            patch.object(settings, 'ENABLE_SEMANTIC_CACHE', False),
+            patch.object(gemini_client, 'model', StubBackend(latency_ms=50, distribution="fixed")),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(gemini_client, 'breaker', CircuitBreaker()),
+            patch.object(gemini_client, 'single_flight', SingleFlight()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # The client of a Flask SSE stream leaves after two frames, with model calls still queued
+        frames = iterate_async(stream_scamper_events(UserInput(problem="Reducir las colas en el comedor")))
+        next(frames)
+        next(frames)
+        frames.close()
+
+        async def fresh_call():
+            permit = await asyncio.wait_for(scheduler.acquire(10), timeout=2)
+            permit.release()
+
+        asyncio.run(fresh_call())
+        self.assertEqual(scheduler.get_stats()["queue_depth"], 0)
+
+    def test_shared_between_event_loops(self):
+        # Flask serves every request on its own event loop in its own thread
+        scheduler = make_scheduler(max_concurrency=2)
+        lock = threading.Lock()
+        active = 0
+        max_active = 0
+
+        async def call():
+            nonlocal active, max_active
+            permit = await scheduler.acquire(10)
+            with lock:
+                active += 1
+                max_active = max(max_active, active)
+            await asyncio.sleep(0.05)
+            with lock:
+                active -= 1
+            permit.release()
+
+        threads = [threading.Thread(target=lambda: asyncio.run(call())) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(max_active, 2)
+        self.assertEqual(scheduler.get_stats()["admitted"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
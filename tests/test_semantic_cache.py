@@ -0,0 +1,192 @@
+import sys
+import os
+import asyncio
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, config, agents
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import ResultStatus, ScamperResponse, ScamperResult, ScamperTechnique, UserInput
+from utils.cache import IdeaCache, MemoryCache
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.rate_limiter import RequestScheduler
+from utils.semantic_cache import MinHasher, SemanticCache, same_problem, shingles, similarity, words
+from agents.orchestrator import orchestrator
+
+REMOTE_TEAMS = "Mejorar la comunicación en equipos remotos"
+REMOTE_TEAMS_REWORDED = "mejorar comunicación de equipos en remoto"
+
+# One content word out of five changes: a miss with the default word check
+SHORT_PROBLEM = "reducir las colas del comedor universitario"
+SHORT_PROBLEM_ONE_WORD_CHANGED = "reducir las colas en el comedor de la universidad"
+
+# Different problems that share most of their letters
+LOOKALIKE_PAIRS = [
+    ("mejorar la comunicación interna de la empresa", "mejorar la comunidad interna de la empresa"),
+    ("aumentar las ventas de la tienda", "aumentar las ventanas de la tienda"),
+    ("no quiero reducir costes", "quiero reducir costes"),
+    ("lanzar el producto sin publicidad en redes sociales", "lanzar el producto con publicidad en redes sociales"),
+]
+
+
+def make_response(problem, status=ResultStatus.OK):
+    return ScamperResponse(
+        original_problem=problem,
+        results=[ScamperResult(technique=ScamperTechnique.SUBSTITUTE, ideas=["Idea"], explanation="", status=status)],
+        summary="Resumen"
+    )
+
+
+class SimilarityTests(unittest.TestCase):
+
+    def score(self, first, second):
+        hasher = MinHasher()
+        return similarity(hasher.signature(shingles(first)), hasher.signature(shingles(second)))
+
+    def test_rewording_keeps_the_problem(self):
+        self.assertGreaterEqual(self.score(REMOTE_TEAMS, REMOTE_TEAMS_REWORDED), 0.9)
+
+    def test_different_problems_stay_apart(self):
+        self.assertLess(self.score(REMOTE_TEAMS, "Empeorar la comunicación en equipos remotos"), 0.8)
+        self.assertLess(self.score("Reducir colas en el comedor", "Reducir colas en el gimnasio"), 0.8)
+        self.assertEqual(self.score(REMOTE_TEAMS, "Reducir el ruido en la oficina"), 0.0)
+
+    def test_lookalike_problems_fail_the_word_check(self):
+        for first, second in LOOKALIKE_PAIRS:
+            with self.subTest(first=first, second=second):
+                self.assertFalse(same_problem(words(first), words(second)))
+        self.assertTrue(same_problem(words(REMOTE_TEAMS), words(REMOTE_TEAMS_REWORDED)))
+
+    def test_verify_threshold_comes_from_settings(self):
+        first, second = words(SHORT_PROBLEM), words(SHORT_PROBLEM_ONE_WORD_CHANGED)
+        self.assertFalse(same_problem(first, second))
+        with patch.object(settings, 'SEMANTIC_CACHE_VERIFY_THRESHOLD', 0.6):
+            self.assertTrue(same_problem(first, second))
+
+    def test_context_is_part_of_the_problem(self):
+        self.assertNotEqual(shingles(REMOTE_TEAMS, "Empresa de software"), shingles(REMOTE_TEAMS))
+
+
+class SemanticCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SemanticCache(threshold=0.8, max_entries=2, ttl_seconds=60)
+
+    def test_paraphrase_hits_and_unrelated_problem_misses(self):
+        self.cache.set(UserInput(problem=REMOTE_TEAMS), make_response(REMOTE_TEAMS))
+
+        response, score = self.cache.get(UserInput(problem=REMOTE_TEAMS_REWORDED))
+        self.assertEqual(response.original_problem, REMOTE_TEAMS)
+        self.assertGreaterEqual(score, 0.8)
+        self.assertIsNone(self.cache.get(UserInput(problem="Reducir el ruido en la oficina")))
+        self.assertEqual(self.cache.get_stats()["hits"], 1)
+
+    def test_lookalike_problems_are_not_served(self):
+        for first, second in LOOKALIKE_PAIRS:
+            with self.subTest(first=first, second=second):
+                cache = SemanticCache(threshold=0.8, max_entries=10, ttl_seconds=60)
+                cache.set(UserInput(problem=first), make_response(first))
+                self.assertIsNone(cache.get(UserInput(problem=second)))
+                self.assertIsNotNone(cache.get(UserInput(problem=first)))
+
+    def test_lower_verify_threshold_serves_looser_rewordings(self):
+        strict = SemanticCache(threshold=0.7, max_entries=10, ttl_seconds=60)
+        loose = SemanticCache(threshold=0.7, max_entries=10, ttl_seconds=60, verify_threshold=0.6)
+        for cache in (strict, loose):
+            cache.set(UserInput(problem=SHORT_PROBLEM), make_response(SHORT_PROBLEM))
+
+        self.assertIsNone(strict.get(UserInput(problem=SHORT_PROBLEM_ONE_WORD_CHANGED)))
+        self.assertIsNotNone(loose.get(UserInput(problem=SHORT_PROBLEM_ONE_WORD_CHANGED)))
+
+    def test_failed_or_partial_responses_are_not_stored(self):
+        self.cache.set(UserInput(problem=REMOTE_TEAMS), make_response(REMOTE_TEAMS, ResultStatus.ERROR))
+        self.cache.set(UserInput(problem=REMOTE_TEAMS), make_response(REMOTE_TEAMS).model_copy(update={"partial": True}))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_evicts_least_recently_used_and_its_buckets(self):
+        self.cache.set(UserInput(problem=REMOTE_TEAMS), make_response(REMOTE_TEAMS))
+        self.cache.set(UserInput(problem="Reducir el ruido en la oficina"), make_response("ruido"))
+        self.cache.get(UserInput(problem=REMOTE_TEAMS))
+        self.cache.set(UserInput(problem="Reducir colas en el comedor"), make_response("colas"))
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNotNone(self.cache.get(UserInput(problem=REMOTE_TEAMS)))
+        self.assertIsNone(self.cache.get(UserInput(problem="Reducir el ruido en la oficina")))
+        self.assertEqual(sum(len(bucket) for bucket in self.cache._buckets.values()), 2 * 16)
+
+    def test_entries_expire_after_ttl(self):
+        with patch('utils.semantic_cache.time.monotonic', return_value=1000.0):
+            self.cache.set(UserInput(problem=REMOTE_TEAMS), make_response(REMOTE_TEAMS))
+        with patch('utils.semantic_cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(self.cache.get(UserInput(problem=REMOTE_TEAMS)))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_answers_from_other_generation_settings_are_not_reused(self):
+        self.cache.set(UserInput(problem=REMOTE_TEAMS), make_response(REMOTE_TEAMS))
+        with patch.object(settings, 'GEMINI_TEMPERATURE', 0.2):
+            self.assertIsNone(self.cache.get(UserInput(problem=REMOTE_TEAMS)))
+
+    def test_answers_from_another_backend_are_not_reused(self):
+        with patch.object(settings, 'LLM_BACKEND', 'stub'):
+            self.cache.set(UserInput(problem=REMOTE_TEAMS), make_response(REMOTE_TEAMS))
+        with patch.object(settings, 'LLM_BACKEND', 'gemini'):
+            self.assertIsNone(self.cache.get(UserInput(problem=REMOTE_TEAMS)))
+
+
+class OrchestratorSemanticCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.model = StubBackend(latency_ms=1, distribution="fixed")
+        self.cache = SemanticCache(threshold=0.8, max_entries=10, ttl_seconds=60)
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),
+            patch.object(gemini_client, 'model', self.model),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(gemini_client, 'cache', IdeaCache(MemoryCache(100, 60))),
+            patch.object(settings, 'ENABLE_CACHE', True),
+            patch.object(settings, 'ENABLE_SEMANTIC_CACHE', True),
+            patch('agents.orchestrator.semantic_cache', self.cache),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reworded_problem_skips_every_upstream_call(self):
+        first = asyncio.run(orchestrator.process_user_input(UserInput(problem=REMOTE_TEAMS)))
+        calls = self.model.calls
+        self.assertEqual(calls, 8)
+
+        second = asyncio.run(orchestrator.process_user_input(UserInput(problem=REMOTE_TEAMS_REWORDED)))
+
+        self.assertEqual(self.model.calls, calls)
+        self.assertEqual(second.original_problem, REMOTE_TEAMS_REWORDED)
+        self.assertEqual(second.results, first.results)
+        self.assertEqual(second.summary, first.summary)
+
+    def test_stream_replays_a_stored_answer(self):
+        asyncio.run(orchestrator.process_user_input(UserInput(problem=REMOTE_TEAMS)))
+        calls = self.model.calls
+
+        async def consume():
+            return [event async for event in orchestrator.stream_user_input(UserInput(problem=REMOTE_TEAMS_REWORDED))]
+
+        events = asyncio.run(consume())
+        self.assertEqual(self.model.calls, calls)
+        self.assertEqual(sum(event == "result" for event, _ in events), 7)
+        self.assertGreater(sum(event == "idea" for event, _ in events), 7)
+        self.assertEqual(events[-1][0], "summary")
+
+    def test_disabled_semantic_cache_calls_the_model(self):
+        with patch.object(settings, 'ENABLE_SEMANTIC_CACHE', False):
+            asyncio.run(orchestrator.process_user_input(UserInput(problem=REMOTE_TEAMS)))
+            asyncio.run(orchestrator.process_user_input(UserInput(problem=REMOTE_TEAMS_REWORDED)))
+        self.assertEqual(self.model.calls, 16)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
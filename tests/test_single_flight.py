@@ -0,0 +1,266 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from utils.single_flight import SingleFlight
+from utils.gemini_client import gemini_client
+from webapp.app import iterate_async
+
+
+class StubModel:
+    """Blocking stand-in for genai.GenerativeModel that counts upstream calls."""
+
+    def __init__(self, latency=0.1):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+        class Response:
+            text = "1. Idea uno\n2. Idea dos\n3. Idea tres"
+        return Response()
+
+
+class CountingProducer:
+    """Publishes the given items with a delay between them and returns them all."""
+
+    def __init__(self, items=("a", "b", "c"), delay=0.05, error=None):
+        self.items = items
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, publish):
+        self.calls += 1
+        try:
+            for item in self.items:
+                await asyncio.sleep(self.delay)
+                publish(item)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return list(self.items)
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def test_concurrent_identical_calls_share_one_producer(self):
+        flights = SingleFlight()
+        producer = CountingProducer()
+
+        async def run_test():
+            return await asyncio.gather(*[flights.do("key", producer) for _ in range(40)])
+
+        results = asyncio.run(run_test())
+        self.assertEqual(producer.calls, 1)
+        self.assertTrue(all(result == ["a", "b", "c"] for result in results))
+        stats = flights.get_stats()
+        self.assertEqual(stats["coalesced"], 39)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_errors_reach_every_caller(self):
+        flights = SingleFlight()
+        producer = CountingProducer(error=ValueError("fallo"))
+
+        async def run_test():
+            return await asyncio.gather(*[flights.do("key", producer) for _ in range(3)], return_exceptions=True)
+
+        results = asyncio.run(run_test())
+        self.assertEqual(producer.calls, 1)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        flights = SingleFlight()
+        producer = CountingProducer()
+
+        async def run_test():
+            leader = asyncio.create_task(flights.do("key", producer))
+            follower = asyncio.create_task(flights.do("key", producer))
+            await asyncio.sleep(0.02)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(run_test()), ["a", "b", "c"])
+        self.assertEqual(producer.calls, 1)
+        self.assertEqual(producer.cancelled, 0)
+
+    def test_last_caller_leaving_cancels_the_call(self):
+        flights = SingleFlight()
+        producer = CountingProducer(delay=1.0)
+
+        async def run_test():
+            tasks = [asyncio.create_task(flights.do("key", producer)) for _ in range(2)]
+            await asyncio.sleep(0.02)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run_test())
+        self.assertEqual(producer.cancelled, 1)
+        self.assertEqual(flights.get_stats()["in_flight"], 0)
+
+    def test_stream_followers_receive_items_progressively(self):
+        flights = SingleFlight()
+        producer = CountingProducer(delay=0.1)
+
+        async def consume(received):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            async for item in flights.stream("key", producer):
+                received.append((item, loop.time() - start))
+
+        async def run_test():
+            first, second = [], []
+            await asyncio.gather(consume(first), consume(second))
+            return first, second
+
+        first, second = asyncio.run(run_test())
+        self.assertEqual(producer.calls, 1)
+        self.assertEqual([item for item, _ in second], ["a", "b", "c"])
+        # The first item arrives long before the call finishes
+        self.assertLess(second[0][1], 0.2)
+
+    def test_callers_on_different_event_loops_share_the_call(self):
+        # Flask serves every request on its own event loop in its own thread
+        flights = SingleFlight()
+        producer = CountingProducer(delay=0.05)
+        results = []
+
+        def request():
+            results.append(asyncio.run(flights.do("key", producer)))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(producer.calls, 1)
+
+    def test_follower_takes_over_when_the_leader_loop_closes(self):
+        flights = SingleFlight()
+        producer = CountingProducer(delay=0.1)
+        leader_started = threading.Event()
+
+        async def leader():
+            task = asyncio.create_task(flights.do("key", producer))
+            await asyncio.sleep(0.02)
+            leader_started.set()
+            # The request ends early; asyncio.run then cancels the shared task with its loop
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        def follower():
+            leader_started.wait(timeout=5)
+            return asyncio.run(flights.do("key", producer))
+
+        results = []
+        follower_thread = threading.Thread(target=lambda: results.append(follower()))
+        follower_thread.start()
+        asyncio.run(leader())
+        follower_thread.join(timeout=5)
+
+        self.assertEqual(results, [["a", "b", "c"]])
+        self.assertEqual(producer.calls, 2)
+        self.assertEqual(flights.get_stats()["aborted"], 1)
+
+    def follow_in_thread(self, flights, producer, results):
+        async def collect():
+            return [item async for item in flights.stream("key", producer)]
+
+        # Daemon: without a way to notice the leader's loop is gone it would hang forever
+        thread = threading.Thread(target=lambda: results.append(asyncio.run(collect())), daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while flights.get_stats()["coalesced"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return thread
+
+    def test_follower_takes_over_when_the_leader_loop_is_closed_without_cleanup(self):
+        flights = SingleFlight()
+        producer = CountingProducer(delay=0.1)
+        results = []
+
+        loop = asyncio.new_event_loop()
+        leader = loop.create_task(flights.do("key", producer))
+        loop.run_until_complete(asyncio.sleep(0.02))
+        follower = self.follow_in_thread(flights, producer, results)
+        # The shared task is destroyed with its loop and never runs its cancellation
+        loop.close()
+        follower.join(timeout=5)
+
+        self.assertFalse(leader.done())
+        self.assertEqual(results, [["a", "b", "c"]])
+        self.assertEqual(producer.calls, 2)
+        self.assertEqual(flights.get_stats()["in_flight"], 0)
+
+    def test_follower_takes_over_when_a_flask_stream_is_abandoned(self):
+        flights = SingleFlight()
+        producer = CountingProducer(items=("a", "b", "c", "d"), delay=0.1)
+        results = []
+
+        leader = iterate_async(flights.stream("key", producer))
+        self.assertEqual(next(leader), "a")
+        follower = self.follow_in_thread(flights, producer, results)
+        self.assertEqual(next(leader), "b")
+        # The SSE client disconnects: Flask closes the response generator
+        leader.close()
+        follower.join(timeout=5)
+
+        self.assertEqual(results, [["a", "b", "c", "d"]])
+        self.assertEqual(flights.get_stats()["in_flight"], 0)
+
+
+class ClientSingleFlightTests(unittest.TestCase):
+
+    def test_workshop_burst_makes_one_upstream_call(self):
+        stub = StubModel(latency=0.2)
+
+        async def run_test():
+            return await asyncio.gather(*[
+                gemini_client.generate_scamper_ideas("substitute", "Ejemplo del facilitador", "Taller")
+                for _ in range(40)
+            ])
+
+        with patch.object(gemini_client, 'model', stub), \
+                patch.object(settings, 'ENABLE_CACHE', False):
+            results = asyncio.run(run_test())
+
+        self.assertEqual(stub.calls, 1)
+        self.assertTrue(all(result == ["Idea uno", "Idea dos", "Idea tres"] for result in results))
+
+    def test_disabled_single_flight_calls_upstream_each_time(self):
+        stub = StubModel(latency=0.05)
+
+        async def run_test():
+            return await asyncio.gather(*[
+                gemini_client.generate_scamper_ideas("substitute", "Ejemplo del facilitador") for _ in range(3)
+            ])
+
+        with patch.object(gemini_client, 'model', stub), \
+                patch.object(settings, 'ENABLE_CACHE', False), \
+                patch.object(settings, 'ENABLE_SINGLE_FLIGHT', False):
+            asyncio.run(run_test())
+
+        self.assertEqual(stub.calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
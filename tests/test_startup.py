@@ -0,0 +1,47 @@
+import sys
+import os
+import subprocess
+import time
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# What the CLI may add on top of a bare interpreter for --help and --version
+STARTUP_BUDGET = 0.15
+
+
+def best_run_time(args, runs=3):
+    """Fastest of several runs, to keep the test stable on a busy machine."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=PROJECT_ROOT, capture_output=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class StartupTests(unittest.TestCase):
+
+    def test_cli_flags_stay_within_startup_budget(self):
+        baseline = best_run_time(["-c", "pass"])
+        for flag in ("--version", "--help"):
+            with self.subTest(flag=flag):
+                elapsed = best_run_time(["main.py", flag]) - baseline
+                self.assertLess(elapsed, STARTUP_BUDGET, f"main.py {flag} took {elapsed * 1000:.0f} ms over bare startup")
+
+    def test_importing_main_skips_heavy_modules(self):
+        script = "import sys, main; print(','.join(m for m in ('google.generativeai', 'pydantic', 'agents') if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_orchestrator_import_does_not_load_the_sdk_or_need_a_key(self):
+        env = dict(os.environ, GEMINI_API_KEY="")
+        script = ("import sys; from agents.orchestrator import orchestrator; "
+                  "print('google.generativeai' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, env=env,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
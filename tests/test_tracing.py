@@ -0,0 +1,180 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+# Add project root to Python path to allow imports from utils, webapp, agents
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import settings
+from models.schemas import UserInput
+from utils.circuit_breaker import CircuitBreaker
+from utils.gemini_client import gemini_client
+from utils.llm_backends import StubBackend
+from utils.rate_limiter import RequestScheduler
+from utils.tracing import InMemoryExporter, JsonlExporter, OtlpExporter, format_trace, load_traces, tracer
+from agents.orchestrator import orchestrator
+from webapp.app import app as flask_app
+
+
+class TracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemoryExporter()
+        tracer.configure(self.exporter)
+        self.addCleanup(tracer.configure, None)
+        scheduler = RequestScheduler(requests_per_minute=10 ** 4, tokens_per_minute=10 ** 8, max_concurrency=16)
+        patches = [
+            patch.object(settings, 'LLM_BACKEND', 'stub'),
+            patch.object(gemini_client, 'model', StubBackend(latency_ms=1, distribution="fixed")),
+            patch.object(gemini_client, 'scheduler', scheduler),
+            patch.object(gemini_client, 'breaker', CircuitBreaker()),
+            patch.object(settings, 'ENABLE_CACHE', False),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def finished_spans(self):
+        tracer.flush()
+        return list(self.exporter.spans)
+
+    def by_name(self, spans, name):
+        return [span for span in spans if span.name == name]
+
+
+class SpanTreeTests(TracingTestCase):
+
+    def test_analysis_is_one_trace_with_a_span_per_hop(self):
+        asyncio.run(orchestrator.process_user_input(UserInput(problem="Reducir el ruido en la oficina")))
+        spans = self.finished_spans()
+
+        root, = self.by_name(spans, "orchestrator.process_user_input")
+        self.assertIsNone(root.parent_id)
+        self.assertEqual({span.trace_id for span in spans}, {root.trace_id})
+
+        agents = self.by_name(spans, "agent.generate_ideas")
+        self.assertEqual(len(agents), 7)
+        self.assertTrue(all(agent.parent_id == root.span_id for agent in agents))
+        self.assertEqual({agent.attributes["status"] for agent in agents}, {"ok"})
+
+        # Every upstream call sits under a generate_response span, next to its queue wait
+        self.assertEqual(len(self.by_name(spans, "llm.upstream")), 8)
+        self.assertEqual(len(self.by_name(spans, "llm.queue_wait")), 8)
+        self.assertEqual(len(self.by_name(spans, "llm.parse")), 7)
+        self.assertEqual(len(self.by_name(spans, "orchestrator.summary")), 1)
+        self.assertEqual(len(self.by_name(spans, "orchestrator.validate")), 1)
+
+        tree = format_trace([span.to_dict() for span in spans])
+        self.assertTrue(tree.startswith("orchestrator.process_user_input"))
+
+    def test_failed_upstream_call_marks_its_span(self):
+        failing = StubBackend(latency_ms=1, distribution="fixed", error_rate=1.0)
+        with patch.object(gemini_client, 'model', failing), patch.object(settings, 'MAX_RETRIES', 0):
+            asyncio.run(orchestrator.process_user_input(UserInput(problem="Reducir el ruido en la oficina")))
+        spans = self.finished_spans()
+
+        upstream = self.by_name(spans, "llm.upstream")
+        self.assertTrue(upstream)
+        self.assertTrue(all(span.status == "error" and span.attributes["error.type"] == "unavailable" for span in upstream))
+        self.assertEqual({agent.attributes["status"] for agent in self.by_name(spans, "agent.generate_ideas")}, {"error"})
+
+    def test_nothing_is_recorded_when_tracing_is_off(self):
+        tracer.configure(None)
+        asyncio.run(orchestrator.process_user_input(UserInput(problem="Reducir el ruido en la oficina")))
+
+        self.assertEqual(self.exporter.spans, [])
+        self.assertIsNone(tracer.current_span())
+
+
+class RequestTracingTests(TracingTestCase):
+
+    def test_json_endpoint_continues_the_callers_trace(self):
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        response = flask_app.test_client().post(
+            '/api/scamper', json={"problem": "Reducir colas en el comedor"},
+            headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+        spans = self.finished_spans()
+
+        self.assertEqual(response.headers["X-Trace-Id"], trace_id)
+        request_span, = self.by_name(spans, "POST /api/scamper")
+        self.assertEqual(request_span.parent_id, "00f067aa0ba902b7")
+        self.assertEqual(request_span.attributes["http.status_code"], 200)
+        self.assertEqual({span.trace_id for span in spans}, {trace_id})
+
+    def test_stream_endpoint_keeps_agents_under_the_request_span(self):
+        response = flask_app.test_client().post('/api/scamper/stream', json={"problem": "Reducir colas en el comedor"})
+        self.assertIn("event: done", response.get_data(as_text=True))
+        spans = self.finished_spans()
+
+        request_span, = self.by_name(spans, "POST /api/scamper/stream")
+        stream_span, = self.by_name(spans, "orchestrator.stream_user_input")
+        self.assertEqual(response.headers["X-Trace-Id"], request_span.trace_id)
+        self.assertEqual(stream_span.parent_id, request_span.span_id)
+        agents = self.by_name(spans, "agent.stream_ideas")
+        self.assertEqual(len(agents), 7)
+        self.assertTrue(all(agent.parent_id == stream_span.span_id for agent in agents))
+        agent_ids = {agent.span_id for agent in agents}
+        self.assertTrue(all(span.parent_id in agent_ids for span in self.by_name(spans, "llm.upstream")
+                            if span.attributes["mode"] == "stream"))
+
+
+class ExporterTests(unittest.TestCase):
+
+    def spans(self):
+        exporter = InMemoryExporter()
+        tracer.configure(exporter)
+        try:
+            with tracer.trace("root", row=3):
+                with tracer.span("child"):
+                    pass
+        finally:
+            tracer.configure(None)
+        return exporter.spans
+
+    def test_jsonl_lines_group_back_into_traces(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "traces", "spans.jsonl")
+            JsonlExporter(path).export(self.spans())
+            traces = load_traces(path)
+
+        spans, = traces.values()
+        self.assertEqual([span["name"] for span in spans], ["child", "root"])
+        self.assertEqual(format_trace(spans).splitlines()[1].strip().split()[0], "child")
+
+    def test_otlp_export_posts_json_to_the_collector(self):
+        received = []
+
+        class Collector(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Collector)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            OtlpExporter(f"http://127.0.0.1:{server.server_port}/v1/traces").export(self.spans())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        path, payload = received[0]
+        self.assertEqual(path, "/v1/traces")
+        otlp_spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        child, root = otlp_spans
+        self.assertEqual(child["parentSpanId"], root["spanId"])
+        self.assertEqual(len(root["traceId"]), 32)
+        self.assertIn({"key": "row", "value": {"intValue": "3"}}, root["attributes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
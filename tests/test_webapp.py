@@ -2,7 +2,6 @@ import sys
 import os
 import json
 import unittest
-import asyncio # Required for running async test methods manually if not using pytest-asyncio
 from unittest.mock import patch, MagicMock, AsyncMock
 
 # Add project root to Python path to allow imports from webapp, agents, models
@@ -40,77 +39,122 @@ class WebAppTests(unittest.TestCase):
 
     @patch('webapp.app.orchestrator.process_user_input', new_callable=AsyncMock)
     def test_scamper_api_success(self, mock_process_user_input):
-        async def run_test():
-            mock_response_data = ScamperResponse(
-                original_problem="Test problem",
-                results=[
-                    ScamperResult(
-                        technique=Technique.SUBSTITUTE,
-                        explanation="Substituted something.",
-                        ideas=["Idea 1", "Idea 2"]
-                    )
-                ],
-                summary="Test summary"
-            )
-            mock_process_user_input.return_value = mock_response_data
-
-            payload = {"problem": "Test problem", "context": "Test context"}
-            # Flask's test_client.post itself is not async, but the view function it calls is.
-            # The test_client handles the async nature of the endpoint.
-            response = self.client.post('/api/scamper', json=payload)
-
-            self.assertEqual(response.status_code, 200)
-            response_data = json.loads(response.data.decode('utf-8'))
-
-            self.assertEqual(response_data['original_problem'], "Test problem")
-            self.assertTrue(len(response_data['results']) > 0)
-            self.assertEqual(response_data['results'][0]['technique'], Technique.SUBSTITUTE.value)
-            self.assertEqual(response_data['summary'], "Test summary")
-            mock_process_user_input.assert_called_once()
-        asyncio.run(run_test())
+        mock_response_data = ScamperResponse(
+            original_problem="Test problem",
+            results=[
+                ScamperResult(
+                    technique=Technique.SUBSTITUTE,
+                    explanation="Substituted something.",
+                    ideas=["Idea 1", "Idea 2"]
+                )
+            ],
+            summary="Test summary"
+        )
+        mock_process_user_input.return_value = mock_response_data
+
+        payload = {"problem": "Test problem", "context": "Test context"}
+        # Flask's test_client.post itself is not async, but the view function it calls is.
+        # The test_client handles the async nature of the endpoint.
+        response = self.client.post('/api/scamper', json=payload)
+
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response_data['original_problem'], "Test problem")
+        self.assertTrue(len(response_data['results']) > 0)
+        self.assertEqual(response_data['results'][0]['technique'], Technique.SUBSTITUTE.value)
+        self.assertEqual(response_data['summary'], "Test summary")
+        mock_process_user_input.assert_called_once()
 
     def test_scamper_api_missing_problem(self):
-        async def run_test():
-            payload = {"context": "Test context"}
-            response = self.client.post('/api/scamper', json=payload)
+        payload = {"context": "Test context"}
+        response = self.client.post('/api/scamper', json=payload)
 
-            self.assertEqual(response.status_code, 400)
-            response_data = json.loads(response.data.decode('utf-8'))
-            self.assertIn("El campo 'problem' es obligatorio", response_data['error'])
-        asyncio.run(run_test())
+        self.assertEqual(response.status_code, 400)
+        response_data = json.loads(response.data.decode('utf-8'))
+        self.assertIn("El campo 'problem' es obligatorio", response_data['error'])
 
     def test_scamper_api_short_problem(self):
-        async def run_test():
-            payload = {"problem": "abc"}
-            response = self.client.post('/api/scamper', json=payload)
+        payload = {"problem": "abc"}
+        response = self.client.post('/api/scamper', json=payload)
 
-            self.assertEqual(response.status_code, 400)
-            response_data = json.loads(response.data.decode('utf-8'))
-            self.assertIn("El problema debe ser un texto de al menos 5 caracteres", response_data['error'])
-        asyncio.run(run_test())
+        self.assertEqual(response.status_code, 400)
+        response_data = json.loads(response.data.decode('utf-8'))
+        self.assertIn("El problema debe ser un texto de al menos 5 caracteres", response_data['error'])
 
     def test_scamper_api_invalid_context_type(self):
-        async def run_test():
-            payload = {"problem": "Valid problem", "context": 123}
-            response = self.client.post('/api/scamper', json=payload)
+        payload = {"problem": "Valid problem", "context": 123}
+        response = self.client.post('/api/scamper', json=payload)
 
-            self.assertEqual(response.status_code, 400)
-            response_data = json.loads(response.data.decode('utf-8'))
-            self.assertIn("El contexto debe ser un texto", response_data['error'])
-        asyncio.run(run_test())
+        self.assertEqual(response.status_code, 400)
+        response_data = json.loads(response.data.decode('utf-8'))
+        self.assertIn("El contexto debe ser un texto", response_data['error'])
 
     @patch('webapp.app.orchestrator.process_user_input', new_callable=AsyncMock)
-    def test_scamper_api_orchestrator_exception(self, mock_process_user_input):
-        async def run_test():
-            mock_process_user_input.side_effect = Exception("Orchestrator failed")
+    def test_scamper_api_passes_deadline(self, mock_process_user_input):
+        mock_process_user_input.return_value = ScamperResponse(
+            original_problem="Test problem", results=[], summary="Resumen", partial=True
+        )
+
+        response = self.client.post('/api/scamper', json={"problem": "Test problem"}, headers={'X-Deadline-Ms': '1500'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['partial'])
+        self.assertEqual(mock_process_user_input.call_args.kwargs['time_budget'], 1.5)
+
+        self.client.post('/api/scamper?deadline_ms=250', json={"problem": "Test problem"})
+        self.assertEqual(mock_process_user_input.call_args.kwargs['time_budget'], 0.25)
 
-            payload = {"problem": "A valid problem for this test"}
-            response = self.client.post('/api/scamper', json=payload)
+        response = self.client.post('/api/scamper', json={"problem": "Test problem"}, headers={'X-Deadline-Ms': 'soon'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("plazo", response.get_json()['error'])
 
-            self.assertEqual(response.status_code, 500)
-            response_data = json.loads(response.data.decode('utf-8'))
-            self.assertIn("Ocurrió un error procesando tu solicitud", response_data['error'])
-        asyncio.run(run_test())
+    @patch('webapp.app.orchestrator.process_user_input', new_callable=AsyncMock)
+    def test_scamper_api_orchestrator_exception(self, mock_process_user_input):
+        mock_process_user_input.side_effect = Exception("Orchestrator failed")
+
+        payload = {"problem": "A valid problem for this test"}
+        response = self.client.post('/api/scamper', json=payload)
+
+        self.assertEqual(response.status_code, 500)
+        response_data = json.loads(response.data.decode('utf-8'))
+        self.assertIn("Ocurrió un error procesando tu solicitud", response_data['error'])
+
+    def parse_sse(self, body):
+        events = []
+        for frame in body.strip().split('\n\n'):
+            lines = frame.split('\n')
+            event = lines[0][len('event: '):]
+            data = json.loads(lines[1][len('data: '):])
+            events.append((event, data))
+        return events
+
+    @patch('webapp.app.orchestrator.stream_user_input')
+    def test_scamper_stream_emits_results_then_summary(self, mock_stream_user_input):
+        async def fake_stream(user_input):
+            yield "idea", (Technique.COMBINE, "Idea A")
+            yield "result", ScamperResult(technique=Technique.COMBINE, explanation="Combined.", ideas=["Idea A"])
+            yield "result", ScamperResult(technique=Technique.SUBSTITUTE, explanation="Substituted.", ideas=["Idea B"])
+            yield "summary", "Test summary"
+        mock_stream_user_input.side_effect = fake_stream
+
+        response = self.client.post('/api/scamper/stream', json={"problem": "Test problem"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/event-stream'))
+        events = self.parse_sse(response.get_data(as_text=True))
+        self.assertEqual([event for event, _ in events], ["start", "idea", "result", "result", "summary", "done"])
+        self.assertEqual(events[0][1]['original_problem'], "Test problem")
+        self.assertEqual(events[1][1], {"technique": Technique.COMBINE.value, "idea": "Idea A"})
+        self.assertEqual(events[2][1]['technique'], Technique.COMBINE.value)
+        self.assertEqual(events[3][1]['ideas'], ["Idea B"])
+        self.assertEqual(events[4][1]['summary'], "Test summary")
+
+    def test_scamper_stream_validates_payload(self):
+        response = self.client.post('/api/scamper/stream', json={"problem": "abc"})
+
+        self.assertEqual(response.status_code, 400)
+        response_data = json.loads(response.data.decode('utf-8'))
+        self.assertIn("El problema debe ser un texto de al menos 5 caracteres", response_data['error'])
 
 if __name__ == '__main__':
     # This allows running 'python -m unittest tests.test_webapp'
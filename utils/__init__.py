@@ -1,3 +1,13 @@
 from .gemini_client import GeminiClient, gemini_client
+from .cache import IdeaCache, make_cache_key
+from .rate_limiter import RequestScheduler, Priority, priority_scope
+from .single_flight import SingleFlight
+from .llm_backends import LLMBackend, StubBackend, create_backend
 
-__all__ = ["GeminiClient", "gemini_client"]
\ No newline at end of file
+__all__ = [
+    "GeminiClient", "gemini_client",
+    "IdeaCache", "make_cache_key",
+    "RequestScheduler", "Priority", "priority_scope",
+    "SingleFlight",
+    "LLMBackend", "StubBackend", "create_backend"
+]
\ No newline at end of file
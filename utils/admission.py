@@ -0,0 +1,112 @@
+"""
+Control de admisión de los endpoints web
+
+Sin límite, una avalancha de peticiones se encolaba entera en el planificador
+y todas se frenaban a la vez hasta agotar sus plazos. El controlador admite
+una petición solo si el proceso tiene menos de ADMISSION_MAX_IN_FLIGHT
+análisis web en curso y la cola interactiva del planificador tiene menos de
+ADMISSION_MAX_QUEUE_DEPTH llamadas esperando; si no, la web la rechaza al
+instante (429 con Retry-After) o la pasa a la cola de /api/jobs, y las
+admitidas mantienen su latencia.
+
+Las llamadas de prioridad de lote (trabajos, precarga) no cuentan en la cola:
+las interactivas pasan antes que ellas.
+"""
+
+import threading
+from typing import Callable, Dict, Optional
+
+from config.settings import settings
+from .gemini_client import gemini_client
+from .rate_limiter import Priority
+
+IN_FLIGHT = "in_flight"
+UPSTREAM_QUEUE = "upstream_queue"
+
+class AdmissionTicket:
+    """Resultado de admit(); si se admitió, libera su hueco al salir del bloque o con release()"""
+
+    __slots__ = ("_controller", "admitted", "reason", "_released")
+
+    def __init__(self, controller: "AdmissionController", admitted: bool, reason: Optional[str] = None):
+        self._controller = controller
+        self.admitted = admitted
+        self.reason = reason  # in_flight o upstream_queue si se rechazó
+        self._released = not admitted
+
+    def release(self):
+        """Libera el hueco (idempotente; las peticiones en streaming lo liberan al terminar el stream)"""
+        if not self._released:
+            self._released = True
+            self._controller._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+class AdmissionController:
+    """Límite de análisis web simultáneos y de profundidad de la cola del modelo, seguro entre hilos"""
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue_depth: Optional[int] = None,
+                 queue_depth: Callable[[], int] = None):
+        """
+        Args:
+            max_in_flight: Análisis web simultáneos (por defecto ADMISSION_MAX_IN_FLIGHT; 0 = sin límite)
+            max_queue_depth: Llamadas interactivas en cola (por defecto ADMISSION_MAX_QUEUE_DEPTH; 0 = sin límite)
+            queue_depth: Profundidad actual de la cola (por defecto la del planificador de gemini_client)
+        """
+        self.max_in_flight = max_in_flight if max_in_flight is not None else settings.ADMISSION_MAX_IN_FLIGHT
+        self.max_queue_depth = max_queue_depth if max_queue_depth is not None else settings.ADMISSION_MAX_QUEUE_DEPTH
+        self._queue_depth = queue_depth or self._scheduler_queue_depth
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {IN_FLIGHT: 0, UPSTREAM_QUEUE: 0}
+
+    @staticmethod
+    def _scheduler_queue_depth() -> int:
+        # Se consulta en cada petición: el planificador puede sustituirse (pruebas, presupuesto compartido)
+        return gemini_client.scheduler.queue_depth(Priority.INTERACTIVE)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def admit(self) -> AdmissionTicket:
+        """Decide al instante, sin esperar, si la petición entra"""
+        depth = self._queue_depth() if self.max_queue_depth > 0 else 0
+        with self._lock:
+            if self.max_in_flight > 0 and self._in_flight >= self.max_in_flight:
+                reason = IN_FLIGHT
+            elif self.max_queue_depth > 0 and depth >= self.max_queue_depth:
+                reason = UPSTREAM_QUEUE
+            else:
+                self._in_flight += 1
+                self.admitted += 1
+                return AdmissionTicket(self, True)
+            self.rejected[reason] += 1
+        return AdmissionTicket(self, False, reason)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    @property
+    def retry_after(self) -> int:
+        """Segundos que se sugieren al cliente rechazado"""
+        return settings.ADMISSION_RETRY_AFTER_SECONDS
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+            }
+
+# Instancia global
+admission = AdmissionController()
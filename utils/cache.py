@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict
+from config.settings import settings
+from .metrics import CACHE_LOOKUPS
+
+def normalize_text(text: Optional[str]) -> str:
+    """Normaliza un texto para comparar peticiones (minúsculas y espacios colapsados)"""
+    if not text:
+        return ""
+    return " ".join(text.lower().split())
+
+def make_cache_key(technique: str, problem: str, context: Optional[str], model: str,
+                   temperature: float, max_ideas: int) -> str:
+    """
+    Construye la clave de caché de una petición de ideas
+
+    Args:
+        technique: Técnica SCAMPER
+        problem: Problema del usuario
+        context: Contexto adicional (opcional)
+        model: Modelo de Gemini configurado
+        temperature: Temperatura de generación
+        max_ideas: Número máximo de ideas por técnica
+
+    Returns:
+        Hash estable de la identidad normalizada de la petición
+    """
+    identity = json.dumps(
+        [technique, normalize_text(problem), normalize_text(context), model, temperature, max_ideas],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+class MemoryCache:
+    """Caché LRU en memoria con límite de tamaño y expiración por TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Devuelve el valor si existe y no ha expirado"""
+        return self.get_stale(key, self.ttl_seconds)
+
+    def get_stale(self, key: str, max_age: float) -> Optional[List[str]]:
+        """
+        Devuelve el valor si tiene menos de max_age segundos
+
+        Las entradas caducadas no se borran al consultarlas: siguen sirviendo
+        con el modelo caído hasta que el LRU las desaloje.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > max_age:
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: List[str]):
+        """Guarda un valor desalojando el menos usado si se supera el tamaño"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCache:
+    """Caché persistente en SQLite que sobrevive a reinicios del proceso"""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la base de datos en el primer uso"""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scamper_ideas ("
+                "key TEXT PRIMARY KEY, ideas TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> Optional[List[str]]:
+        return self.get_stale(key, self.ttl_seconds)
+
+    def get_stale(self, key: str, max_age: float) -> Optional[List[str]]:
+        """Devuelve el valor si tiene menos de max_age segundos (las filas caducadas no se borran)"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT ideas, created_at FROM scamper_ideas WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > max_age:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: List[str]):
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO scamper_ideas (key, ideas, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time())
+            )
+            connection.commit()
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM scamper_ideas")
+            connection.commit()
+
+class IdeaCache:
+    """Caché de dos niveles (memoria + SQLite) para las ideas de cada técnica"""
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        """Busca primero en memoria y después en disco, promoviendo los aciertos de disco"""
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            CACHE_LOOKUPS.inc(result="memory_hit")
+            return value
+
+        if self.disk is not None:
+            # SQLite es bloqueante: se consulta fuera del bucle de eventos
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                CACHE_LOOKUPS.inc(result="disk_hit")
+                self.memory.set(key, value)
+                return value
+
+        self.misses += 1
+        CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    async def get_stale(self, key: str, max_age: float) -> Optional[List[str]]:
+        """Busca el valor aunque haya caducado (hasta max_age segundos), sin contar aciertos ni fallos"""
+        value = self.memory.get_stale(key, max_age)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get_stale, key, max_age)
+        return value
+
+    async def set(self, key: str, value: List[str]):
+        """Guarda el valor en ambos niveles"""
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    def clear(self):
+        """Vacía ambos niveles"""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Retorna los contadores de aciertos y fallos"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "persistent": self.disk is not None
+        }
+
+def create_idea_cache() -> IdeaCache:
+    """Crea la caché de ideas según la configuración"""
+    memory = MemoryCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    disk = SQLiteCache(settings.CACHE_DB_PATH, settings.CACHE_DB_TTL_SECONDS) if settings.CACHE_DB_PATH else None
+    return IdeaCache(memory, disk)
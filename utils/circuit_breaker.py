@@ -0,0 +1,146 @@
+"""
+Circuit breaker de las llamadas al modelo
+
+Con el proveedor caído o muy lento cada agente agotaba su timeout (y sus
+reintentos) antes de fallar. El breaker cuenta los fallos seguidos (timeouts,
+5xx/conexión) y las llamadas que superan BREAKER_SLOW_CALL_SECONDS; al llegar
+a BREAKER_FAILURE_THRESHOLD se abre y las llamadas fallan al instante con
+LLMCircuitOpenError, sin ocupar la cola del planificador.
+
+Pasados BREAKER_OPEN_SECONDS queda medio abierto: se deja pasar una sola
+llamada de prueba. Si va bien se cierra (y se avisa a los oyentes, que
+refrescan en segundo plano lo servido caducado); si falla vuelve a abrirse.
+"""
+
+import threading
+import time
+from typing import Callable, List
+
+from config.settings import settings
+from .errors import LLMCircuitOpenError, LLMError
+from .log import get_logger
+from .metrics import BREAKER_REJECTIONS, BREAKER_TRANSITIONS
+
+logger = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# Fallos que indican un proveedor degradado; un 429 lo gestiona el planificador
+# y una respuesta inválida no mejora esperando
+_TRIPPING_KINDS = {"timeout", "unavailable"}
+
+class CircuitBreaker:
+    """Estado cerrado / abierto / medio abierto, compartido por los bucles y hilos del proceso"""
+
+    def __init__(self, failure_threshold: int = None, open_seconds: float = None, slow_call_seconds: float = None):
+        """
+        Args:
+            failure_threshold: Fallos seguidos que abren el circuito (por defecto BREAKER_FAILURE_THRESHOLD)
+            open_seconds: Segundos abierto antes de probar de nuevo (por defecto BREAKER_OPEN_SECONDS)
+            slow_call_seconds: Duración a partir de la que una llamada correcta cuenta como fallo
+                (por defecto BREAKER_SLOW_CALL_SECONDS; None la desactiva)
+        """
+        self.failure_threshold = failure_threshold or settings.BREAKER_FAILURE_THRESHOLD
+        self.open_seconds = open_seconds if open_seconds is not None else settings.BREAKER_OPEN_SECONDS
+        self.slow_call_seconds = slow_call_seconds if slow_call_seconds is not None else settings.BREAKER_SLOW_CALL_SECONDS
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._close_listeners: List[Callable[[], None]] = []
+
+    def on_close(self, listener: Callable[[], None]):
+        """Registra una función que se llama (en quien cerró el circuito) al recuperarse el proveedor"""
+        self._close_listeners.append(listener)
+
+    def before_call(self) -> bool:
+        """
+        Pide paso para una llamada al modelo
+
+        Returns:
+            True si la llamada es la prueba del estado medio abierto (hay que
+            informar su resultado con record_success, record_failure o record_abandoned)
+
+        Raises:
+            LLMCircuitOpenError: Si el circuito está abierto o ya hay una prueba en curso
+        """
+        if not settings.ENABLE_CIRCUIT_BREAKER:
+            return False
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        BREAKER_REJECTIONS.inc()
+        raise LLMCircuitOpenError(f"Modelo no disponible (circuito abierto, nuevo intento en {retry_in:.0f}s)")
+
+    def record_success(self, latency: float, probe: bool = False):
+        if self.slow_call_seconds and latency > self.slow_call_seconds:
+            self._record_bad_call(probe, f"llamada lenta ({latency:.1f}s)")
+            return
+        with self._lock:
+            self._failures = 0
+            if probe:
+                self._probe_in_flight = False
+            # Solo se cierra tras el plazo abierto; un éxito rezagado con el circuito abierto no basta
+            closed = self.state == HALF_OPEN
+            if closed:
+                self._transition(CLOSED)
+        if closed:
+            for listener in list(self._close_listeners):
+                listener()
+
+    def record_failure(self, error: LLMError, probe: bool = False):
+        if error.kind in _TRIPPING_KINDS:
+            self._record_bad_call(probe, error.kind)
+        elif probe:
+            # La prueba no dijo nada del proveedor: se permite otra
+            self.record_abandoned(probe)
+
+    def record_abandoned(self, probe: bool = False):
+        """La llamada se canceló antes de terminar (plazo de la petición, cliente desconectado)"""
+        if probe:
+            with self._lock:
+                self._probe_in_flight = False
+
+    def _record_bad_call(self, probe: bool, reason: str):
+        with self._lock:
+            self._failures += 1
+            if probe:
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+                logger.warning("⚡ Circuito del modelo abierto tras %d fallos (último: %s); se reintenta en %.0fs",
+                               self._failures, reason, self.open_seconds, extra={"reason": reason})
+
+    def _transition(self, state: str):
+        # Se llama con el lock tomado
+        if state == self.state:
+            return
+        self.state = state
+        BREAKER_TRANSITIONS.inc(state=state)
+        if state == CLOSED:
+            logger.info("Circuito del modelo cerrado: el proveedor responde de nuevo")
+
+    def reset(self):
+        """Vuelve al estado cerrado sin fallos (para pruebas)"""
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "enabled": settings.ENABLE_CIRCUIT_BREAKER,
+        }
@@ -0,0 +1,68 @@
+import asyncio
+import concurrent.futures
+
+class LLMError(Exception):
+    """Error base de las llamadas al modelo"""
+    kind = "llm_error"
+    transient = False
+
+class LLMTimeoutError(LLMError):
+    """La llamada superó el tiempo máximo permitido"""
+    kind = "timeout"
+    transient = True
+
+class LLMRateLimitError(LLMError):
+    """El proveedor rechazó la llamada por límite de peticiones o cuota (429)"""
+    kind = "rate_limited"
+    transient = True
+
+class LLMUnavailableError(LLMError):
+    """El proveedor no está disponible (5xx o error de conexión)"""
+    kind = "unavailable"
+    transient = True
+
+class LLMResponseError(LLMError):
+    """La petición o la respuesta no son válidas; reintentar no ayuda"""
+    kind = "invalid_response"
+
+class LLMCircuitOpenError(LLMError):
+    """El circuit breaker está abierto: la llamada se rechaza sin llegar al modelo"""
+    kind = "circuit_open"
+
+_UNAVAILABLE_CODES = {500, 502, 503}
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Detecta errores 429 / cuota agotada del proveedor"""
+    if isinstance(error, LLMRateLimitError) or getattr(error, "code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message or "resource exhausted" in message
+
+def classify_error(error: BaseException) -> LLMError:
+    """
+    Convierte una excepción del SDK o de la red en un error tipado
+
+    Args:
+        error: Excepción original
+
+    Returns:
+        Error tipado, con la excepción original como causa
+    """
+    if isinstance(error, LLMError):
+        return error
+
+    code = getattr(error, "code", None)
+    if isinstance(error, (asyncio.TimeoutError, concurrent.futures.TimeoutError, TimeoutError)) or code == 504:
+        typed = LLMTimeoutError(f"Tiempo de espera agotado: {error}")
+    elif is_rate_limit_error(error):
+        typed = LLMRateLimitError(str(error))
+    elif code in _UNAVAILABLE_CODES or isinstance(error, ConnectionError):
+        typed = LLMUnavailableError(str(error))
+    else:
+        typed = LLMResponseError(str(error))
+    typed.__cause__ = error
+    return typed
+
+def error_kind(error: BaseException) -> str:
+    """Tipo de error para informar en los resultados (internal si no viene del modelo)"""
+    return getattr(error, "kind", "internal")
@@ -1,50 +1,500 @@
-import google.generativeai as genai
 import asyncio
-from typing import Optional, List
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple, AsyncIterator
 from config.settings import settings
+from models.schemas import ScamperTechnique
+from .cache import create_idea_cache, make_cache_key
+from .circuit_breaker import STATES, CircuitBreaker
+from .errors import LLMError, LLMRateLimitError, classify_error
+from .llm_backends import GenerationConfig, create_backend
+from .metrics import TOKENS, UPSTREAM_ERRORS, UPSTREAM_LATENCY, metrics
+from .micro_batch import MicroBatcher
+from .rate_limiter import Priority, RequestScheduler, SharedRateBudget, priority_scope
+from .single_flight import SingleFlight
+from .log import get_logger
+from .tracing import tracer
+
+# Acción y preguntas guía de cada técnica SCAMPER, usadas para construir los prompts
+TECHNIQUE_GUIDES = {
+    "substitute": ("SUSTITUIR", (
+        "¿Qué se puede sustituir?",
+        "¿Qué materiales, procesos o elementos se pueden reemplazar?",
+        "¿Qué alternativas existen?",
+    )),
+    "combine": ("COMBINAR", (
+        "¿Qué se puede combinar o fusionar?",
+        "¿Qué ideas, funciones o características se pueden unir?",
+        "¿Qué sinergias se pueden crear?",
+    )),
+    "adapt": ("ADAPTAR", (
+        "¿Qué se puede adaptar de otros contextos?",
+        "¿Qué soluciones de otras industrias se pueden aplicar?",
+        "¿Qué se puede copiar o modificar de ideas existentes?",
+    )),
+    "modify": ("MODIFICAR/MAGNIFICAR", (
+        "¿Qué se puede modificar, amplificar o exagerar?",
+        "¿Qué se puede hacer más grande, pequeño, fuerte, rápido?",
+        "¿Qué características se pueden intensificar?",
+    )),
+    "put_to_other_uses": ("OTROS USOS", (
+        "¿Para qué más se puede usar?",
+        "¿Qué otros mercados o aplicaciones podría tener?",
+        "¿Cómo se puede reutilizar de forma diferente?",
+    )),
+    "eliminate": ("ELIMINAR", (
+        "¿Qué se puede eliminar, simplificar o reducir?",
+        "¿Qué es innecesario o redundante?",
+        "¿Cómo se puede hacer más minimalista?",
+    )),
+    "reverse": ("INVERTIR/REORGANIZAR", (
+        "¿Qué se puede invertir, reorganizar o hacer al revés?",
+        "¿Qué pasaría si cambiamos el orden o la secuencia?",
+        "¿Cómo se puede abordar desde el extremo opuesto?",
+    )),
+}
+
+logger = get_logger("llm")
+
+# Protege la creación perezosa del backend, que puede ocurrir en varios hilos del pool a la vez
+_MODEL_LOCK = threading.Lock()
+
+# Marca de fin del stream entre el hilo productor y el bucle de eventos
+_STREAM_END = object()
+
+def parse_idea_line(line: str) -> Optional[str]:
+    """Extrae la idea de una línea con formato de lista, o None si no lo es"""
+    line = line.strip()
+    # Buscar líneas que empiecen con números (1., 2., 3., etc.)
+    if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
+        # Limpiar el formato (quitar números, guiones, etc.)
+        clean_idea = line
+        for prefix in ['1.', '2.', '3.', '4.', '5.', '-', '•', '*']:
+            if clean_idea.startswith(prefix):
+                clean_idea = clean_idea[len(prefix):].strip()
+                break
+        
+        if clean_idea:
+            return clean_idea
+    return None
+
+class IdeaStreamParser:
+    """Parser incremental que emite cada idea numerada en cuanto se completa su línea"""
+    
+    def __init__(self):
+        self._buffer = ""
+        self._text = []
+        self._found_ideas = False
+    
+    def feed(self, chunk: str) -> List[str]:
+        """Añade un fragmento de texto y retorna las ideas de las líneas completadas"""
+        self._text.append(chunk)
+        self._buffer += chunk
+        *complete_lines, self._buffer = self._buffer.split('\n')
+        return self._collect(complete_lines)
+    
+    def close(self) -> List[str]:
+        """Procesa la última línea pendiente al terminar el stream"""
+        ideas = self._collect([self._buffer])
+        self._buffer = ""
+        # Si no encontró ideas con formato, tomar toda la respuesta
+        if not self._found_ideas:
+            full_text = "".join(self._text).strip()
+            self._found_ideas = True
+            return [full_text]
+        return ideas
+    
+    def _collect(self, lines: List[str]) -> List[str]:
+        ideas = []
+        for line in lines:
+            idea = parse_idea_line(line)
+            if idea:
+                ideas.append(idea)
+        if ideas:
+            self._found_ideas = True
+        return ideas
 
 class GeminiClient:
     """Cliente para interactuar con la API de Gemini"""
     
     def __init__(self):
-        """Inicializa el cliente de Gemini"""
-        self._configure_api()
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        """
+        Inicializa el cliente de Gemini
+
+        Construirlo es barato: el backend (LLM_BACKEND) se crea en la primera
+        llamada, y con él se importa y configura el SDK (ver __getattr__).
+        """
+        # El SDK solo ofrece llamadas bloqueantes fiables entre bucles de eventos,
+        # así que se ejecutan en un pool acotado para no bloquear el bucle
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.GEMINI_MAX_CONCURRENCY,
+            thread_name_prefix="gemini"
+        )
+        self.cache = create_idea_cache()
+        self.single_flight = SingleFlight()
+        # Con ENABLE_MICRO_BATCHING las técnicas de distintas peticiones comparten llamada
+        self.batcher = MicroBatcher(self._generate_idea_batch)
+        # Todas las llamadas del proceso pasan por el mismo planificador; con
+        # GEMINI_SHARED_BUDGET_PATH la cuota por minuto se comparte entre procesos
+        budget = None
+        if settings.GEMINI_SHARED_BUDGET_PATH:
+            budget = SharedRateBudget(
+                settings.GEMINI_SHARED_BUDGET_PATH,
+                settings.GEMINI_REQUESTS_PER_MINUTE,
+                settings.GEMINI_TOKENS_PER_MINUTE
+            )
+        self.scheduler = RequestScheduler(
+            requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+            max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+            min_concurrency=settings.GEMINI_MIN_CONCURRENCY,
+            budget=budget
+        )
+        # Latencias recientes de llamadas correctas, para decidir cuándo duplicar
+        self._latencies = deque(maxlen=200)
+        self._retries = 0
+        self._hedged_requests = 0
+        self._hedge_wins = 0
+        # Con el proveedor degradado las llamadas fallan al instante y se sirve la caché caducada;
+        # al cerrarse el circuito se refresca en segundo plano lo que se sirvió caducado
+        self.breaker = CircuitBreaker()
+        self.breaker.on_close(self._revalidate_in_background)
+        self._stale_served: "OrderedDict[Tuple[str, str, Optional[str]], None]" = OrderedDict()
+        self._revalidation_task: Optional[asyncio.Task] = None
+        metrics.register_collector(self._collect_metrics)
     
-    def _configure_api(self):
-        """Configura la API de Gemini con la API key"""
-        if not settings.GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY no está configurada")
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+    def __getattr__(self, name):
+        # Solo se llama si el atributo no existe: el backend (un LLMBackend) se crea
+        # al primer acceso y desde entonces es un atributo normal (que los tests pueden sustituir)
+        if name == "model":
+            with _MODEL_LOCK:
+                if "model" not in self.__dict__:
+                    self.model = create_backend()
+            return self.__dict__["model"]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
     
-    async def generate_response(self, prompt: str) -> str:
+    async def generate_response(self, prompt: str, response_schema: Optional[dict] = None) -> str:
         """
         Genera una respuesta usando Gemini
         
+        Los timeouts, 429 y errores 5xx se reintentan con backoff exponencial y jitter.
+        
         Args:
             prompt: El prompt para enviar a Gemini
+            response_schema: Esquema JSON para pedir salida estructurada (opcional)
             
         Returns:
             Respuesta generada por Gemini
+            
+        Raises:
+            LLMError: Si la llamada falla tras agotar los reintentos
         """
+        generation_config = self._build_generation_config(response_schema)
+        attempt = 0
+        with tracer.span("llm.generate_response", structured=response_schema is not None) as span:
+            while True:
+                try:
+                    return await self._generate_with_hedging(prompt, generation_config)
+                except LLMError as e:
+                    if not e.transient or attempt >= settings.MAX_RETRIES:
+                        logger.warning("Error generando respuesta: %s", e, extra={"error_kind": e.kind, "retries": attempt})
+                        raise
+                    delay = self._retry_delay(attempt)
+                    attempt += 1
+                    self._retries += 1
+                    span.set_attribute("retries", attempt)
+                    logger.info("Reintento %d/%d en %.2fs tras error: %s", attempt, settings.MAX_RETRIES, delay, e,
+                                extra={"error_kind": e.kind})
+                    await asyncio.sleep(delay)
+    
+    async def _generate_with_hedging(self, prompt: str, generation_config) -> str:
+        """Lanza una llamada duplicada si la primera supera el p95 observado y se queda con la primera que acabe"""
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            return await self._call_model(prompt, generation_config)
+        
+        primary = asyncio.ensure_future(self._call_model(prompt, generation_config))
+        tasks = [primary]
         try:
-            # Configuración de generación
-            generation_config = genai.types.GenerationConfig(
-                temperature=settings.GEMINI_TEMPERATURE,
-                max_output_tokens=settings.GEMINI_MAX_TOKENS,
-            )
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                self._hedged_requests += 1
+                tasks.append(asyncio.ensure_future(self._call_model(prompt, generation_config)))
             
-            # Generar respuesta
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._hedge_wins += 1
+                        return task.result()
+            # Ambas fallaron: se informa el error de la llamada original
+            for task in tasks:
+                task.exception()
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _call_model(self, prompt: str, generation_config) -> str:
+        """Una única llamada al modelo a través del circuit breaker (con el circuito abierto falla al instante)"""
+        probe = self.breaker.before_call()
+        try:
+            text, latency = await self._call_upstream(prompt, generation_config)
+        except LLMError as e:
+            self.breaker.record_failure(e, probe)
+            raise
+        except BaseException:
+            self.breaker.record_abandoned(probe)
+            raise
+        self.breaker.record_success(latency, probe)
+        return text
+    
+    async def _call_upstream(self, prompt: str, generation_config) -> Tuple[str, float]:
+        """Una única llamada al modelo con timeout, en el pool de hilos y con permiso del planificador"""
+        with tracer.span("llm.queue_wait"):
+            permit = await self.scheduler.acquire(self._estimate_tokens(prompt, generation_config.max_output_tokens))
+        
+        def call_model():
             response = self.model.generate_content(
                 prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                request_options={"timeout": settings.API_TIMEOUT}
             )
+            # Acceder a .text falla si la respuesta vino bloqueada o vacía
+            text = response.text
+            self._record_usage(response)
+            return text, self._get_token_count(response)
+        
+        try:
+            # Generar respuesta sin bloquear el bucle de eventos
+            call = self._executor.submit(call_model)
+        except BaseException:
+            permit.release()
+            raise
+        # El permiso se libera cuando termina el hilo, aunque quien espera se haya cancelado antes
+        call.add_done_callback(lambda _: permit.release())
+        
+        start = time.monotonic()
+        with tracer.span("llm.upstream", mode="generate") as span:
+            try:
+                text, token_count = await asyncio.wait_for(asyncio.wrap_future(call), timeout=settings.API_TIMEOUT)
+            except Exception as e:
+                error = classify_error(e)
+                if isinstance(error, LLMRateLimitError):
+                    permit.record_rate_limited()
+                self._record_call("generate", time.monotonic() - start, error)
+                raise error
+            span.set_attribute("tokens", token_count)
+        
+        latency = time.monotonic() - start
+        self._latencies.append(latency)
+        self._record_call("generate", latency)
+        permit.record_success(token_count)
+        return text, latency
+    
+    def _record_call(self, mode: str, latency: float, error: Optional[LLMError] = None):
+        """Latencia y resultado de una llamada al modelo en las métricas"""
+        outcome = error.kind if error is not None else "ok"
+        UPSTREAM_LATENCY.observe(latency, mode=mode, outcome=outcome)
+        if error is not None:
+            UPSTREAM_ERRORS.inc(kind=error.kind)
+    
+    def _record_usage(self, response):
+        """Tokens de entrada y salida según usage_metadata, si el backend los informa"""
+        usage = getattr(response, "usage_metadata", None)
+        for direction, field in (("input", "prompt_token_count"), ("output", "candidates_token_count")):
+            count = getattr(usage, field, None)
+            if isinstance(count, int) and count > 0:
+                TOKENS.inc(count, direction=direction)
+    
+    def _retry_delay(self, attempt: int) -> float:
+        """Backoff exponencial con jitter completo"""
+        return random.uniform(0, min(settings.RETRY_MAX_DELAY, settings.RETRY_BASE_DELAY * 2 ** attempt))
+    
+    def _latency_quantile(self, quantile: float) -> Optional[float]:
+        """Cuantil de las latencias recientes, o None si aún no hay muestras"""
+        samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """Espera antes de duplicar una llamada, o None si no se debe duplicar"""
+        if not settings.ENABLE_HEDGED_REQUESTS or len(self._latencies) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        return self._latency_quantile(settings.HEDGE_QUANTILE)
+    
+    def _collect_metrics(self):
+        """Valores instantáneos del planificador y de la caché para /metrics"""
+        scheduler = self.scheduler.get_stats()
+        cache = self.cache.get_stats()
+        yield ("scamper_upstream_in_flight", "gauge", "Llamadas al modelo en curso",
+               [({}, scheduler["in_flight"])])
+        yield ("scamper_upstream_concurrency_limit", "gauge", "Límite adaptativo de llamadas simultáneas",
+               [({}, scheduler["concurrency_limit"])])
+        yield ("scamper_scheduler_queue_depth", "gauge", "Llamadas esperando permiso del planificador",
+               [({"priority": priority}, depth) for priority, depth in scheduler["queue_depth_by_priority"].items()])
+        yield ("scamper_cache_hit_ratio", "gauge", "Proporción de aciertos de la caché de ideas",
+               [({}, cache["hit_rate"])])
+        yield ("scamper_cache_memory_entries", "gauge", "Entradas en la caché en memoria",
+               [({}, cache["memory_entries"])])
+        yield ("scamper_circuit_breaker_state", "gauge", "Estado del circuit breaker del modelo (1 = actual)",
+               [({"state": state}, int(state == self.breaker.state)) for state in STATES])
+    
+    def get_call_stats(self) -> Dict[str, object]:
+        """Latencias observadas, reintentos y llamadas duplicadas"""
+        return {
+            "p50_latency_seconds": self._latency_quantile(0.5),
+            "p95_latency_seconds": self._latency_quantile(0.95),
+            "retries": self._retries,
+            "hedged_requests": self._hedged_requests,
+            "hedge_wins": self._hedge_wins,
+            "circuit_breaker": self.breaker.get_stats(),
+            "stale_pending_revalidation": len(self._stale_served),
+            "micro_batching": self.batcher.get_stats()
+        }
+    
+    async def stream_response(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Genera una respuesta en streaming usando Gemini
+        
+        Args:
+            prompt: El prompt para enviar a Gemini
             
-            return response.text
+        Yields:
+            Fragmentos de texto en cuanto llegan del modelo
             
+        Raises:
+            LLMError: Si la llamada falla o un fragmento tarda más que API_TIMEOUT
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        generation_config = self._build_generation_config()
+        probe = self.breaker.before_call()
+        try:
+            with tracer.span("llm.queue_wait"):
+                permit = await self.scheduler.acquire(self._estimate_tokens(prompt, generation_config.max_output_tokens))
+        except BaseException:
+            self.breaker.record_abandoned(probe)
+            raise
+        
+        def post(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                stop.set()  # El bucle ya se cerró: nadie consume el stream
+        
+        def produce():
+            # El iterador del SDK es bloqueante, se consume en el pool de hilos
+            start = time.monotonic()
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    stream=True,
+                    request_options={"timeout": settings.API_TIMEOUT}
+                )
+                token_count = None
+                usage_chunk = None
+                for chunk in response:
+                    if stop.is_set():
+                        break
+                    chunk_tokens = self._get_token_count(chunk)
+                    if chunk_tokens:
+                        token_count, usage_chunk = chunk_tokens, chunk
+                    post(chunk.text)
+                if usage_chunk is not None:
+                    self._record_usage(usage_chunk)
+                self._record_call("stream", time.monotonic() - start)
+                permit.record_success(token_count)
+            except Exception as e:
+                error = classify_error(e)
+                if isinstance(error, LLMRateLimitError):
+                    permit.record_rate_limited()
+                self._record_call("stream", time.monotonic() - start, error)
+                post(error)
+            finally:
+                permit.release()
+                post(_STREAM_END)
+        
+        start = time.monotonic()
+        try:
+            self._executor.submit(produce)
+        except BaseException:
+            permit.release()
+            self.breaker.record_abandoned(probe)
+            raise
+        # El span no se activa: un generador no puede mantenerlo activo entre yields
+        span = tracer.child_span("llm.upstream", mode="stream")
+        chunks = 0
+        # El primer fragmento ya demuestra que el proveedor responde; el resto del stream no cambia el breaker
+        breaker_informed = False
+        try:
+            while True:
+                # Cada fragmento tiene el mismo plazo que una llamada completa
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=settings.API_TIMEOUT)
+                except asyncio.TimeoutError as e:
+                    raise classify_error(e)
+                if isinstance(item, Exception):
+                    raise item
+                if not breaker_informed:
+                    breaker_informed = True
+                    self.breaker.record_success(time.monotonic() - start, probe)
+                if item is _STREAM_END:
+                    break
+                chunks += 1
+                yield item
+        except GeneratorExit:
+            span.set_attribute("closed_early", True)  # quien consumía ya tenía lo que necesitaba
+            raise
         except Exception as e:
-            print(f"Error generando respuesta: {e}")
-            return f"Error: No se pudo generar respuesta - {str(e)}"
+            span.record_error(e)
+            if not breaker_informed and isinstance(e, LLMError):
+                breaker_informed = True
+                self.breaker.record_failure(e, probe)
+            raise
+        finally:
+            if not breaker_informed:
+                self.breaker.record_abandoned(probe)
+            stop.set()
+            span.set_attribute("chunks", chunks)
+            span.end()
+    
+    async def stream_scamper_ideas(self, technique: str, problem: str, context: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Genera ideas para una técnica SCAMPER emitiéndolas una a una
+        
+        Args:
+            technique: Técnica SCAMPER a aplicar
+            problem: Problema a resolver
+            context: Contexto adicional (opcional)
+            
+        Yields:
+            Cada idea en cuanto su línea está completa
+            
+        Raises:
+            LLMError: Si la llamada falla antes de emitir ninguna idea
+        """
+        cached_ideas = await self.get_cached_ideas(technique, problem, context)
+        if cached_ideas is not None:
+            for idea in cached_ideas:
+                yield idea
+            return
+        
+        # Las peticiones idénticas simultáneas comparten una sola llamada a Gemini
+        key = self._make_cache_key(technique, problem, context)
+        async for idea in self._flights().stream(
+            key, lambda publish: self._stream_ideas(technique, problem, context, publish)
+        ):
+            yield idea
     
     async def generate_scamper_ideas(self, technique: str, problem: str, context: Optional[str] = None) -> List[str]:
         """
@@ -57,162 +507,381 @@ class GeminiClient:
             
         Returns:
             Lista de ideas generadas
+            
+        Raises:
+            LLMError: Si Gemini no pudo generar las ideas
         """
-        # Crear prompt específico para la técnica SCAMPER
-        prompt = self._create_scamper_prompt(technique, problem, context)
+        cached_ideas = await self.get_cached_ideas(technique, problem, context)
+        if cached_ideas is not None:
+            return cached_ideas
         
-        try:
+        key = self._make_cache_key(technique, problem, context)
+        return await self._flights().do(
+            key, lambda publish: self._generate_ideas(technique, problem, context, publish)
+        )
+    
+    def _flights(self) -> SingleFlight:
+        """Agrupador compartido, o uno propio de la llamada si la agrupación está desactivada"""
+        return self.single_flight if settings.ENABLE_SINGLE_FLIGHT else SingleFlight()
+    
+    async def _generate_ideas(self, technique: str, problem: str, context: Optional[str], publish) -> List[str]:
+        """Una llamada a Gemini para la técnica (propia o en un lote); publica las ideas al terminar"""
+        ideas = None
+        if settings.ENABLE_MICRO_BATCHING:
+            ideas = await self.batcher.submit((technique, problem, context))
+        
+        # Sin agrupar, o la respuesta agrupada no trajo esta técnica
+        if ideas is None:
+            # Crear prompt específico para la técnica SCAMPER
+            prompt = self._create_scamper_prompt(technique, problem, context)
+            
             response = await self.generate_response(prompt)
-            ideas = self._parse_ideas_from_response(response)
-            return ideas[:settings.MAX_IDEAS_PER_TECHNIQUE]  # Limitar número de ideas
+            with tracer.span("llm.parse") as span:
+                ideas = self._parse_ideas_from_response(response)
+                ideas = ideas[:settings.MAX_IDEAS_PER_TECHNIQUE]  # Limitar número de ideas
+                span.set_attribute("ideas", len(ideas))
+        
+        await self.store_cached_ideas(technique, problem, context, ideas)
+        for idea in ideas:
+            publish(idea)
+        return ideas
+    
+    async def _generate_idea_batch(self, tasks: List[Tuple[str, str, Optional[str]]]) -> List[Optional[List[str]]]:
+        """
+        Una llamada estructurada para varias tareas (técnica, problema, contexto) de distintas peticiones
+        
+        Returns:
+            Las ideas de cada tarea, en orden; None en las que la respuesta no trajo
+            (y en un lote de una sola tarea, que sale más barato con su prompt normal)
+        """
+        if len(tasks) < 2:
+            return [None] * len(tasks)
+        prompt = self._create_batch_prompt(tasks)
+        response = await self.generate_response(prompt, response_schema=self._create_batch_schema())
+        with tracer.span("llm.parse", structured=True) as span:
+            results = self._parse_batch_response(response, len(tasks))
+            span.set_attribute("answered", sum(ideas is not None for ideas in results))
+        return results
+    
+    async def _stream_ideas(self, technique: str, problem: str, context: Optional[str], publish) -> List[str]:
+        """Una llamada en streaming a Gemini; publica cada idea en cuanto su línea está completa"""
+        prompt = self._create_scamper_prompt(technique, problem, context)
+        parser = IdeaStreamParser()
+        ideas = []
+        stream = self.stream_response(prompt)
+        try:
+            async for chunk in stream:
+                for idea in parser.feed(chunk):
+                    if len(ideas) < settings.MAX_IDEAS_PER_TECHNIQUE:
+                        ideas.append(idea)
+                        publish(idea)
+                # Con el máximo de ideas alcanzado no hace falta esperar al resto
+                if len(ideas) >= settings.MAX_IDEAS_PER_TECHNIQUE:
+                    break
+            else:
+                for idea in parser.close():
+                    if len(ideas) < settings.MAX_IDEAS_PER_TECHNIQUE:
+                        ideas.append(idea)
+                        publish(idea)
+        except LLMError as e:
+            logger.warning("Error generando ideas SCAMPER en streaming: %s", e, extra={"error_kind": e.kind})
+            # Lo ya emitido se conserva; sin ninguna idea, el error llega a quien consume
+            if not ideas:
+                raise
+            return ideas
+        finally:
+            await stream.aclose()
+        
+        await self.store_cached_ideas(technique, problem, context, ideas)
+        return ideas
+    
+    async def generate_all_scamper_ideas(self, problem: str, context: Optional[str] = None) -> Tuple[Dict[str, List[str]], Optional[str]]:
+        """
+        Genera ideas para las 7 técnicas SCAMPER con una única llamada estructurada
+        
+        Args:
+            problem: Problema a resolver
+            context: Contexto adicional (opcional)
             
-        except Exception as e:
-            print(f"Error generando ideas SCAMPER: {e}")
-            return [f"Error generando ideas para {technique}"]
+        Returns:
+            Tupla con las ideas por técnica (solo las que vinieron bien formadas)
+            y el resumen ejecutivo si el modelo lo incluyó; vacía si la llamada falló
+        """
+        # Si todas las técnicas están en caché no hace falta llamar a Gemini
+        cached = {}
+        for technique in ScamperTechnique:
+            ideas = await self.get_cached_ideas(technique.value, problem, context)
+            if ideas is None:
+                break
+            cached[technique.value] = ideas
+        else:
+            return cached, None
+        
+        prompt = self._create_combined_scamper_prompt(problem, context)
+        try:
+            response = await self.generate_response(prompt, response_schema=self._create_combined_schema())
+        except LLMError:
+            # Las técnicas sin ideas se generan después por separado
+            return {}, None
+        with tracer.span("llm.parse", structured=True) as span:
+            ideas_by_technique, summary = self._parse_combined_response(response)
+            span.set_attribute("techniques", len(ideas_by_technique))
+        
+        for technique, ideas in ideas_by_technique.items():
+            await self.store_cached_ideas(technique, problem, context, ideas)
+        return ideas_by_technique, summary
+    
+    def _build_generation_config(self, response_schema: Optional[dict] = None):
+        """Configuración de generación, con salida JSON estructurada si hay esquema"""
+        generation_config = GenerationConfig(
+            temperature=settings.GEMINI_TEMPERATURE,
+            max_output_tokens=settings.GEMINI_MAX_TOKENS,
+        )
+        if response_schema is not None:
+            # La respuesta combinada necesita más tokens
+            generation_config.response_mime_type = "application/json"
+            generation_config.response_schema = response_schema
+            generation_config.max_output_tokens = settings.GEMINI_COMBINED_MAX_TOKENS
+        return generation_config
+    
+    def _estimate_tokens(self, prompt: str, max_output_tokens: int) -> int:
+        """Estimación previa de tokens (≈4 caracteres por token más la salida máxima)"""
+        return len(prompt) // 4 + max_output_tokens
+    
+    def _get_token_count(self, response) -> Optional[int]:
+        """Tokens reales consumidos según usage_metadata, si el SDK los informa"""
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None)
+        return total if isinstance(total, int) and total > 0 else None
+    
+    def _make_cache_key(self, technique: str, problem: str, context: Optional[str]) -> str:
+        """Clave de caché de una técnica con la configuración de generación actual"""
+        # Las respuestas simuladas no deben servirse nunca como si fueran del modelo real
+        model = settings.GEMINI_MODEL if settings.LLM_BACKEND == "gemini" else f"{settings.LLM_BACKEND}:{settings.GEMINI_MODEL}"
+        return make_cache_key(
+            technique, problem, context,
+            model, settings.GEMINI_TEMPERATURE, settings.MAX_IDEAS_PER_TECHNIQUE
+        )
+    
+    async def get_cached_ideas(self, technique: str, problem: str, context: Optional[str] = None) -> Optional[List[str]]:
+        """Devuelve las ideas en caché para la técnica, o None si no hay"""
+        if not settings.ENABLE_CACHE:
+            return None
+        with tracer.span("cache.lookup", technique=technique) as span:
+            ideas = await self.cache.get(self._make_cache_key(technique, problem, context))
+            span.set_attribute("hit", ideas is not None)
+            return ideas
+    
+    async def store_cached_ideas(self, technique: str, problem: str, context: Optional[str], ideas: List[str]):
+        """Guarda en caché las ideas generadas para la técnica"""
+        if settings.ENABLE_CACHE and ideas:
+            await self.cache.set(self._make_cache_key(technique, problem, context), ideas)
+    
+    async def get_stale_ideas(self, technique: str, problem: str, context: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Ideas en caché aunque hayan caducado, para servirlas con el circuito abierto
+        
+        La técnica queda pendiente de refrescar en cuanto el proveedor se recupere.
+        
+        Returns:
+            Ideas guardadas (de hasta CACHE_STALE_MAX_SECONDS de antigüedad), o None si no hay
+        """
+        if not settings.ENABLE_CACHE:
+            return None
+        with tracer.span("cache.stale_lookup", technique=technique) as span:
+            ideas = await self.cache.get_stale(self._make_cache_key(technique, problem, context),
+                                               settings.CACHE_STALE_MAX_SECONDS)
+            span.set_attribute("hit", ideas is not None)
+        if ideas is not None:
+            pending = (technique, problem, context)
+            self._stale_served[pending] = None
+            self._stale_served.move_to_end(pending)
+            while len(self._stale_served) > settings.STALE_REVALIDATION_MAX_KEYS:
+                self._stale_served.popitem(last=False)
+        return ideas
+    
+    def _revalidate_in_background(self):
+        """Al cerrarse el circuito, refresca en una tarea aparte lo que se sirvió caducado"""
+        if not self._stale_served or (self._revalidation_task is not None and not self._revalidation_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin bucle las técnicas siguen pendientes hasta el próximo cierre
+        self._revalidation_task = loop.create_task(self._revalidate_stale(), name="scamper-stale-revalidation")
+    
+    async def _revalidate_stale(self):
+        """Regenera una a una, con prioridad de lote, las técnicas servidas caducadas"""
+        refreshed = 0
+        with priority_scope(Priority.BATCH):
+            while self._stale_served:
+                technique, problem, context = pending = next(iter(self._stale_served))
+                key = self._make_cache_key(technique, problem, context)
+                try:
+                    # _generate_ideas guarda el resultado en la caché; si una petición ya la está
+                    # generando, se comparte su llamada
+                    await self._flights().do(
+                        key, lambda publish: self._generate_ideas(technique, problem, context, publish)
+                    )
+                except LLMError as e:
+                    # El proveedor volvió a fallar: lo que queda se intenta en el próximo cierre
+                    logger.info("Refresco de la caché caducada interrumpido: %s", e, extra={"error_kind": e.kind})
+                    break
+                self._stale_served.pop(pending, None)
+                refreshed += 1
+        if refreshed:
+            logger.info("♻️ %d técnicas caducadas refrescadas tras recuperarse el modelo", refreshed,
+                        extra={"refreshed": refreshed, "pending": len(self._stale_served)})
     
     def _create_scamper_prompt(self, technique: str, problem: str, context: Optional[str] = None) -> str:
         """Crea un prompt específico para cada técnica SCAMPER"""
+        guide = TECHNIQUE_GUIDES.get(technique)
+        if guide is None:
+            return f"Aplica SCAMPER al problema: {problem}"
         
-        technique_prompts = {
-            "substitute": f"""
-            Aplica la técnica SCAMPER de SUSTITUIR al siguiente problema:
-            Problema: {problem}
-            {f'Contexto: {context}' if context else ''}
-            
-            Genera exactamente 3 ideas creativas preguntándote:
-            - ¿Qué se puede sustituir?
-            - ¿Qué materiales, procesos o elementos se pueden reemplazar?
-            - ¿Qué alternativas existen?
-            
-            Formato de respuesta:
-            1. [Idea específica y concreta]
-            2. [Idea específica y concreta]  
-            3. [Idea específica y concreta]
-            """,
-            
-            "combine": f"""
-            Aplica la técnica SCAMPER de COMBINAR al siguiente problema:
-            Problema: {problem}
-            {f'Contexto: {context}' if context else ''}
-            
-            Genera exactamente 3 ideas creativas preguntándote:
-            - ¿Qué se puede combinar o fusionar?
-            - ¿Qué ideas, funciones o características se pueden unir?
-            - ¿Qué sinergias se pueden crear?
-            
-            Formato de respuesta:
-            1. [Idea específica y concreta]
-            2. [Idea específica y concreta]
-            3. [Idea específica y concreta]
-            """,
-            
-            "adapt": f"""
-            Aplica la técnica SCAMPER de ADAPTAR al siguiente problema:
-            Problema: {problem}
-            {f'Contexto: {context}' if context else ''}
-            
-            Genera exactamente 3 ideas creativas preguntándote:
-            - ¿Qué se puede adaptar de otros contextos?
-            - ¿Qué soluciones de otras industrias se pueden aplicar?
-            - ¿Qué se puede copiar o modificar de ideas existentes?
-            
-            Formato de respuesta:
-            1. [Idea específica y concreta]
-            2. [Idea específica y concreta]
-            3. [Idea específica y concreta]
-            """,
-            
-            "modify": f"""
-            Aplica la técnica SCAMPER de MODIFICAR/MAGNIFICAR al siguiente problema:
+        action, questions = guide
+        return f"""
+            Aplica la técnica SCAMPER de {action} al siguiente problema:
             Problema: {problem}
             {f'Contexto: {context}' if context else ''}
             
             Genera exactamente 3 ideas creativas preguntándote:
-            - ¿Qué se puede modificar, amplificar o exagerar?
-            - ¿Qué se puede hacer más grande, pequeño, fuerte, rápido?
-            - ¿Qué características se pueden intensificar?
+            - {questions[0]}
+            - {questions[1]}
+            - {questions[2]}
             
             Formato de respuesta:
             1. [Idea específica y concreta]
             2. [Idea específica y concreta]
             3. [Idea específica y concreta]
-            """,
-            
-            "put_to_other_uses": f"""
-            Aplica la técnica SCAMPER de OTROS USOS al siguiente problema:
+            """
+    
+    def _create_combined_scamper_prompt(self, problem: str, context: Optional[str] = None) -> str:
+        """Crea un único prompt que pide las 7 técnicas SCAMPER y el resumen"""
+        technique_lines = "\n".join(
+            f"            - {technique} ({action}): {' '.join(questions)}"
+            for technique, (action, questions) in TECHNIQUE_GUIDES.items()
+        )
+        return f"""
+            Eres un consultor de innovación experto. Aplica las 7 técnicas SCAMPER al siguiente problema:
             Problema: {problem}
             {f'Contexto: {context}' if context else ''}
             
-            Genera exactamente 3 ideas creativas preguntándote:
-            - ¿Para qué más se puede usar?
-            - ¿Qué otros mercados o aplicaciones podría tener?
-            - ¿Cómo se puede reutilizar de forma diferente?
+            Para cada técnica genera exactamente {settings.MAX_IDEAS_PER_TECHNIQUE} ideas creativas, específicas y concretas, preguntándote:
+{technique_lines}
             
-            Formato de respuesta:
-            1. [Idea específica y concreta]
-            2. [Idea específica y concreta]
-            3. [Idea específica y concreta]
-            """,
+            Añade en "summary" un resumen ejecutivo de máximo 4 oraciones que destaque las
+            direcciones más prometedoras, los patrones emergentes y los próximos pasos.
             
-            "eliminate": f"""
-            Aplica la técnica SCAMPER de ELIMINAR al siguiente problema:
-            Problema: {problem}
-            {f'Contexto: {context}' if context else ''}
-            
-            Genera exactamente 3 ideas creativas preguntándote:
-            - ¿Qué se puede eliminar, simplificar o reducir?
-            - ¿Qué es innecesario o redundante?
-            - ¿Cómo se puede hacer más minimalista?
-            
-            Formato de respuesta:
-            1. [Idea específica y concreta]
-            2. [Idea específica y concreta]
-            3. [Idea específica y concreta]
-            """,
+            Responde solo con un objeto JSON cuyas claves sean los identificadores de técnica
+            anteriores (listas de ideas sin numerar) y "summary".
+            """
+    
+    def _create_batch_prompt(self, tasks: List[Tuple[str, str, Optional[str]]]) -> str:
+        """Crea un prompt con varias tareas SCAMPER independientes, numeradas desde 0"""
+        task_blocks = []
+        for index, (technique, problem, context) in enumerate(tasks):
+            action, questions = TECHNIQUE_GUIDES.get(technique, (technique.upper(), ()))
+            lines = [f"            Tarea {index}: técnica SCAMPER de {action}",
+                     f"            Problema: {problem}"]
+            if context:
+                lines.append(f"            Contexto: {context}")
+            if questions:
+                lines.append(f"            Preguntas guía: {' '.join(questions)}")
+            task_blocks.append("\n".join(lines))
+        task_text = "\n\n".join(task_blocks)
+        return f"""
+            Eres un consultor de innovación experto. Resuelve por separado cada una de estas
+            tareas SCAMPER; cada una tiene su propio problema y no comparte nada con las demás.
             
-            "reverse": f"""
-            Aplica la técnica SCAMPER de INVERTIR/REORGANIZAR al siguiente problema:
-            Problema: {problem}
-            {f'Contexto: {context}' if context else ''}
+{task_text}
             
-            Genera exactamente 3 ideas creativas preguntándote:
-            - ¿Qué se puede invertir, reorganizar o hacer al revés?
-            - ¿Qué pasaría si cambiamos el orden o la secuencia?
-            - ¿Cómo se puede abordar desde el extremo opuesto?
+            Para cada tarea genera exactamente {settings.MAX_IDEAS_PER_TECHNIQUE} ideas creativas, específicas y concretas.
             
-            Formato de respuesta:
-            1. [Idea específica y concreta]
-            2. [Idea específica y concreta]
-            3. [Idea específica y concreta]
+            Responde solo con un objeto JSON con la lista "results": un elemento por tarea
+            con su "id" (el número de la tarea) y sus "ideas" (lista de ideas sin numerar).
             """
+    
+    def _create_batch_schema(self) -> dict:
+        """Esquema JSON de la respuesta agrupada: ideas por número de tarea"""
+        return {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "ideas": {"type": "array", "items": {"type": "string"}}
+                        },
+                        "required": ["id", "ideas"]
+                    }
+                }
+            },
+            "required": ["results"]
         }
+    
+    def _parse_batch_response(self, response: str, count: int) -> List[Optional[List[str]]]:
+        """Reparte la respuesta agrupada por tarea; las ausentes o mal formadas quedan en None"""
+        results: List[Optional[List[str]]] = [None] * count
+        try:
+            data = json.loads(response)
+        except (TypeError, ValueError):
+            logger.warning("Respuesta agrupada no es JSON válido")
+            return results
         
-        return technique_prompts.get(technique, f"Aplica SCAMPER al problema: {problem}")
+        entries = data.get("results") if isinstance(data, dict) else None
+        if not isinstance(entries, list):
+            return results
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            index, ideas = entry.get("id"), entry.get("ideas")
+            if type(index) is not int or not 0 <= index < count or not isinstance(ideas, list):
+                continue
+            clean_ideas = [idea.strip() for idea in ideas if isinstance(idea, str) and idea.strip()]
+            if clean_ideas and results[index] is None:
+                results[index] = clean_ideas[:settings.MAX_IDEAS_PER_TECHNIQUE]
+        return results
     
-    def _parse_ideas_from_response(self, response: str) -> List[str]:
-        """Parsea las ideas de la respuesta de Gemini"""
-        ideas = []
-        lines = response.strip().split('\n')
+    def _create_combined_schema(self) -> dict:
+        """Esquema JSON de la respuesta combinada, indexado por los valores de ScamperTechnique"""
+        properties = {
+            technique.value: {"type": "array", "items": {"type": "string"}}
+            for technique in ScamperTechnique
+        }
+        properties["summary"] = {"type": "string"}
+        return {"type": "object", "properties": properties, "required": list(properties)}
+    
+    def _parse_combined_response(self, response: str) -> Tuple[Dict[str, List[str]], Optional[str]]:
+        """Parsea la respuesta JSON combinada descartando técnicas ausentes o mal formadas"""
+        try:
+            data = json.loads(response)
+        except (TypeError, ValueError):
+            logger.warning("Respuesta combinada no es JSON válido")
+            return {}, None
         
-        for line in lines:
-            line = line.strip()
-            # Buscar líneas que empiecen con números (1., 2., 3., etc.)
-            if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                # Limpiar el formato (quitar números, guiones, etc.)
-                clean_idea = line
-                for prefix in ['1.', '2.', '3.', '4.', '5.', '-', '•', '*']:
-                    if clean_idea.startswith(prefix):
-                        clean_idea = clean_idea[len(prefix):].strip()
-                        break
-                
-                if clean_idea:
-                    ideas.append(clean_idea)
+        if not isinstance(data, dict):
+            return {}, None
         
-        # Si no encontró ideas con formato, tomar toda la respuesta
-        if not ideas:
-            ideas = [response.strip()]
+        ideas_by_technique = {}
+        for technique in ScamperTechnique:
+            ideas = data.get(technique.value)
+            if not isinstance(ideas, list):
+                continue
+            clean_ideas = [idea.strip() for idea in ideas if isinstance(idea, str) and idea.strip()]
+            if clean_ideas:
+                ideas_by_technique[technique.value] = clean_ideas[:settings.MAX_IDEAS_PER_TECHNIQUE]
         
-        return ideas
+        summary = data.get("summary")
+        summary = summary.strip() if isinstance(summary, str) and summary.strip() else None
+        return ideas_by_technique, summary
+    
+    def _parse_ideas_from_response(self, response: str) -> List[str]:
+        """Parsea las ideas de la respuesta de Gemini"""
+        parser = IdeaStreamParser()
+        return parser.feed(response.strip()) + parser.close()
 
 # Instancia global del cliente
 gemini_client = GeminiClient()
\ No newline at end of file
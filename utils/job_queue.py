@@ -0,0 +1,232 @@
+"""
+Cola persistente de trabajos SCAMPER (SQLite)
+
+/api/jobs encola el problema y responde al instante; los workers de
+interface/jobs.py reclaman los trabajos de esta cola y van guardando la
+respuesta parcial técnica a técnica. La cola vive en un archivo SQLite, así
+que los trabajos sobreviven a un reinicio y varios procesos (workers de
+uvicorn o `main.py --job-worker`) pueden drenar la misma cola.
+
+Cada trabajo en curso tiene un plazo (lease) que su worker renueva; si el
+proceso muere, el plazo vence y otro worker lo retoma, hasta JOB_MAX_ATTEMPTS
+intentos.
+"""
+
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config.settings import settings
+from models.schemas import ScamperResponse, UserInput
+from .metrics import metrics
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+ABANDONED_MESSAGE = "El análisis se interrumpió demasiadas veces"
+
+@dataclass
+class ClaimedJob:
+    """Trabajo reclamado por un worker"""
+    id: str
+    user_input: UserInput
+    attempt: int
+    queued_seconds: float
+
+class JobStore:
+    """Tabla de trabajos en SQLite, segura entre hilos y entre procesos"""
+
+    def __init__(self, path: str, lease_seconds: float = None, max_attempts: int = None):
+        """
+        Args:
+            path: Archivo SQLite de la cola
+            lease_seconds: Plazo de un trabajo en curso sin latido (por defecto JOB_LEASE_SECONDS)
+            max_attempts: Intentos antes de dar un trabajo por fallido (por defecto JOB_MAX_ATTEMPTS)
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la base de datos en el primer uso"""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Sin transacción implícita: claim() abre la suya con BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scamper_jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, problem TEXT NOT NULL, context TEXT, "
+                "response TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, lease_until REAL, "
+                "created_at REAL NOT NULL, started_at REAL, updated_at REAL NOT NULL, finished_at REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS scamper_jobs_queue ON scamper_jobs (status, created_at)")
+            self._connection = connection
+        return self._connection
+
+    def enqueue(self, user_input: UserInput) -> str:
+        """Encola un problema y retorna el id del trabajo"""
+        job_id = secrets.token_hex(16)
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO scamper_jobs (id, status, problem, context, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, user_input.problem, user_input.context, now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, object]]:
+        """
+        Estado de un trabajo para la API
+
+        Returns:
+            Diccionario con id, status, tiempos, intentos, la respuesta (parcial
+            mientras está en curso) y el error; None si no existe
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT id, status, response, error, attempts, created_at, started_at, updated_at, finished_at "
+                "FROM scamper_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(zip(("id", "status", "response", "error", "attempts", "created_at", "started_at",
+                            "updated_at", "finished_at"), row))
+            if job["status"] == QUEUED:
+                job["queue_position"] = connection.execute(
+                    "SELECT COUNT(*) FROM scamper_jobs WHERE status = ? AND created_at < ?", (QUEUED, job["created_at"])
+                ).fetchone()[0]
+        if job["response"] is not None:
+            job["response"] = ScamperResponse.model_validate_json(job["response"]).model_dump(mode="json")
+        return job
+
+    def claim(self, worker: str) -> Optional[ClaimedJob]:
+        """
+        Reclama el trabajo más antiguo pendiente, o uno en curso cuyo plazo venció
+
+        Los que ya agotaron sus intentos se dan por fallidos sin ejecutarlos.
+        """
+        with self._lock:
+            connection = self._connect()
+            # BEGIN IMMEDIATE toma el bloqueo de escritura: dos procesos no reclaman el mismo trabajo
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    now = time.time()
+                    row = connection.execute(
+                        "SELECT id, problem, context, attempts, created_at FROM scamper_jobs "
+                        "WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY created_at LIMIT 1",
+                        (QUEUED, RUNNING, now)
+                    ).fetchone()
+                    if row is None:
+                        connection.execute("COMMIT")
+                        return None
+                    job_id, problem, context, attempts, created_at = row
+                    if attempts >= self.max_attempts:
+                        connection.execute(
+                            "UPDATE scamper_jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, "
+                            "updated_at = ?, finished_at = ? WHERE id = ?",
+                            (FAILED, ABANDONED_MESSAGE, now, now, job_id)
+                        )
+                        continue
+                    connection.execute(
+                        "UPDATE scamper_jobs SET status = ?, worker = ?, attempts = attempts + 1, lease_until = ?, "
+                        "response = NULL, started_at = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, worker, now + self.lease_seconds, now, now, job_id)
+                    )
+                    connection.execute("COMMIT")
+                    return ClaimedJob(job_id, UserInput(problem=problem, context=context), attempts + 1, now - created_at)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, job_id: str, worker: str, response: Optional[ScamperResponse] = None) -> bool:
+        """
+        Renueva el plazo del trabajo y, si se indica, guarda la respuesta parcial
+
+        Returns:
+            False si el trabajo ya no es de este worker (venció su plazo y otro lo retomó)
+        """
+        now = time.time()
+        if response is None:
+            query, params = "UPDATE scamper_jobs SET lease_until = ?, updated_at = ?", [now + self.lease_seconds, now]
+        else:
+            query, params = ("UPDATE scamper_jobs SET lease_until = ?, updated_at = ?, response = ?",
+                             [now + self.lease_seconds, now, response.model_dump_json()])
+        return self._update_owned(query, params, job_id, worker)
+
+    def complete(self, job_id: str, worker: str, response: ScamperResponse) -> bool:
+        """Guarda la respuesta final"""
+        now = time.time()
+        return self._update_owned(
+            "UPDATE scamper_jobs SET status = ?, response = ?, worker = NULL, lease_until = NULL, "
+            "updated_at = ?, finished_at = ?", [DONE, response.model_dump_json(), now, now], job_id, worker)
+
+    def fail(self, job_id: str, worker: str, error: str, response: Optional[ScamperResponse] = None) -> bool:
+        """Marca el trabajo como fallido, con la respuesta indicada o la parcial que hubiera"""
+        now = time.time()
+        query = "UPDATE scamper_jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, updated_at = ?, finished_at = ?"
+        params = [FAILED, error, now, now]
+        if response is not None:
+            query += ", response = ?"
+            params.append(response.model_dump_json())
+        return self._update_owned(query, params, job_id, worker)
+
+    def release(self, job_id: str, worker: str) -> bool:
+        """Devuelve a la cola un trabajo interrumpido al parar el worker (sin gastar un intento)"""
+        return self._update_owned(
+            "UPDATE scamper_jobs SET status = ?, attempts = attempts - 1, worker = NULL, lease_until = NULL, "
+            "response = NULL, updated_at = ?", [QUEUED, time.time()], job_id, worker)
+
+    def _update_owned(self, query: str, params: list, job_id: str, worker: str) -> bool:
+        with self._lock:
+            cursor = self._connect().execute(
+                query + " WHERE id = ? AND worker = ? AND status = ?", params + [job_id, worker, RUNNING])
+        return cursor.rowcount == 1
+
+    def purge(self, max_age: float = None) -> int:
+        """Borra los trabajos terminados hace más de max_age segundos (por defecto JOB_RETENTION_SECONDS)"""
+        max_age = max_age if max_age is not None else settings.JOB_RETENTION_SECONDS
+        with self._lock:
+            cursor = self._connect().execute(
+                "DELETE FROM scamper_jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, time.time() - max_age))
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Trabajos por estado"""
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM scamper_jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def collect_metrics(self):
+        """Trabajos por estado para /metrics (nada si la cola aún no se abrió en este proceso)"""
+        if self._connection is None:
+            return
+        yield ("scamper_jobs", "gauge", "Trabajos de /api/jobs por estado",
+               [({"status": status}, count) for status, count in self.counts().items()])
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM scamper_jobs")
+
+def create_job_store() -> JobStore:
+    """Crea la cola de trabajos según la configuración (el archivo se abre en el primer uso)"""
+    return JobStore(settings.JOBS_DB_PATH)
+
+# Instancia global
+job_store = create_job_store()
+metrics.register_collector(job_store.collect_metrics)
@@ -0,0 +1,364 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Optional, Protocol
+from config.settings import settings
+
+@dataclass
+class GenerationConfig:
+    """Parámetros de generación, independientes del proveedor"""
+    temperature: float
+    max_output_tokens: int
+    response_mime_type: Optional[str] = None
+    response_schema: Optional[dict] = None
+
+@dataclass
+class UsageMetadata:
+    total_token_count: int
+    prompt_token_count: Optional[int] = None
+    candidates_token_count: Optional[int] = None
+
+@dataclass
+class BackendResponse:
+    """Respuesta o fragmento de stream con la misma forma que los del SDK de Gemini"""
+    text: str
+    usage_metadata: Optional[UsageMetadata] = None
+
+class BackendError(Exception):
+    """Error simulado con un código HTTP, que classify_error trata como los del SDK"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class LLMBackend(Protocol):
+    """
+    Lo que GeminiClient necesita de un proveedor de modelos
+
+    generate_content es bloqueante (se llama desde el pool de hilos). Con
+    stream=False retorna un objeto con .text y .usage_metadata; con stream=True,
+    un iterable de fragmentos con esos mismos atributos.
+    """
+
+    def generate_content(self, prompt: str, generation_config: GenerationConfig, stream: bool = False,
+                         request_options: Optional[dict] = None) -> Any:
+        ...
+
+def _load_sdk():
+    """Importa el SDK de Gemini en el primer uso: tarda más de un segundo y la CLI no siempre lo necesita"""
+    import google.generativeai as genai
+    return genai
+
+class GeminiBackend:
+    """Backend real: la API de Gemini a través de google.generativeai"""
+
+    def __init__(self, model_name: str, api_key: Optional[str]):
+        self._genai = _load_sdk()
+        self._api_key = api_key
+        if api_key:
+            self._genai.configure(api_key=api_key)
+        self.model = self._genai.GenerativeModel(model_name)
+
+    def generate_content(self, prompt: str, generation_config: GenerationConfig, stream: bool = False,
+                         request_options: Optional[dict] = None) -> Any:
+        # La falta de API key se informa en cada llamada, no al crear el cliente
+        if not self._api_key:
+            raise ValueError("GEMINI_API_KEY no está configurada")
+        fields = {name: value for name, value in asdict(generation_config).items() if value is not None}
+        return self.model.generate_content(
+            prompt,
+            generation_config=self._genai.types.GenerationConfig(**fields),
+            stream=stream,
+            request_options=request_options
+        )
+
+# Fragmentos de texto por respuesta en streaming simulado
+_STUB_STREAM_CHUNK = 24
+
+class StubBackend:
+    """
+    Backend simulado, sin red ni API key, para pruebas de carga y benchmarks
+
+    Responde listas numeradas SCAMPER (o el JSON combinado o agrupado si se pide) con
+    latencias aleatorias reproducibles, una tasa de errores 503, ráfagas de 429
+    cada cierto número de llamadas y un recuento de tokens.
+    """
+
+    def __init__(self, latency_ms: float = 800.0, distribution: str = "lognormal", spread: float = 0.5,
+                 error_rate: float = 0.0, rate_limit_every: int = 0, rate_limit_burst: int = 5,
+                 tokens_per_call: int = 0, seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms: Latencia mediana por llamada
+            distribution: fixed, uniform (±spread) o lognormal (sigma = spread)
+            spread: Dispersión de la latencia según la distribución
+            error_rate: Probabilidad de que una llamada falle con 503
+            rate_limit_every: Cada cuántas llamadas empieza una ráfaga de 429 (0 = nunca)
+            rate_limit_burst: Llamadas seguidas rechazadas en cada ráfaga
+            tokens_per_call: Tokens informados por llamada (0 = estimados del texto)
+            seed: Semilla para repetir exactamente la misma secuencia
+        """
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Distribución de latencia desconocida: {distribution}")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.spread = spread
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_burst = rate_limit_burst
+        self.tokens_per_call = tokens_per_call
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_settings(cls) -> "StubBackend":
+        return cls(
+            latency_ms=settings.STUB_LATENCY_MS,
+            distribution=settings.STUB_LATENCY_DISTRIBUTION,
+            spread=settings.STUB_LATENCY_SPREAD,
+            error_rate=settings.STUB_ERROR_RATE,
+            rate_limit_every=settings.STUB_RATE_LIMIT_EVERY,
+            rate_limit_burst=settings.STUB_RATE_LIMIT_BURST,
+            tokens_per_call=settings.STUB_TOKENS_PER_CALL,
+            seed=settings.STUB_SEED
+        )
+
+    def generate_content(self, prompt: str, generation_config: GenerationConfig, stream: bool = False,
+                         request_options: Optional[dict] = None) -> Any:
+        latency, error = self._plan_call()
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise BackendError(504, "Deadline Exceeded (simulado)")
+        if error is not None:
+            time.sleep(latency * 0.1)  # los rechazos llegan rápido
+            raise error
+
+        text = self.render(prompt, generation_config)
+        usage = self._usage(prompt, text)
+        if not stream:
+            time.sleep(latency)
+            return BackendResponse(text, usage)
+        return self._stream(text, usage, latency)
+
+    def _usage(self, prompt: str, text: str) -> UsageMetadata:
+        """≈4 caracteres por token, o el total fijo configurado repartido en la misma proporción"""
+        prompt_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+        if self.tokens_per_call:
+            prompt_tokens = self.tokens_per_call * prompt_tokens // max(1, prompt_tokens + output_tokens)
+            output_tokens = self.tokens_per_call - prompt_tokens
+        return UsageMetadata(prompt_tokens + output_tokens, prompt_tokens, output_tokens)
+
+    def _plan_call(self):
+        """Sortea la latencia y el posible error de una llamada (bajo el lock: secuencia reproducible)"""
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+            latency = self._sample_latency()
+            failed = self._random.random() < self.error_rate
+        if self.rate_limit_every and call % self.rate_limit_every >= self.rate_limit_every - self.rate_limit_burst:
+            return latency, BackendError(429, "Resource exhausted (simulado)")
+        if failed:
+            return latency, BackendError(503, "Service unavailable (simulado)")
+        return latency, None
+
+    def _sample_latency(self) -> float:
+        median = self.latency_ms / 1000
+        if self.distribution == "fixed":
+            return median
+        if self.distribution == "uniform":
+            return max(0.0, median * self._random.uniform(1 - self.spread, 1 + self.spread))
+        return median * math.exp(self._random.gauss(0, self.spread))
+
+    def _stream(self, text: str, usage: UsageMetadata, latency: float) -> Iterator[BackendResponse]:
+        """Primer fragmento tras ~40% de la latencia y el resto repartido hasta completarla"""
+        chunks = [text[i:i + _STUB_STREAM_CHUNK] for i in range(0, len(text), _STUB_STREAM_CHUNK)] or [""]
+        time.sleep(latency * 0.4)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(latency * 0.6 / (len(chunks) - 1))
+            last = index == len(chunks) - 1
+            yield BackendResponse(chunk, usage if last else None)
+
+    def render(self, prompt: str, generation_config: Optional[GenerationConfig] = None) -> str:
+        """Texto de respuesta con el formato que pide el prompt"""
+        problem_match = re.search(r"Problema(?: analizado)?: (.+)", prompt)
+        problem = self._short_problem(problem_match.group(1) if problem_match else "el problema")
+        count = settings.MAX_IDEAS_PER_TECHNIQUE
+
+        schema = generation_config.response_schema if generation_config is not None else None
+        if schema and "results" in schema.get("properties", {}):
+            # Lote de tareas independientes: las mismas ideas que con su prompt individual
+            tasks = re.findall(r"Tarea (\d+): técnica SCAMPER de (\S+).*\n\s*Problema: (.+)", prompt)
+            return json.dumps({"results": [
+                {"id": int(index), "ideas": self._ideas(action.lower(), self._short_problem(task_problem), count)}
+                for index, action, task_problem in tasks
+            ]}, ensure_ascii=False)
+
+        if generation_config is not None and generation_config.response_mime_type == "application/json":
+            from models.schemas import ScamperTechnique
+            data = {
+                technique.value: self._ideas(technique.value.replace("_", " "), problem, count)
+                for technique in ScamperTechnique
+            }
+            data["summary"] = f"Resumen simulado de las direcciones más prometedoras para {problem}."
+            return json.dumps(data, ensure_ascii=False)
+
+        technique_match = re.search(r"técnica SCAMPER de (\S+)", prompt)
+        if technique_match:
+            ideas = self._ideas(technique_match.group(1).lower(), problem, count)
+            return "\n".join(f"{number}. {idea}" for number, idea in enumerate(ideas, 1))
+        return f"Resumen simulado: las ideas para {problem} apuntan a varias direcciones prometedoras."
+
+    def _short_problem(self, problem: str) -> str:
+        problem = problem.strip()
+        return problem[:57] + "..." if len(problem) > 60 else problem
+
+    def _ideas(self, action: str, problem: str, count: int) -> List[str]:
+        return [f"Idea simulada {number} ({action}) para {problem}" for number in range(1, count + 1)]
+
+class HttpBackend:
+    """
+    Backend que llama a un servidor HTTP local (ver serve_stub_http)
+
+    Sirve para medir también la red y la serialización sin depender del proveedor.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/") + "/generate"
+
+    def generate_content(self, prompt: str, generation_config: GenerationConfig, stream: bool = False,
+                         request_options: Optional[dict] = None) -> Any:
+        body = json.dumps({
+            "prompt": prompt,
+            "generation_config": asdict(generation_config),
+            "stream": stream
+        }).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        timeout = (request_options or {}).get("timeout")
+        try:
+            response = urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            raise BackendError(e.code, e.read().decode("utf-8", "replace")) from e
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, TimeoutError):
+                raise e.reason
+            raise ConnectionError(f"Servidor simulado no disponible: {e.reason}") from e
+
+        if stream:
+            return self._read_stream(response)
+        with response:
+            return self._to_response(json.loads(response.read()))
+
+    def _read_stream(self, response) -> Iterator[BackendResponse]:
+        # Una línea JSON por fragmento
+        with response:
+            for line in response:
+                if line.strip():
+                    yield self._to_response(json.loads(line))
+
+    def _to_response(self, data: dict) -> BackendResponse:
+        usage = data.get("usage")
+        return BackendResponse(data["text"], UsageMetadata(**usage) if usage else None)
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """Expone un StubBackend por HTTP: POST /generate"""
+
+    backend: StubBackend = None
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        data = json.loads(self.rfile.read(length))
+        config = GenerationConfig(**data["generation_config"])
+        try:
+            result = self.backend.generate_content(data["prompt"], config, stream=data.get("stream", False))
+        except BackendError as e:
+            self._send_json(e.code, {"error": str(e)})
+            return
+
+        if not data.get("stream"):
+            self._send_json(200, self._encode(result))
+            return
+        # Sin Content-Length: el final del cuerpo lo marca el cierre de la conexión
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for chunk in result:
+            self.wfile.write(json.dumps(self._encode(chunk), ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def _encode(self, response: BackendResponse) -> dict:
+        usage = response.usage_metadata
+        return {"text": response.text, "usage": asdict(usage) if usage else None}
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Bajo carga, una línea por petición solo añade ruido
+
+def serve_stub_http(host: str = "127.0.0.1", port: int = 8765, backend: Optional[StubBackend] = None) -> ThreadingHTTPServer:
+    """
+    Crea el servidor HTTP simulado (llamar a serve_forever() para atenderlo)
+
+    Args:
+        host: Interfaz de escucha
+        port: Puerto (0 para uno libre)
+        backend: StubBackend que responde (por defecto, el de la configuración)
+    """
+    handler = type("StubRequestHandler", (_StubRequestHandler,), {"backend": backend or StubBackend.from_settings()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """
+    Crea el backend configurado en LLM_BACKEND
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    name = name or settings.LLM_BACKEND
+    if name == "gemini":
+        return GeminiBackend(settings.GEMINI_MODEL, settings.GEMINI_API_KEY)
+    if name == "stub":
+        return StubBackend.from_settings()
+    if name == "http":
+        return HttpBackend(settings.LLM_HTTP_URL)
+    raise ValueError(f"Backend de LLM desconocido: {name} (usa gemini, stub o http)")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor HTTP que simula el modelo (backend http)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = serve_stub_http(args.host, args.port)
+    print(f"🧪 Modelo simulado en http://{args.host}:{args.port} "
+          f"(latencia {settings.STUB_LATENCY_MS:.0f} ms, {settings.STUB_LATENCY_DISTRIBUTION})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
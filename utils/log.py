@@ -0,0 +1,168 @@
+"""
+Registro estructurado y sin bloqueo del bucle de eventos
+
+Los módulos registran con get_logger() y los puntos de entrada (CLI, lote,
+servidor web) llaman una vez a configure_logging() con su modo. Los mensajes
+se encolan en el hilo que registra y un hilo aparte los escribe en stderr, así
+que una salida lenta (un pipe lleno bajo gunicorn) nunca frena una petición.
+
+La salida para el usuario de la CLI (ideas, resúmenes) sigue en stdout con
+print(), en interface/chatbot.py y main.py.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Dict, Optional
+
+from config.settings import settings
+from .tracing import tracer
+
+ROOT_LOGGER = "scamper"
+
+# Niveles por defecto de cada modo; SCAMPER_LOG_LEVEL los sustituye todos.
+# El detalle de cada agente (DEBUG) solo aparece si se pide
+MODE_LEVELS: Dict[str, Dict[str, int]] = {
+    "cli": {ROOT_LOGGER: logging.WARNING},  # el chatbot ya muestra el progreso al usuario
+    "batch": {ROOT_LOGGER: logging.WARNING, "scamper.batch": logging.INFO},
+    "server": {ROOT_LOGGER: logging.INFO, "scamper.agents": logging.WARNING},
+}
+MODE_FORMATS = {"cli": "text", "batch": "text", "server": "json"}
+
+_TEXT_FORMATS = {
+    "cli": "%(message)s",
+    "batch": "%(message)s",
+    "server": "%(asctime)s %(levelname)s %(name)s: %(message)s",
+}
+
+# Atributos propios de LogRecord: el resto son campos pasados con extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger del sistema (scamper.<name>), p. ej. get_logger("agents.substitute")"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por mensaje, con los campos de extra={...} y la traza activa"""
+
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _TraceContextFilter(logging.Filter):
+    """Añade trace_id y span_id del span activo; corre en el hilo que registra, antes de encolar"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = tracer.current_span()
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Encola sin esperar nunca: con la cola llena se descarta el mensaje y se cuenta"""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            type(self).dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mensaje y traza de la excepción se resuelven aquí: el hilo escritor solo recibe texto
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Al parar espera sitio en la cola: con ella llena, put_nowait fallaría y el hilo no terminaría"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+def configure_logging(mode: str = "cli", level: Optional[str] = None, fmt: Optional[str] = None,
+                      stream=None, max_queue: int = 10000):
+    """
+    Configura el registro del sistema para un modo de ejecución (se puede llamar varias veces)
+
+    Args:
+        mode: cli, batch o server; fija los niveles y el formato por defecto
+        level: Nivel para todos los loggers del sistema (por defecto LOG_LEVEL o el del modo)
+        fmt: text o json (por defecto LOG_FORMAT o el del modo)
+        stream: Destino de los mensajes (stderr por defecto)
+        max_queue: Mensajes pendientes de escribir antes de empezar a descartar
+    """
+    global _listener
+    if mode not in MODE_LEVELS:
+        raise ValueError(f"Modo de registro desconocido: {mode} (usa cli, batch o server)")
+    level = level or settings.LOG_LEVEL
+    fmt = (fmt or settings.LOG_FORMAT or MODE_FORMATS[mode]).lower()
+
+    if _listener is not None:
+        _listener.stop()  # escribe lo pendiente con la configuración anterior
+        _listener = None
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    elif fmt == "text":
+        handler.setFormatter(logging.Formatter(_TEXT_FORMATS[mode]))
+    else:
+        raise ValueError(f"Formato de registro desconocido: {fmt} (usa text o json)")
+
+    log_queue = queue.Queue(maxsize=max_queue)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(_TraceContextFilter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    for old_handler in list(root.handlers):
+        root.removeHandler(old_handler)
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+    # Los niveles de una configuración anterior no deben sobrevivir al cambio de modo
+    for name, logger in logging.root.manager.loggerDict.items():
+        if name.startswith(ROOT_LOGGER + ".") and isinstance(logger, logging.Logger):
+            logger.setLevel(logging.NOTSET)
+    if level:
+        root.setLevel(level.upper())
+    else:
+        for name, mode_level in MODE_LEVELS[mode].items():
+            logging.getLogger(name).setLevel(mode_level)
+
+    _listener = _QueueListener(log_queue, handler)
+    _listener.start()
+
+def shutdown_logging():
+    """Escribe los mensajes pendientes y detiene el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,216 @@
+"""
+Vigilancia del bucle de eventos: retraso (lag) y llamadas que lo bloquean
+
+Una tarea latido duerme LOOP_MONITOR_INTERVAL_MS y mide cuánto tarda de más
+en despertar: ese retraso es el tiempo que el bucle estuvo ocupado con otra
+cosa. Un hilo vigilante comprueba los latidos; si uno se retrasa más de
+LOOP_BLOCK_THRESHOLD_MS, captura la pila del hilo del bucle (la del código
+que lo está bloqueando, p. ej. un generate_content síncrono) y la registra.
+
+Se activa con SCAMPER_LOOP_MONITOR=1 en la CLI, el lote y los servidores web;
+los resultados salen por /metrics (scamper_event_loop_lag_seconds y
+scamper_event_loop_blocks_total) y por el registro, con la pila completa.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import nullcontext
+from typing import Deque, List, Optional
+
+from config.settings import PROJECT_ROOT, settings
+from .log import get_logger
+from .metrics import LOOP_BLOCKS, LOOP_LAG
+
+logger = get_logger("loop_monitor")
+
+_NOOP_CONTEXT = nullcontext()
+_THIS_FILE = os.path.abspath(__file__)
+_ASYNCIO_EVENTS = asyncio.events.__file__
+
+class BlockingCall:
+    """Un bloqueo detectado: dónde estaba el bucle y cuánto duró"""
+
+    __slots__ = ("site", "stack", "detected_at", "duration")
+
+    def __init__(self, site: str, stack: str, duration: float):
+        self.site = site
+        self.stack = stack
+        self.detected_at = time.time()
+        self.duration = duration  # al detectarlo es un mínimo; se completa cuando el bucle vuelve
+
+    def to_dict(self) -> dict:
+        return {"site": self.site, "duration_ms": round(self.duration * 1000, 1), "stack": self.stack}
+
+class _WatchedLoop:
+    """Estado de un bucle vigilado, compartido entre su tarea latido y el hilo vigilante"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, thread_id: int, interval: float):
+        self.loop = loop
+        self.thread_id = thread_id
+        self.interval = interval
+        self.last_beat = time.perf_counter()
+        self.blocking: Optional[BlockingCall] = None
+        self.task: Optional[asyncio.Task] = None
+
+def _blocking_site(frame) -> str:
+    """Primer marco del proyecto (el más interno) en la pila del bucle, p. ej. utils/gemini_client.py:call_model"""
+    innermost = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if innermost is None:
+            innermost = frame
+        if filename.startswith(PROJECT_ROOT) and filename != _THIS_FILE:
+            return f"{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    if innermost is None:
+        return "unknown"
+    return f"{os.path.basename(innermost.f_code.co_filename)}:{innermost.f_code.co_name}"
+
+def _task_stack(frame) -> str:
+    """Pila del hilo del bucle desde el callback en curso; lo de encima (asyncio.run, el bucle) es igual siempre"""
+    frames = traceback.extract_stack(frame)
+    for index in range(len(frames) - 1, -1, -1):
+        if frames[index].filename == _ASYNCIO_EVENTS:
+            frames = frames[index + 1:]
+            break
+    return "".join(traceback.format_list(frames))
+
+class LoopMonitor:
+    """
+    Mide el retraso de los bucles de eventos y detecta los bloqueos largos
+
+    Un solo hilo vigilante atiende a todos los bucles del proceso (en Flask cada
+    petición tiene el suyo). Sin SCAMPER_LOOP_MONITOR, watch() no hace nada.
+    """
+
+    def __init__(self, interval: float = None, threshold: float = None, max_findings: int = 100):
+        """
+        Args:
+            interval: Segundos entre latidos (por defecto LOOP_MONITOR_INTERVAL_MS)
+            threshold: Segundos de bloqueo a partir de los que se informa (por defecto LOOP_BLOCK_THRESHOLD_MS)
+            max_findings: Bloqueos recientes que se conservan en findings
+        """
+        self.interval = interval if interval is not None else settings.LOOP_MONITOR_INTERVAL_MS / 1000
+        self.threshold = threshold if threshold is not None else settings.LOOP_BLOCK_THRESHOLD_MS / 1000
+        self.enabled = settings.LOOP_MONITOR
+        self.findings: Deque[BlockingCall] = deque(maxlen=max_findings)
+        self._watched: List[_WatchedLoop] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(self, enabled: bool = True, interval: float = None, threshold: float = None):
+        """Activa o desactiva la vigilancia para los bucles que empiecen a partir de ahora"""
+        self.enabled = enabled
+        if interval is not None:
+            self.interval = interval
+        if threshold is not None:
+            self.threshold = threshold
+
+    def watch(self):
+        """
+        Vigila el bucle en curso mientras dura el bloque (async with)
+
+        Se usa alrededor del trabajo de cada punto de entrada; desactivado es un
+        contexto vacío compartido.
+        """
+        if not self.enabled:
+            return _NOOP_CONTEXT
+        return _Watch(self)
+
+    def start(self) -> _WatchedLoop:
+        """Empieza a vigilar el bucle en curso; se llama desde una corrutina de ese bucle"""
+        watched = _WatchedLoop(asyncio.get_running_loop(), threading.get_ident(), self.interval)
+        watched.task = asyncio.create_task(self._heartbeat(watched), name="scamper-loop-monitor")
+        with self._lock:
+            self._watched.append(watched)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watchdog, name="scamper-loop-watchdog", daemon=True)
+                self._thread.start()
+        return watched
+
+    async def stop(self, watched: _WatchedLoop):
+        with self._lock:
+            if watched in self._watched:
+                self._watched.remove(watched)
+        watched.task.cancel()
+        try:
+            await watched.task
+        except asyncio.CancelledError:
+            pass
+
+    async def _heartbeat(self, watched: _WatchedLoop):
+        interval = watched.interval
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            LOOP_LAG.observe(lag)
+            watched.last_beat = now
+            blocking = watched.blocking
+            if blocking is not None:
+                # El bucle volvió: se completa la duración del bloqueo ya informado
+                blocking.duration = max(blocking.duration, lag)
+                watched.blocking = None
+                logger.info("Bucle de eventos libre tras %.0f ms bloqueado en %s", blocking.duration * 1000,
+                            blocking.site, extra={"blocked_ms": round(blocking.duration * 1000, 1),
+                                                  "site": blocking.site})
+
+    def _watchdog(self):
+        while True:
+            with self._lock:
+                watched_loops = list(self._watched)
+                if not watched_loops:
+                    self._thread = None
+                    return
+            poll = max(0.005, self.threshold / 4)
+            now = time.perf_counter()
+            for watched in watched_loops:
+                if watched.blocking is not None or not watched.loop.is_running():
+                    continue
+                overdue = now - watched.last_beat - watched.interval
+                if overdue > self.threshold:
+                    self._report(watched, overdue)
+            time.sleep(poll)
+
+    def _report(self, watched: _WatchedLoop, overdue: float):
+        frame = sys._current_frames().get(watched.thread_id)
+        if frame is None:
+            return
+        stack = _task_stack(frame)
+        blocking = BlockingCall(_blocking_site(frame), stack, overdue)
+        watched.blocking = blocking
+        self.findings.append(blocking)
+        LOOP_BLOCKS.inc(site=blocking.site)
+        logger.warning("Bucle de eventos bloqueado más de %.0f ms en %s\n%s", overdue * 1000, blocking.site, stack,
+                       extra={"site": blocking.site, "blocked_ms": round(overdue * 1000, 1)})
+
+class _Watch:
+    """Contexto asíncrono de LoopMonitor.watch()"""
+
+    __slots__ = ("monitor", "watched")
+
+    def __init__(self, monitor: LoopMonitor):
+        self.monitor = monitor
+        self.watched = None
+
+    async def __aenter__(self):
+        self.watched = self.monitor.start()
+        return self.watched
+
+    async def __aexit__(self, *exc_info):
+        await self.monitor.stop(self.watched)
+        return False
+
+async def monitored(coro):
+    """Ejecuta una corrutina con el bucle vigilado, para asyncio.run() en la CLI y el lote"""
+    async with loop_monitor.watch():
+        return await coro
+
+# Instancia global
+loop_monitor = LoopMonitor()
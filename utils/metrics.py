@@ -0,0 +1,289 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Límites de los histogramas de latencia (segundos): de la caché en memoria a una llamada lenta
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Retraso del bucle de eventos: lo normal es menos de un milisegundo
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Tareas por llamada agrupada (micro-batching)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+# Un colector retorna, en el momento de exponer las métricas, tuplas
+# (nombre, tipo, ayuda, [(etiquetas, valor)]) con valores calculados al vuelo
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """Base de las métricas: una serie de valores por combinación de etiquetas"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}, recibió {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+class Counter(_Metric):
+    """Valor que solo crece (llamadas, errores, tokens)"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in sorted(self._series.items())]
+
+class Gauge(Counter):
+    """Valor que sube y baja (peticiones en curso)"""
+
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Suma uno mientras dura el bloque"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    """Distribución de valores (latencias) en intervalos acumulados, con suma y recuento"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Recuentos por intervalo (el último es +Inf), suma y total
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observa la duración del bloque"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso, exportable en el formato de texto de Prometheus
+
+    Las métricas se actualizan desde cualquier hilo o bucle de eventos. Los
+    colectores añaden valores que se calculan al exportar (p. ej. la cola del
+    planificador), y snapshot()/merge() permiten juntar las métricas de varios
+    procesos (modo --batch con --workers).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Todas las métricas en el formato de exposición de texto de Prometheus (0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        families = [(metric.name, metric.type, metric.help, metric.samples()) for metric in metrics]
+        for collector in collectors:
+            for name, metric_type, help, values in collector():
+                families.append((name, metric_type, help, [(name, labels, value) for labels, value in values]))
+
+        for name, metric_type, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, List]:
+        """Valores de contadores e histogramas, serializables, para combinarlos con merge()"""
+        snapshot = {}
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if metric.type == "gauge":
+                continue  # Un valor instantáneo de otro proceso no se puede sumar
+            with metric._lock:
+                snapshot[metric.name] = [
+                    [list(key), [list(value[0]), value[1], value[2]] if metric.type == "histogram" else value]
+                    for key, value in metric._series.items()
+                ]
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, List]):
+        """Suma a este registro las métricas de otro proceso"""
+        for name, series in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            with metric._lock:
+                for key, value in series:
+                    key = tuple(key)
+                    if metric.type == "histogram":
+                        current = metric._series.setdefault(key, [[0] * (len(metric.buckets) + 1), 0.0, 0])
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                    else:
+                        metric._series[key] = metric._series.get(key, 0) + value
+
+    def reset(self):
+        """Vacía todas las series (para pruebas)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            with metric._lock:
+                metric._series.clear()
+
+# Instancia global
+metrics = MetricsRegistry()
+
+AGENT_LATENCY = metrics.histogram(
+    "scamper_agent_latency_seconds", "Duración de cada agente de técnica SCAMPER", ["technique", "status"])
+UPSTREAM_LATENCY = metrics.histogram(
+    "scamper_upstream_latency_seconds", "Duración de cada llamada al modelo", ["mode", "outcome"])
+SUMMARY_LATENCY = metrics.histogram(
+    "scamper_summary_latency_seconds", "Duración de la fase de resumen ejecutivo", ["source"])
+TOKENS = metrics.counter(
+    "scamper_tokens_total", "Tokens consumidos según usage_metadata", ["direction"])
+CACHE_LOOKUPS = metrics.counter(
+    "scamper_cache_lookups_total", "Consultas a la caché de ideas por resultado", ["result"])
+UPSTREAM_ERRORS = metrics.counter(
+    "scamper_upstream_errors_total", "Llamadas al modelo fallidas por tipo de error", ["kind"])
+TECHNIQUE_ERRORS = metrics.counter(
+    "scamper_technique_errors_total", "Técnicas sin ideas por tipo de error", ["technique", "kind"])
+STALE_RESULTS = metrics.counter(
+    "scamper_stale_results_total", "Técnicas servidas desde la caché caducada con el modelo no disponible", ["technique"])
+BREAKER_TRANSITIONS = metrics.counter(
+    "scamper_circuit_breaker_transitions_total", "Cambios de estado del circuit breaker del modelo", ["state"])
+BREAKER_REJECTIONS = metrics.counter(
+    "scamper_circuit_breaker_rejections_total", "Llamadas al modelo rechazadas al instante con el circuito abierto")
+BATCH_SIZE = metrics.histogram(
+    "scamper_llm_batch_size", "Tareas enviadas en cada llamada agrupada al modelo", buckets=BATCH_SIZE_BUCKETS)
+BATCH_WAIT = metrics.histogram(
+    "scamper_llm_batch_wait_seconds", "Espera de cada tarea hasta que sale su lote", buckets=LAG_BUCKETS)
+JOBS_FINISHED = metrics.counter(
+    "scamper_jobs_finished_total", "Trabajos de /api/jobs terminados por estado final", ["status"])
+JOB_QUEUE_WAIT = metrics.histogram(
+    "scamper_job_queue_wait_seconds", "Espera de cada trabajo en la cola hasta que un worker lo reclama")
+SEMANTIC_CACHE_LOOKUPS = metrics.counter(
+    "scamper_semantic_cache_lookups_total", "Consultas a la caché semántica de respuestas por resultado", ["result"])
+ANALYSES_IN_FLIGHT = metrics.gauge(
+    "scamper_analyses_in_flight", "Análisis SCAMPER en curso", ["mode"])
+HTTP_REQUESTS = metrics.counter(
+    "scamper_http_requests_total", "Peticiones HTTP atendidas por endpoint y estado", ["endpoint", "status"])
+HTTP_IN_FLIGHT = metrics.gauge(
+    "scamper_http_requests_in_flight", "Peticiones HTTP en curso", ["endpoint"])
+HTTP_SHED = metrics.counter(
+    "scamper_http_shed_total", "Peticiones no admitidas por sobrecarga, por motivo y destino (rejected o job)",
+    ["endpoint", "reason", "action"])
+LOOP_LAG = metrics.histogram(
+    "scamper_event_loop_lag_seconds", "Retraso del latido del bucle de eventos (SCAMPER_LOOP_MONITOR)",
+    buckets=LAG_BUCKETS)
+LOOP_BLOCKS = metrics.counter(
+    "scamper_event_loop_blocks_total", "Bloqueos del bucle de eventos por encima del umbral, por lugar", ["site"])
+
+def cache_hit_ratio() -> Optional[float]:
+    """Proporción de consultas a la caché que acertaron (None si aún no hubo ninguna)"""
+    hits = CACHE_LOOKUPS.value(result="memory_hit") + CACHE_LOOKUPS.value(result="disk_hit")
+    total = hits + CACHE_LOOKUPS.value(result="miss")
+    return hits / total if total else None
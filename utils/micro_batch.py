@@ -0,0 +1,170 @@
+"""
+Agrupación de llamadas al modelo entre peticiones (micro-batching)
+
+Con muchas peticiones simultáneas cada técnica hacía su propia llamada
+pequeña al modelo. Con el agrupador, las tareas que llegan dentro de una
+ventana corta (MICRO_BATCH_WINDOW_MS desde la primera) salen juntas en una
+única llamada, de hasta MICRO_BATCH_MAX_SIZE tareas, y la respuesta se
+reparte entre quienes esperaban. Un lote lleno sale sin esperar a la ventana.
+
+Las peticiones viven en bucles de eventos distintos (Flask crea uno por
+petición), así que las ventanas y las llamadas agrupadas se ejecutan en un
+bucle propio, en un hilo aparte; cada llamante espera un
+concurrent.futures.Future desde su bucle.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+from config.settings import settings
+from .metrics import BATCH_SIZE, BATCH_WAIT
+from .rate_limiter import Priority, current_priority, priority_scope
+from .tracing import tracer
+
+# Recibe las tareas del lote y retorna un resultado por tarea (None si no se obtuvo)
+BatchRunner = Callable[[List[Any]], Awaitable[Sequence[Optional[Any]]]]
+
+class _Pending:
+    """Una tarea esperando a que salga su lote"""
+
+    __slots__ = ("item", "future", "priority", "parent_span", "enqueued_at")
+
+    def __init__(self, item: Any, priority: Priority, parent_span):
+        self.item = item
+        self.future = concurrent.futures.Future()
+        self.priority = priority
+        self.parent_span = parent_span
+        self.enqueued_at = time.monotonic()
+
+class _Batch:
+    """Lote en formación; se cierra al llenarse o al acabar su ventana"""
+
+    __slots__ = ("tasks", "closed")
+
+    def __init__(self):
+        self.tasks: List[_Pending] = []
+        self.closed = False
+
+class MicroBatcher:
+    """Forma lotes con las tareas que llegan a la vez, desde cualquier hilo o bucle de eventos"""
+
+    def __init__(self, run_batch: BatchRunner, max_size: int = None, window_seconds: float = None):
+        """
+        Args:
+            run_batch: Corrutina que resuelve un lote completo en una llamada
+            max_size: Tareas por lote (por defecto MICRO_BATCH_MAX_SIZE)
+            window_seconds: Espera máxima de la primera tarea de un lote (por defecto MICRO_BATCH_WINDOW_MS)
+        """
+        self._run_batch = run_batch
+        self._max_size = max_size
+        self._window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._forming: Optional[_Batch] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.batched_tasks = 0
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size or settings.MICRO_BATCH_MAX_SIZE
+
+    @property
+    def window_seconds(self) -> float:
+        if self._window_seconds is not None:
+            return self._window_seconds
+        return settings.MICRO_BATCH_WINDOW_MS / 1000
+
+    async def submit(self, item: Any) -> Optional[Any]:
+        """
+        Añade una tarea al lote en formación y espera su resultado
+
+        Returns:
+            El resultado de la tarea, o None si la respuesta agrupada no lo incluyó
+
+        Raises:
+            LLMError: Si falla la llamada agrupada
+        """
+        pending = _Pending(item, current_priority(), tracer.current_span())
+        loop = self._batch_loop()
+        with self._lock:
+            batch = self._forming
+            if batch is None:
+                batch = self._forming = _Batch()
+                loop.call_soon_threadsafe(self._arm_window, batch)
+            batch.tasks.append(pending)
+            full = len(batch.tasks) >= self.max_size and self._close_locked(batch)
+        if full:
+            loop.call_soon_threadsafe(self._launch, batch)
+        with tracer.span("llm.batch_wait"):
+            # Si el llamante se cancela antes de que salga el lote, su tarea se descarta
+            return await asyncio.wrap_future(pending.future)
+
+    def _batch_loop(self) -> asyncio.AbstractEventLoop:
+        """Bucle del agrupador, creado con su hilo en el primer uso"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="scamper-batcher", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _close_locked(self, batch: _Batch) -> bool:
+        """Cierra el lote si seguía abierto (con el lock tomado); solo quien lo cierra lo lanza"""
+        if batch.closed:
+            return False
+        batch.closed = True
+        if self._forming is batch:
+            self._forming = None
+        return True
+
+    def _arm_window(self, batch: _Batch):
+        self._loop.call_later(self.window_seconds, self._on_window_end, batch)
+
+    def _on_window_end(self, batch: _Batch):
+        with self._lock:
+            expired = self._close_locked(batch)
+        if expired:
+            self._launch(batch)
+
+    def _launch(self, batch: _Batch):
+        self._loop.create_task(self._run(batch))
+
+    async def _run(self, batch: _Batch):
+        # Las tareas cuyo llamante ya se fue no se piden al modelo
+        tasks = [pending for pending in batch.tasks if pending.future.set_running_or_notify_cancel()]
+        if not tasks:
+            return
+        now = time.monotonic()
+        BATCH_SIZE.observe(len(tasks))
+        for pending in tasks:
+            BATCH_WAIT.observe(now - pending.enqueued_at)
+        with self._lock:
+            self.batches += 1
+            self.batched_tasks += len(tasks)
+
+        # La llamada hereda la prioridad más alta del lote y cuelga de la traza de su primera tarea
+        priority = min(pending.priority for pending in tasks)
+        try:
+            with priority_scope(priority), tracer.use_span(tasks[0].parent_span), \
+                    tracer.span("llm.batch", size=len(tasks)):
+                results = await self._run_batch([pending.item for pending in tasks])
+        except Exception as e:
+            for pending in tasks:
+                pending.future.set_exception(e)
+            return
+        results = list(results)
+        for index, pending in enumerate(tasks):
+            pending.future.set_result(results[index] if index < len(results) else None)
+
+    def get_stats(self) -> dict:
+        """Lotes enviados y tareas que viajaron en ellos"""
+        with self._lock:
+            return {
+                "enabled": settings.ENABLE_MICRO_BATCHING,
+                "batches": self.batches,
+                "batched_tasks": self.batched_tasks,
+                "average_batch_size": self.batched_tasks / self.batches if self.batches else 0.0,
+            }
@@ -0,0 +1,396 @@
+import asyncio
+import heapq
+import itertools
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Optional, Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class Priority(IntEnum):
+    """Clases de prioridad de las llamadas al modelo (menor valor, antes se atiende)"""
+    INTERACTIVE = 0
+    BATCH = 1
+
+# Prioridad de la petición en curso; se hereda en las tareas que crea
+_current_priority = ContextVar("scamper_request_priority", default=Priority.INTERACTIVE)
+
+@contextmanager
+def priority_scope(priority: Priority):
+    """Ejecuta el bloque con la prioridad indicada para todas sus llamadas al modelo"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+class TokenBucket:
+    """Token bucket con recarga continua expresada en unidades por minuto"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self, amount: float, now: float) -> float:
+        """Segundos hasta que haya `amount` unidades disponibles (0 si ya las hay)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Devuelve (positivo) o cobra (negativo) unidades tras conocer el consumo real"""
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+class RateBudget:
+    """Presupuesto de peticiones y tokens por minuto de un proceso"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+    def try_acquire(self, tokens: float, now: float) -> float:
+        """Consume una petición y `tokens` si caben; si no, retorna los segundos que faltan"""
+        delay = max(
+            self.request_bucket.time_until_available(1, now),
+            self.token_bucket.time_until_available(tokens, now)
+        )
+        if delay == 0:
+            self.request_bucket.consume(1, now)
+            self.token_bucket.consume(tokens, now)
+        return delay
+
+    def adjust_tokens(self, delta: float):
+        self.token_bucket.adjust(delta)
+
+@contextmanager
+def _file_lock(fd: int):
+    """Bloqueo exclusivo entre procesos sobre un archivo abierto"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+class SharedRateBudget:
+    """
+    Presupuesto de peticiones y tokens por minuto compartido entre procesos
+
+    El estado de ambos buckets vive en un archivo pequeño que cada operación
+    lee y reescribe con un bloqueo exclusivo, así que todos los procesos que
+    usan la misma ruta respetan una única cuota del proveedor.
+    """
+    _STATE = struct.Struct("<ddd")  # peticiones disponibles, tokens disponibles, última recarga
+
+    def __init__(self, path: str, requests_per_minute: float, tokens_per_minute: float):
+        self.path = path
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0
+        self._fd = None
+        self._pid = None
+
+    def _open(self) -> int:
+        # Cada proceso abre su propio descriptor: uno heredado con fork compartiría el bloqueo
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _read(self, fd: int, now: float):
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, self._STATE.size)
+        if len(data) < self._STATE.size:
+            return self.request_capacity, self.token_capacity  # Archivo nuevo: buckets llenos
+        requests, tokens, updated = self._STATE.unpack(data)
+        elapsed = max(0.0, now - updated)
+        return (min(self.request_capacity, requests + elapsed * self.request_rate),
+                min(self.token_capacity, tokens + elapsed * self.token_rate))
+
+    def _write(self, fd: int, requests: float, tokens: float, now: float):
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, self._STATE.pack(requests, tokens, now))
+
+    def try_acquire(self, tokens: float, now: Optional[float] = None) -> float:
+        """Igual que RateBudget.try_acquire, pero atómico entre procesos"""
+        # El reloj monotónico no es comparable entre procesos; se usa la hora del sistema
+        now = time.time()
+        tokens = min(tokens, self.token_capacity)
+        fd = self._open()
+        with _file_lock(fd):
+            available_requests, available_tokens = self._read(fd, now)
+            delay = max(
+                (1 - available_requests) / self.request_rate if available_requests < 1 else 0.0,
+                (tokens - available_tokens) / self.token_rate if available_tokens < tokens else 0.0
+            )
+            if delay == 0:
+                available_requests -= 1
+                available_tokens -= tokens
+            self._write(fd, available_requests, available_tokens, now)
+        return delay
+
+    def adjust_tokens(self, delta: float):
+        now = time.time()
+        fd = self._open()
+        with _file_lock(fd):
+            available_requests, available_tokens = self._read(fd, now)
+            self._write(fd, available_requests, min(self.token_capacity, available_tokens + delta), now)
+
+class AdaptiveConcurrencyLimit:
+    """Límite de concurrencia AIMD: sube poco a poco con éxitos y se reduce a la mitad con 429"""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5,
+                 decrease_interval: float = 1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+        self.limit = float(max_limit)
+        self._last_decrease = float("-inf")
+
+    @property
+    def current(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def on_success(self):
+        # Incremento aditivo: aproximadamente +1 por cada ventana de `limit` llamadas
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+
+    def on_rate_limited(self):
+        # Varios 429 de la misma ráfaga solo cuentan una vez
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+
+class _Waiter:
+    """Llamada en cola esperando turno"""
+    __slots__ = ("priority", "sequence", "tokens", "loop", "future", "enqueued_at")
+
+    def __init__(self, priority: Priority, sequence: int, tokens: float, loop, enqueued_at: float):
+        self.priority = priority
+        self.sequence = sequence
+        self.tokens = tokens
+        self.loop = loop
+        self.future = None
+        self.enqueued_at = enqueued_at
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+class SchedulerPermit:
+    """Permiso para una llamada en curso; debe liberarse al terminar"""
+
+    def __init__(self, scheduler: "RequestScheduler", tokens: float, priority: Priority, wait_time: float):
+        self.scheduler = scheduler
+        self.tokens = tokens
+        self.priority = priority
+        self.wait_time = wait_time
+        self._released = False
+
+    def record_success(self, actual_tokens: Optional[int] = None):
+        self.scheduler._on_success(self, actual_tokens)
+
+    def record_rate_limited(self):
+        self.scheduler._on_rate_limited()
+
+    def release(self):
+        """Libera el hueco de concurrencia (idempotente y seguro desde cualquier hilo)"""
+        if not self._released:
+            self._released = True
+            self.scheduler._release()
+
+class RequestScheduler:
+    """
+    Planificador compartido por todas las llamadas al modelo del proceso
+
+    Combina límites de peticiones y tokens por minuto, un límite de concurrencia
+    adaptativo (AIMD) y colas por prioridad. Es seguro entre hilos y entre bucles
+    de eventos, porque Flask ejecuta cada petición en un bucle distinto. Con un
+    SharedRateBudget, el límite por minuto se reparte además entre procesos.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 max_concurrency: int, min_concurrency: int = 1, budget=None):
+        self.budget = budget if budget is not None else RateBudget(requests_per_minute, tokens_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimit(max_concurrency, min_concurrency)
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._admitted = 0
+        self._rate_limited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def acquire(self, estimated_tokens: float = 0, priority: Optional[Priority] = None) -> SchedulerPermit:
+        """
+        Espera turno para una llamada al modelo
+
+        Args:
+            estimated_tokens: Tokens estimados (entrada + salida) de la llamada
+            priority: Clase de prioridad; por defecto la del contexto actual
+
+        Returns:
+            Permiso que hay que liberar al terminar la llamada
+        """
+        priority = current_priority() if priority is None else priority
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = _Waiter(priority, next(self._sequence), estimated_tokens, loop, time.monotonic())
+            heapq.heappush(self._waiters, waiter)
+
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_admit_locked(waiter)
+                    if delay == 0.0:
+                        wait_time = time.monotonic() - waiter.enqueued_at
+                        return SchedulerPermit(self, estimated_tokens, priority, wait_time)
+                    waiter.future = loop.create_future()
+                # Sin retardo conocido se espera a que otra llamada libere su hueco
+                await asyncio.wait({waiter.future}, timeout=delay)
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                    self._wake_next_locked()
+            raise
+
+    def _try_admit_locked(self, waiter: _Waiter) -> Optional[float]:
+        """Admite la llamada si puede; si no, retorna cuánto esperar (None: hasta un aviso)"""
+        if self._drop_abandoned_locked() and self._waiters[0] is not waiter:
+            self._wake_next_locked()
+        if self._waiters[0] is not waiter:
+            return None
+        if self._in_flight >= self.concurrency.current:
+            return None
+
+        now = time.monotonic()
+        delay = self.budget.try_acquire(waiter.tokens, now)
+        if delay > 0:
+            return delay
+
+        heapq.heappop(self._waiters)
+        self._in_flight += 1
+        self._admitted += 1
+        wait_time = now - waiter.enqueued_at
+        self._total_wait += wait_time
+        self._max_wait = max(self._max_wait, wait_time)
+        # El siguiente de la cola puede caber también
+        self._wake_next_locked()
+        return 0.0
+
+    def _drop_abandoned_locked(self) -> bool:
+        """
+        Quita de la cola las llamadas cuyo bucle de eventos ya se cerró
+
+        Ese bucle no volverá a ejecutarlas (p. ej. un stream SSE que el cliente
+        abandonó), así que no saldrían nunca de la cola y bloquearían a las demás.
+
+        Returns:
+            True si se quitó alguna
+        """
+        alive = [waiter for waiter in self._waiters if not waiter.loop.is_closed()]
+        if len(alive) == len(self._waiters):
+            return False
+        heapq.heapify(alive)
+        self._waiters = alive
+        return True
+
+    def _wake_next_locked(self):
+        self._drop_abandoned_locked()
+        if not self._waiters:
+            return
+        head = self._waiters[0]
+        if head.future is not None and not head.future.done():
+            try:
+                head.loop.call_soon_threadsafe(_wake, head.future)
+            except RuntimeError:
+                pass  # El bucle de esa petición ya se cerró
+
+    def set_budget(self, budget):
+        """Sustituye el presupuesto por minuto (p. ej. por uno compartido entre procesos)"""
+        with self._lock:
+            self.budget = budget
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._wake_next_locked()
+
+    def _on_success(self, permit: SchedulerPermit, actual_tokens: Optional[int]):
+        with self._lock:
+            self.concurrency.on_success()
+            if actual_tokens is not None:
+                self.budget.adjust_tokens(permit.tokens - actual_tokens)
+
+    def _on_rate_limited(self):
+        with self._lock:
+            self._rate_limited += 1
+            self.concurrency.on_rate_limited()
+
+    def queue_depth(self, priority: Optional[Priority] = None) -> int:
+        """Llamadas esperando turno; con priority, solo las de esa prioridad o más urgentes"""
+        with self._lock:
+            self._drop_abandoned_locked()
+            if priority is None:
+                return len(self._waiters)
+            return sum(1 for waiter in self._waiters if waiter.priority <= priority)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Profundidad de cola, tiempos de espera y estado del límite de concurrencia"""
+        with self._lock:
+            self._drop_abandoned_locked()
+            queued_by_priority = {priority.name.lower(): 0 for priority in Priority}
+            for waiter in self._waiters:
+                queued_by_priority[waiter.priority.name.lower()] += 1
+            return {
+                "queue_depth": len(self._waiters),
+                "queue_depth_by_priority": queued_by_priority,
+                "in_flight": self._in_flight,
+                "concurrency_limit": self.concurrency.current,
+                "admitted": self._admitted,
+                "rate_limited": self._rate_limited,
+                "avg_wait_seconds": self._total_wait / self._admitted if self._admitted else 0.0,
+                "max_wait_seconds": self._max_wait
+            }
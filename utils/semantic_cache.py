@@ -0,0 +1,237 @@
+"""
+Caché semántica de respuestas completas para problemas parafraseados
+
+La caché de ideas (utils/cache.py) solo acierta si el texto normalizado es
+idéntico. Esta guarda la ScamperResponse completa y la encuentra también para
+redacciones parecidas ("mejorar la comunicación en equipos remotos" y
+"mejorar comunicación de equipos en remoto"):
+
+- Cada problema (y su contexto) se reduce a sus palabras completas, sin
+  tildes, sin palabras vacías y sin la "s" final del plural; las
+  características son esas palabras y los trigramas de caracteres del texto.
+- MinHash resume esas características en una firma de NUM_PERM enteros; la
+  fracción de posiciones iguales entre dos firmas estima su similitud de Jaccard.
+- LSH reparte la firma en bandas: solo se comparan las entradas que
+  coinciden en alguna banda, así que la búsqueda no recorre toda la caché.
+- Cada candidata se comprueba después con las palabras exactas: hace falta
+  una similitud de Jaccard de SEMANTIC_CACHE_VERIFY_THRESHOLD entre los
+  conjuntos de palabras y las mismas negaciones. Así "comunicación" y
+  "comunidad", o "ventas" y "ventanas", no se confunden por compartir
+  trigramas. Este segundo umbral es el que decide en problemas cortos: con
+  el valor por defecto (0.9), una paráfrasis debe conservar casi las mismas
+  palabras aunque cambie su orden o las palabras vacías.
+
+Todo es local y en memoria, con un máximo de entradas (LRU) y TTL.
+"""
+
+import hashlib
+import random
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from config.settings import settings
+from models.schemas import ResultStatus, ScamperResponse, UserInput
+from .cache import normalize_text
+from .metrics import SEMANTIC_CACHE_LOOKUPS
+
+NUM_PERM = 64
+BANDS = 16  # 4 filas por banda: candidatas a partir de una similitud de ~0.5
+
+# Palabras que no cambian el problema ("mejorar LA comunicación EN equipos")
+_STOPWORDS = frozenset(
+    "a al ante con de del desde e el en entre la las lo los mas mi mis muy o para pero por que se su sus "
+    "un una unas uno unos y u nuestro nuestra nuestros nuestras como cada este esta estos estas".split()
+)
+# Invierten el sentido del problema: dos problemas solo coinciden si tienen las mismas
+_NEGATIONS = frozenset("no ni nunca jamas sin tampoco nada ningun ninguna ninguno ningunos ningunas".split())
+_SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+
+Signature = Tuple[int, ...]
+
+def _terms(text: Optional[str]) -> List[str]:
+    """Palabras significativas completas, sin tildes y sin la "s" del plural ("remotos" -> "remoto")"""
+    text = unicodedata.normalize("NFKD", normalize_text(text))
+    text = "".join(char if char.isalnum() else " " for char in text if not unicodedata.combining(char))
+    return [word[:-1] if len(word) > 3 and word.endswith("s") else word
+            for word in text.split() if word not in _STOPWORDS]
+
+def words(problem: str, context: Optional[str] = None) -> FrozenSet[str]:
+    """Palabras del problema y del contexto (marcadas por separado), para la comprobación final"""
+    return frozenset(f"{prefix}:{term}" for prefix, text in (("p", problem), ("c", context)) for term in _terms(text))
+
+def shingles(problem: str, context: Optional[str] = None) -> FrozenSet[str]:
+    """Palabras y trigramas de caracteres del problema y del contexto (marcados por separado)"""
+    features = set(words(problem, context))
+    for prefix, text in (("p", problem), ("c", context)):
+        joined = " ".join(_terms(text))
+        for start in range(len(joined) - _SHINGLE_SIZE + 1):
+            features.add(f"{prefix}#{joined[start:start + _SHINGLE_SIZE]}")
+    return frozenset(features)
+
+def same_problem(first: FrozenSet[str], second: FrozenSet[str], threshold: Optional[float] = None) -> bool:
+    """
+    Comprobación exacta de una candidata: mismas negaciones y casi las mismas palabras
+
+    Args:
+        threshold: Similitud de Jaccard mínima entre las palabras; por defecto SEMANTIC_CACHE_VERIFY_THRESHOLD
+    """
+    if threshold is None:
+        threshold = settings.SEMANTIC_CACHE_VERIFY_THRESHOLD
+    if not first or not second:
+        return False
+    if {word for word in first if word[2:] in _NEGATIONS} != {word for word in second if word[2:] in _NEGATIONS}:
+        return False
+    return len(first & second) / len(first | second) >= threshold
+
+class MinHasher:
+    """Firmas MinHash con NUM_PERM permutaciones (a·x + b) mod p fijas, iguales entre procesos"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self._permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, features: FrozenSet[str]) -> Signature:
+        hashes = [int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                  for feature in features]
+        if not hashes:
+            return ()
+        return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in self._permutations)
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Similitud de Jaccard estimada: fracción de posiciones iguales entre dos firmas"""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+class SemanticCache:
+    """Índice LSH de respuestas completas, acotado en entradas (LRU) y con TTL"""
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float,
+                 num_perm: int = NUM_PERM, bands: int = BANDS, verify_threshold: Optional[float] = None):
+        """
+        Args:
+            threshold: Similitud estimada mínima (0-1) para considerar una respuesta guardada
+            max_entries: Respuestas guardadas como máximo; se desaloja la menos usada
+            ttl_seconds: Antigüedad máxima de una respuesta
+            num_perm: Longitud de las firmas MinHash
+            bands: Bandas LSH (num_perm debe ser múltiplo)
+            verify_threshold: Similitud de Jaccard mínima entre las palabras para servirla
+                (por defecto SEMANTIC_CACHE_VERIFY_THRESHOLD)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm debe ser múltiplo de bands")
+        self.threshold = threshold
+        self.verify_threshold = (settings.SEMANTIC_CACHE_VERIFY_THRESHOLD
+                                 if verify_threshold is None else verify_threshold)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._hasher = MinHasher(num_perm)
+        self._rows = num_perm // bands
+        self._bands = bands
+        # (espacio, firma) -> (guardada en, respuesta, palabras)
+        self._entries: "OrderedDict[Tuple[tuple, Signature], Tuple[float, ScamperResponse, FrozenSet[str]]]" = OrderedDict()
+        self._buckets: Dict[Tuple, Set[Tuple[tuple, Signature]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _namespace(self) -> tuple:
+        # Solo se reutilizan respuestas generadas con el mismo backend y la misma configuración del modelo
+        return (settings.LLM_BACKEND, settings.GEMINI_MODEL, settings.GEMINI_TEMPERATURE, settings.MAX_IDEAS_PER_TECHNIQUE)
+
+    def _band_keys(self, namespace: tuple, signature: Signature):
+        for band in range(self._bands):
+            yield namespace, band, signature[band * self._rows:(band + 1) * self._rows]
+
+    def get(self, user_input: UserInput) -> Optional[Tuple[ScamperResponse, float]]:
+        """
+        Busca una respuesta guardada para un problema parecido
+
+        Returns:
+            (respuesta, similitud) de la entrada más parecida por encima del umbral, o None
+        """
+        namespace = self._namespace()
+        query_words = words(user_input.problem, user_input.context)
+        signature = self._hasher.signature(shingles(user_input.problem, user_input.context))
+        best, best_similarity = None, 0.0
+        with self._lock:
+            if signature:
+                candidates = set()
+                for band_key in self._band_keys(namespace, signature):
+                    candidates.update(self._buckets.get(band_key, ()))
+                now = time.monotonic()
+                for key in candidates:
+                    stored_at, _, stored_words = self._entries[key]
+                    if now - stored_at > self.ttl_seconds:
+                        self._remove(key)
+                        continue
+                    score = similarity(signature, key[1])
+                    if (score >= self.threshold and score > best_similarity
+                            and same_problem(query_words, stored_words, self.verify_threshold)):
+                        best, best_similarity = key, score
+            if best is None:
+                self.misses += 1
+                SEMANTIC_CACHE_LOOKUPS.inc(result="miss")
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            SEMANTIC_CACHE_LOOKUPS.inc(result="hit")
+            return self._entries[best][1], best_similarity
+
+    def set(self, user_input: UserInput, response: ScamperResponse):
+        """Guarda una respuesta completa (sin técnicas fallidas, caducadas ni parciales)"""
+        if response.partial or any(result.status != ResultStatus.OK or result.stale for result in response.results):
+            return
+        namespace = self._namespace()
+        signature = self._hasher.signature(shingles(user_input.problem, user_input.context))
+        if not signature:
+            return
+        key = (namespace, signature)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), response, words(user_input.problem, user_input.context))
+            for band_key in self._band_keys(namespace, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[tuple, Signature]):
+        del self._entries[key]
+        for band_key in self._band_keys(*key):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "verify_threshold": self.verify_threshold,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def create_semantic_cache() -> SemanticCache:
+    """Crea la caché semántica según la configuración"""
+    return SemanticCache(settings.SEMANTIC_CACHE_THRESHOLD, settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                         settings.CACHE_TTL_SECONDS, verify_threshold=settings.SEMANTIC_CACHE_VERIFY_THRESHOLD)
+
+# Instancia global
+semantic_cache = create_semantic_cache()
@@ -0,0 +1,217 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Un productor recibe `publish` para emitir resultados parciales y retorna el resultado final
+Producer = Callable[[Callable[[Any], None]], Awaitable[Any]]
+
+# Cada cuánto comprueba quien espera que el bucle del líder sigue abierto
+LEADER_CHECK_SECONDS = 0.5
+
+class FlightAborted(Exception):
+    """La llamada compartida se canceló (p. ej. se cerró el bucle de quien la lanzó)"""
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+class _Flight:
+    """Una llamada en curso compartida por todos los que piden la misma clave"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.task: Optional[asyncio.Task] = None
+        # Resultado final, esperable desde cualquier hilo o bucle de eventos
+        self.future = concurrent.futures.Future()
+        self.items: List[Any] = []
+        self.waiters = 0
+        self.listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes idénticas en una única llamada compartida
+
+    El primero que pide una clave lanza el productor; los demás se unen a esa
+    misma llamada y reciben sus resultados parciales y el resultado final. Si
+    un llamante se cancela, la llamada sigue mientras quede alguien esperando;
+    si el bucle de quien la lanzó se cierra sin terminarla, otro la repite.
+    Es seguro entre hilos y entre bucles de eventos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.aborted = 0
+
+    async def do(self, key: str, producer: Producer) -> Any:
+        """
+        Ejecuta el productor una sola vez por clave entre todas las llamadas concurrentes
+
+        Returns:
+            El resultado final de la llamada compartida
+        """
+        while True:
+            flight = self._join(key, producer)
+            shared = asyncio.wrap_future(flight.future)
+            try:
+                # wait no cancela el futuro compartido al cancelar a un llamante
+                while not shared.done():
+                    await asyncio.wait({shared}, timeout=LEADER_CHECK_SECONDS)
+                    self._check_leader(key, flight)
+                return shared.result()
+            except asyncio.CancelledError:
+                # Nadie leerá ya el resultado de este llamante; se descarta sin avisos
+                shared.add_done_callback(lambda future: future.cancelled() or future.exception())
+                raise
+            except FlightAborted:
+                continue  # Quien la lanzó desapareció: se repite con un nuevo líder
+            finally:
+                self._leave(flight)
+
+    async def stream(self, key: str, producer: Producer) -> AsyncIterator[Any]:
+        """
+        Igual que do(), pero emite cada resultado parcial en cuanto se publica
+
+        Yields:
+            Los elementos publicados por el productor, en orden
+        """
+        loop = asyncio.get_running_loop()
+        emitted = 0  # elementos ya entregados a este llamante
+        while True:
+            flight = self._join(key, producer)
+            index = 0
+            try:
+                while True:
+                    with self._lock:
+                        items = flight.items[index:]
+                        done = flight.future.done()
+                        if not items and not done:
+                            wakeup = loop.create_future()
+                            flight.listeners.append((loop, wakeup))
+                    for item in items:
+                        index += 1
+                        # Si una llamada abortada se repite, no se vuelven a emitir los primeros
+                        if index > emitted:
+                            emitted = index
+                            yield item
+                    if items:
+                        continue
+                    if done:
+                        break
+                    while not wakeup.done():
+                        await asyncio.wait({wakeup}, timeout=LEADER_CHECK_SECONDS)
+                        self._check_leader(key, flight)
+
+                error = flight.future.exception()
+                if isinstance(error, FlightAborted):
+                    continue
+                if error is not None:
+                    raise error
+                return
+            finally:
+                self._leave(flight)
+
+    def _join(self, key: str, producer: Producer) -> _Flight:
+        """Se une a la llamada en curso de la clave o lanza una nueva en el bucle actual"""
+        loop = asyncio.get_running_loop()
+        current = self._flights.get(key)
+        if current is not None:
+            self._check_leader(key, current)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                flight.waiters += 1
+                return flight
+            flight = _Flight(loop)
+            flight.waiters = 1
+            self._flights[key] = flight
+            self.leaders += 1
+        flight.task = loop.create_task(self._run(key, flight, producer))
+        # Una tarea cancelada antes de empezar no llega a ejecutar su propio manejo de la cancelación
+        flight.task.add_done_callback(lambda task: self._abort(key, flight))
+        return flight
+
+    def _leave(self, flight: _Flight):
+        """Quita un llamante; con el último se cancela la llamada si aún no terminó"""
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters > 0 or flight.future.done():
+                return
+            self._discard_locked(flight)
+        try:
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+        except RuntimeError:
+            pass  # El bucle ya se cerró y la tarea con él
+
+    def _discard_locked(self, flight: _Flight):
+        for key, current in list(self._flights.items()):
+            if current is flight:
+                del self._flights[key]
+
+    async def _run(self, key: str, flight: _Flight, producer: Producer):
+        def publish(item):
+            with self._lock:
+                flight.items.append(item)
+                self._notify_locked(flight)
+
+        try:
+            result = await producer(publish)
+        except asyncio.CancelledError:
+            self._abort(key, flight)
+            raise
+        except Exception as e:
+            self._finish(flight, error=e)
+        else:
+            self._finish(flight, result=result)
+
+    def _check_leader(self, key: str, flight: _Flight):
+        """Aborta la llamada si el bucle de quien la lanzó se cerró sin terminarla"""
+        if flight.loop.is_closed():
+            self._abort(key, flight)
+
+    def _abort(self, key: str, flight: _Flight):
+        """Termina con FlightAborted una llamada sin resultado, para que otro llamante la repita"""
+        if self._finish(flight, error=FlightAborted(f"Llamada compartida cancelada: {key}")):
+            with self._lock:
+                self.aborted += 1
+
+    def _finish(self, flight: _Flight, result: Any = None, error: Optional[BaseException] = None) -> bool:
+        """
+        Publica el resultado final de la llamada
+
+        Returns:
+            False si la llamada ya había terminado (p. ej. abortada)
+        """
+        # Las llamadas que lleguen después ya no se unen a esta
+        with self._lock:
+            if flight.future.done():
+                return False
+            self._discard_locked(flight)
+            if error is not None:
+                flight.future.set_exception(error)
+            else:
+                flight.future.set_result(result)
+            self._notify_locked(flight)
+            return True
+
+    def _notify_locked(self, flight: _Flight):
+        listeners, flight.listeners = flight.listeners, []
+        for loop, wakeup in listeners:
+            try:
+                loop.call_soon_threadsafe(_wake, wakeup)
+            except RuntimeError:
+                pass  # El bucle de ese llamante ya se cerró
+
+    def get_stats(self) -> Dict[str, int]:
+        """Llamadas lanzadas, llamadas agrupadas en otra en curso y llamadas abortadas"""
+        with self._lock:
+            return {
+                "upstream_calls": self.leaders,
+                "coalesced": self.coalesced,
+                "aborted": self.aborted,
+                "in_flight": len(self._flights)
+            }
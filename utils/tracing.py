@@ -0,0 +1,425 @@
+"""
+Trazas por petición: un identificador de traza por análisis y un span cronometrado por cada salto
+
+Cada petición web o fila del modo --batch abre una traza, y el orquestador, los
+agentes y el cliente del modelo añaden spans hijos (espera en el planificador,
+llamada al modelo, parseo, validación). Los spans terminados se exportan en un
+hilo aparte, sin bloquear el bucle de eventos, como líneas JSON o por OTLP/HTTP
+a un colector local (SCAMPER_TRACING=jsonl|otlp).
+
+Para ver qué fase dominó las trazas más lentas de un archivo JSONL:
+    python main.py --traces data/traces.jsonl
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager, nullcontext
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from config.settings import settings
+
+# Span activo en la tarea actual; asyncio.create_task copia el contexto, así que
+# los agentes lanzados en paralelo heredan la traza de la petición
+_current_span = contextvars.ContextVar("scamper_current_span", default=None)
+
+# Sin utils.log: ese módulo importa este para añadir la traza a cada mensaje
+logger = logging.getLogger("scamper.tracing")
+
+class Span:
+    """Una operación cronometrada dentro de una traza"""
+
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "attributes",
+                 "start_time", "end_time", "_start", "duration", "status", "error")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self._start = time.perf_counter()
+        self.duration = None
+        self.status = "ok"
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        """Marca el span como fallido con el tipo de error (el `kind` de los LLMError si lo tiene)"""
+        self.status = "error"
+        self.error = str(error) or type(error).__name__
+        self.attributes["error.type"] = getattr(error, "kind", None) or type(error).__name__
+
+    def end(self):
+        """Cierra el span y lo entrega al exportador (solo la primera vez)"""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        self.end_time = self.start_time + int(self.duration * 1e9)
+        self.tracer._finish(self)
+
+    @property
+    def traceparent(self) -> str:
+        """Cabecera W3C traceparent para propagar la traza a otro servicio"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    """Span que no registra nada, para cuando las trazas están desactivadas"""
+
+    trace_id = None
+    span_id = None
+    traceparent = None
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = nullcontext(NOOP_SPAN)
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, span_id) de una cabecera W3C traceparent, o None si no es válida"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2]
+
+class Tracer:
+    """
+    Crea los spans y los exporta en un hilo de fondo
+
+    Sin exportador todas las operaciones son no-ops baratas: los spans ni se crean.
+    """
+
+    def __init__(self, exporter=None, max_queue: int = 10000, batch_size: int = 512):
+        self._exporter = exporter
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._exporter is not None
+
+    def configure(self, exporter):
+        """Cambia el exportador (None desactiva las trazas); los spans pendientes se exportan antes"""
+        self.flush()
+        self._exporter = exporter
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, traceparent: Optional[str] = None, **attributes):
+        """
+        Crea un span sin activarlo; quien lo crea debe llamar a end()
+
+        Args:
+            name: Nombre de la operación
+            parent: Span padre; sin él se abre una traza nueva (o se continúa la de `traceparent`)
+            traceparent: Cabecera W3C de quien llamó, para continuar su traza
+            attributes: Atributos iniciales del span
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is not None and parent.trace_id is not None:
+            return Span(self, name, parent.trace_id, parent.span_id, attributes)
+        remote = parse_traceparent(traceparent)
+        if remote is not None:
+            return Span(self, name, remote[0], remote[1], attributes)
+        return Span(self, name, secrets.token_hex(16), None, attributes)
+
+    def child_span(self, name: str, **attributes):
+        """Span hijo del actual sin activarlo (NOOP_SPAN si no hay una traza en curso); hay que llamar a end()"""
+        parent = self.current_span() if self.enabled else None
+        if parent is None:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    @contextmanager
+    def use_span(self, span) -> Iterator:
+        """Activa un span ya creado durante el bloque (sin cerrarlo)"""
+        if span is NOOP_SPAN:
+            yield span
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    def trace(self, name: str, traceparent: Optional[str] = None, **attributes):
+        """Span activo durante el bloque: hijo del actual o, si no hay, raíz de una traza nueva"""
+        if not self.enabled:
+            return _NOOP_CONTEXT
+        return self._activate(self.start_span(name, parent=self.current_span(), traceparent=traceparent, **attributes))
+
+    def span(self, name: str, **attributes):
+        """Span hijo del actual, activo durante el bloque; no-op si no hay una traza en curso"""
+        parent = self.current_span() if self.enabled else None
+        if parent is None:
+            return _NOOP_CONTEXT  # sin objetos nuevos: este camino está en cada llamada al modelo
+        return self._activate(Span(self, name, parent.trace_id, parent.span_id, attributes))
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[Span]:
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def traced(self, span, iterator: AsyncIterator) -> AsyncIterator:
+        """
+        Recorre un generador asíncrono con `span` activo en cada paso y cierra ambos al terminar
+
+        Un generador no puede mantener un span activo entre un yield y el siguiente
+        (cada paso puede ejecutarse en otro contexto, como en el streaming de Flask),
+        así que se activa de nuevo en cada paso.
+        """
+        if span is NOOP_SPAN:
+            return iterator
+        return self._traced(span, iterator)
+
+    async def _traced(self, span: Span, iterator: AsyncIterator) -> AsyncIterator:
+        try:
+            while True:
+                with self.use_span(span):
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                yield item
+        except GeneratorExit:
+            span.set_attribute("closed_early", True)  # p. ej. el cliente cerró el stream
+            raise
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            with self.use_span(span):
+                await iterator.aclose()
+            span.end()
+
+    def _finish(self, span: Span):
+        """Encola un span terminado para el hilo exportador"""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1  # El colector no da abasto: mejor perder spans que frenar peticiones
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._export_loop, name="tracing-export", daemon=True)
+                    self._thread.start()
+
+    def _export_loop(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            flushes = []
+            while True:
+                if isinstance(item, threading.Event):
+                    flushes.append(item)  # flush(): avisar cuando lo anterior esté exportado
+                else:
+                    batch.append(item)
+                if len(batch) >= self._batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            exporter = self._exporter
+            if batch and exporter is not None:
+                try:
+                    exporter.export(batch)
+                except Exception as e:
+                    logger.warning("⚠️ No se pudieron exportar %d spans: %s", len(batch), e)
+            for event in flushes:
+                event.set()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a que se exporten los spans terminados hasta ahora"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+class JsonlExporter:
+    """Escribe un span por línea, en modo append (varios procesos pueden compartir el archivo)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), ensure_ascii=False) + "\n" for span in spans)
+        # Una sola escritura por lote: las líneas de procesos distintos no se entremezclan
+        with open(self.path, "a", encoding="utf-8") as trace_file:
+            trace_file.write(lines)
+
+class OtlpExporter:
+    """Envía los spans a un colector OpenTelemetry por OTLP/HTTP con codificación JSON"""
+
+    def __init__(self, endpoint: str, service_name: str = "scamper", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        payload = json.dumps(self.encode(spans)).encode("utf-8")
+        request = urllib.request.Request(self.endpoint, data=payload, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"colector OTLP en {self.endpoint} no disponible: {e}") from e
+
+    def encode(self, spans: List[Span]) -> Dict[str, object]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "scamper"},
+                "spans": [_otlp_span(span) for span in spans],
+            }],
+        }]}
+
+def _otlp_attribute(key: str, value) -> Dict[str, object]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+def _otlp_span(span: Span) -> Dict[str, object]:
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items() if value is not None],
+        # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+        "status": {"code": 2, "message": span.error} if span.status == "error" else {"code": 1},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+class InMemoryExporter:
+    """Guarda los spans exportados en una lista (para pruebas)"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+def create_exporter(name: Optional[str] = None):
+    """Exportador configurado en TRACING_EXPORTER (None si las trazas están desactivadas)"""
+    name = (name or settings.TRACING_EXPORTER).lower()
+    if name in ("", "none", "off"):
+        return None
+    if name == "jsonl":
+        return JsonlExporter(settings.TRACING_JSONL_PATH)
+    if name == "otlp":
+        return OtlpExporter(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+    raise ValueError(f"Exportador de trazas desconocido: {name} (usa none, jsonl u otlp)")
+
+# Instancia global
+tracer = Tracer(create_exporter())
+atexit.register(tracer.flush)
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, object]]]:
+    """Spans de un archivo JSONL agrupados por traza"""
+    traces: Dict[str, List[Dict[str, object]]] = {}
+    with open(path, encoding="utf-8") as trace_file:
+        for line in trace_file:
+            if line.strip():
+                span = json.loads(line)
+                traces.setdefault(span["trace_id"], []).append(span)
+    return traces
+
+def format_trace(spans: List[Dict[str, object]]) -> str:
+    """Árbol de spans de una traza con su duración, ordenado por inicio"""
+    children: Dict[Optional[str], List[Dict[str, object]]] = {}
+    span_ids = {span["span_id"] for span in spans}
+    for span in sorted(spans, key=lambda span: span["start_time_unix_nano"]):
+        # Los spans cuyo padre no está en el archivo (p. ej. de otro servicio) cuelgan de la raíz
+        parent = span["parent_id"] if span["parent_id"] in span_ids else None
+        children.setdefault(parent, []).append(span)
+
+    lines = []
+
+    def render(span, depth):
+        attributes = " ".join(f"{key}={value}" for key, value in span["attributes"].items())
+        status = " ❌" if span["status"] == "error" else ""
+        lines.append(f"{'  ' * depth}{span['name']} {span['duration_ms']:.1f} ms{status} {attributes}".rstrip())
+        for child in children.get(span["span_id"], []):
+            render(child, depth + 1)
+
+    for root in children.get(None, []):
+        render(root, 0)
+    return "\n".join(lines)
+
+def slowest_traces(traces: Dict[str, List[Dict[str, object]]], count: int) -> List[List[Dict[str, object]]]:
+    """Las `count` trazas con el span más largo"""
+    def longest(spans):
+        return max(span["duration_ms"] or 0 for span in spans)
+    return sorted(traces.values(), key=longest, reverse=True)[:count]
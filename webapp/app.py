@@ -1,13 +1,25 @@
 import sys
 import os
-from flask import Flask, render_template, request, jsonify
+import asyncio
+from flask import Flask, Response, render_template, request, jsonify
 
 # Add project root to Python path to allow imports from agents, models etc.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from models.schemas import UserInput, ScamperResponse
+from models.schemas import ScamperResponse
 from agents.orchestrator import orchestrator # This assumes orchestrator can be imported
                                           # and has process_user_input method.
+from utils.log import configure_logging
+from utils.loop_monitor import loop_monitor
+from utils.metrics import HTTP_IN_FLIGHT, metrics
+from utils.tracing import tracer
+from webapp.common import (DEADLINE_HEADER, ERROR_MESSAGE, METRICS_CONTENT_TYPE, SSE_HEADERS, TRACEPARENT_HEADER,
+                           admit_request, get_job_status, parse_time_budget, parse_user_input, record_request,
+                           shed_request, start_request_span, logger, stream_scamper_events, submit_job,
+                           trace_headers, track_events)
+
+# Server logging goes through a background writer thread, so log I/O never blocks a request
+configure_logging("server")
 
 app = Flask(__name__)
 
@@ -15,54 +27,123 @@ app = Flask(__name__)
 def index():
     return render_template('index.html')
 
+def iterate_async(async_iterator):
+    """Drives an async iterator from Flask's synchronous streaming response."""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        # Closing the iterator only runs its cleanup; the tasks it started (agents, shared
+        # model calls, scheduler waiters) must be cancelled and run to the end before the loop closes
+        try:
+            loop.run_until_complete(async_iterator.aclose())
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            if tasks:
+                for task in tasks:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
 @app.route('/api/scamper', methods=['POST'])
 async def scamper_api():
+    # Over the admission limits the request is turned away at once instead of queueing behind the others
+    ticket = admit_request()
+    if not ticket.admitted:
+        body, status, headers = shed_request('/api/scamper', ticket, request.get_json(silent=True), allow_job=True)
+        record_request('/api/scamper', status)
+        return jsonify(body), status, headers
+
+    span = start_request_span('/api/scamper', request.headers.get(TRACEPARENT_HEADER))
+    # Each Flask request runs on its own event loop, so the loop monitor (if enabled) watches it per request
+    async with loop_monitor.watch():
+        with ticket, HTTP_IN_FLIGHT.track_inprogress(endpoint='/api/scamper'), tracer.use_span(span):
+            body, status = await run_scamper()
+    span.set_attribute('http.status_code', status)
+    span.end()
+    record_request('/api/scamper', status)
+    return jsonify(body), status, trace_headers(span)
+
+async def run_scamper():
+    """Runs one analysis and returns the JSON body with its HTTP status."""
     try:
         data = request.get_json()
-        if not data or 'problem' not in data:
-            return jsonify({"error": "El campo 'problem' es obligatorio."}), 400
+        try:
+            user_input = parse_user_input(data)
+            time_budget = parse_time_budget(request.headers.get(DEADLINE_HEADER), request.args.get('deadline_ms'))
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
-        problem = data['problem']
-        context = data.get('context') # Context is optional
+        # Call the SCAMPER orchestrator
+        # Techniques still running when the deadline arrives come back as timeouts (partial=true)
+        scamper_result: ScamperResponse = await orchestrator.process_user_input(user_input, time_budget=time_budget)
 
-        if not isinstance(problem, str) or len(problem.strip()) < 5:
-            return jsonify({"error": "El problema debe ser un texto de al menos 5 caracteres."}), 400
-        if context is not None and not isinstance(context, str):
-            return jsonify({"error": "El contexto debe ser un texto."}), 400
+        # Convert Pydantic model to dict for JSON response
+        return scamper_result.model_dump(), 200
 
-        user_input = UserInput(problem=problem.strip(), context=context.strip() if context else None)
+    except Exception as e:
+        logger.exception("Error in /api/scamper: %s", e)
+        return {"error": ERROR_MESSAGE}, 500
 
-        # Call the SCAMPER orchestrator
-        # Assuming process_user_input is an async function as in the chatbot
-        scamper_result: ScamperResponse = await orchestrator.process_user_input(user_input)
+@app.route('/api/scamper/stream', methods=['POST'])
+def scamper_stream_api():
+    try:
+        user_input = parse_user_input(request.get_json(silent=True))
+    except ValueError as e:
+        record_request('/api/scamper/stream', 400)
+        return jsonify({"error": str(e)}), 400
 
-        # Convert Pydantic model to dict for JSON response
-        return jsonify(scamper_result.model_dump())
+    # A shed stream is always a 429: the web UI reads this endpoint and expects events or an error
+    ticket = admit_request()
+    if not ticket.admitted:
+        body, status, headers = shed_request('/api/scamper/stream', ticket, None)
+        record_request('/api/scamper/stream', status)
+        return jsonify(body), status, headers
+
+    record_request('/api/scamper/stream', 200)
+    span = start_request_span('/api/scamper/stream', request.headers.get(TRACEPARENT_HEADER))
+    events = tracer.traced(span, stream_scamper_events(user_input))
+    response = Response(
+        iterate_async(track_events('/api/scamper/stream', events, ticket)),
+        mimetype='text/event-stream',
+        headers={**SSE_HEADERS, **trace_headers(span)}
+    )
+    # A response closed before its first frame never runs the generator's cleanup
+    response.call_on_close(ticket.release)
+    return response
 
+@app.route('/api/jobs', methods=['POST'])
+def create_job_api():
+    try:
+        user_input = parse_user_input(request.get_json(silent=True))
+        body = submit_job(user_input)
+    except ValueError as e:
+        record_request('/api/jobs', 400)
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in /api/scamper: {e}") # Log to server console
-        # Consider more specific error handling for production
-        # return jsonify({"error": "Ocurrió un error procesando tu solicitud."}), 500
-        # Mock response for testing frontend
-        mock_response = {
-            "original_problem": problem,
-            "results": [
-                {
-                    "technique": "substitute",
-                    "ideas": ["Idea de sustitución 1", "Idea de sustitución 2"],
-                    "explanation": "Explicación de sustitución"
-                },
-                {
-                    "technique": "combine",
-                    "ideas": ["Idea de combinación 1", "Idea de combinación 2"],
-                    "explanation": "Explicación de combinación"
-                }
-            ],
-            "summary": "Resumen ejecutivo de prueba"
-        }
-        return jsonify(mock_response)
+        logger.exception("Error in /api/jobs: %s", e)
+        record_request('/api/jobs', 500)
+        return jsonify({"error": ERROR_MESSAGE}), 500
+    # The analysis runs on the background job workers; clients poll status_url
+    record_request('/api/jobs', 202)
+    return jsonify(body), 202, {'Location': body['status_url']}
+
+@app.route('/api/jobs/<job_id>')
+def job_status_api(job_id):
+    body, status = get_job_status(job_id)
+    record_request('/api/jobs/<id>', status)
+    return jsonify(body), status
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 if __name__ == '__main__':
     # Note: For async routes with Flask, 'app.run(debug=True)' is fine for development.
-    # For production, a proper ASGI server (like Hypercorn or Uvicorn with Gunicorn) would be needed.
+    # For production, use the ASGI app in webapp/asgi.py (launcher: webapp/serve.py).
     app.run(debug=True, port=5000) # Using port 5000
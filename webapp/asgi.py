@@ -0,0 +1,156 @@
+import sys
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+# Add project root to Python path to allow imports from agents, models etc.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.orchestrator import orchestrator
+from config.settings import settings
+from interface.jobs import job_workers
+from utils.log import configure_logging
+from utils.loop_monitor import loop_monitor
+from utils.metrics import HTTP_IN_FLIGHT, metrics
+from utils.tracing import tracer
+from webapp.common import (DEADLINE_HEADER, ERROR_MESSAGE, METRICS_CONTENT_TYPE, SSE_HEADERS, TRACEPARENT_HEADER,
+                           admit_request, get_job_status, parse_time_budget, parse_user_input, record_request,
+                           shed_request, start_request_span, logger, stream_scamper_events, submit_job,
+                           trace_headers, track_events)
+
+# Server logging goes through a background writer thread, so log I/O never blocks a request
+configure_logging("server")
+
+# ASGI flavour of webapp/app.py: same routes, templates and JSON contract, but every request
+# runs on the worker's long-lived event loop, so clients, caches and in-flight work can be shared.
+
+WEBAPP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+templates = Environment(
+    loader=FileSystemLoader(os.path.join(WEBAPP_DIR, 'templates')),
+    autoescape=select_autoescape()
+)
+
+def url_for(endpoint, filename=None, **values):
+    """Minimal stand-in for Flask's url_for so the shared templates render unchanged."""
+    if endpoint == 'static':
+        return f"/static/{filename}"
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+templates.globals['url_for'] = url_for
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def index(request):
+    return HTMLResponse(templates.get_template('index.html').render())
+
+async def shed(endpoint, ticket, data, allow_job=False):
+    # Routing to the job queue writes to SQLite, so it runs in a thread
+    body, status, headers = await asyncio.to_thread(shed_request, endpoint, ticket, data, allow_job)
+    record_request(endpoint, status)
+    return JSONResponse(body, status_code=status, headers=headers)
+
+async def scamper_api(request):
+    # Over the admission limits the request is turned away at once instead of queueing behind the others
+    ticket = admit_request()
+    if not ticket.admitted:
+        return await shed('/api/scamper', ticket, await read_json(request), allow_job=True)
+
+    span = start_request_span('/api/scamper', request.headers.get(TRACEPARENT_HEADER))
+    with ticket, HTTP_IN_FLIGHT.track_inprogress(endpoint='/api/scamper'), tracer.use_span(span):
+        response = await run_scamper(request)
+    span.set_attribute('http.status_code', response.status_code)
+    span.end()
+    record_request('/api/scamper', response.status_code)
+    response.headers.update(trace_headers(span))
+    return response
+
+async def run_scamper(request):
+    try:
+        user_input = parse_user_input(await read_json(request))
+        time_budget = parse_time_budget(request.headers.get(DEADLINE_HEADER), request.query_params.get('deadline_ms'))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    try:
+        scamper_result = await orchestrator.process_user_input(user_input, time_budget=time_budget)
+        return JSONResponse(scamper_result.model_dump(mode="json"))
+    except Exception as e:
+        logger.exception("Error in /api/scamper: %s", e)
+        return JSONResponse({"error": ERROR_MESSAGE}, status_code=500)
+
+async def scamper_stream_api(request):
+    try:
+        user_input = parse_user_input(await read_json(request))
+    except ValueError as e:
+        record_request('/api/scamper/stream', 400)
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    # A shed stream is always a 429: the web UI reads this endpoint and expects events or an error
+    ticket = admit_request()
+    if not ticket.admitted:
+        return await shed('/api/scamper/stream', ticket, None)
+
+    record_request('/api/scamper/stream', 200)
+    span = start_request_span('/api/scamper/stream', request.headers.get(TRACEPARENT_HEADER))
+    return StreamingResponse(
+        track_events('/api/scamper/stream', tracer.traced(span, stream_scamper_events(user_input)), ticket),
+        media_type='text/event-stream',
+        headers={**SSE_HEADERS, **trace_headers(span)}
+    )
+
+async def create_job_api(request):
+    try:
+        user_input = parse_user_input(await read_json(request))
+        # SQLite is blocking, so the queue is written from a thread
+        body = await asyncio.to_thread(submit_job, user_input)
+    except ValueError as e:
+        record_request('/api/jobs', 400)
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        logger.exception("Error in /api/jobs: %s", e)
+        record_request('/api/jobs', 500)
+        return JSONResponse({"error": ERROR_MESSAGE}, status_code=500)
+    record_request('/api/jobs', 202)
+    return JSONResponse(body, status_code=202, headers={'Location': body['status_url']})
+
+async def job_status_api(request):
+    body, status = await asyncio.to_thread(get_job_status, request.path_params['job_id'])
+    record_request('/api/jobs/<id>', status)
+    return JSONResponse(body, status_code=status)
+
+async def metrics_endpoint(request):
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@asynccontextmanager
+async def lifespan(app):
+    # The worker's event loop lives as long as the app, so one loop monitor covers every request,
+    # and the job workers drain /api/jobs on that same loop
+    async with loop_monitor.watch():
+        jobs = asyncio.create_task(job_workers.run()) if settings.JOB_WORKERS > 0 else None
+        try:
+            yield
+        finally:
+            if jobs is not None:
+                # Jobs still running go back to the queue for the next start
+                jobs.cancel()
+                await asyncio.gather(jobs, return_exceptions=True)
+
+app = Starlette(lifespan=lifespan, routes=[
+    Route('/', index),
+    Route('/api/scamper', scamper_api, methods=['POST']),
+    Route('/api/scamper/stream', scamper_stream_api, methods=['POST']),
+    Route('/api/jobs', create_job_api, methods=['POST']),
+    Route('/api/jobs/{job_id}', job_status_api),
+    Route('/metrics', metrics_endpoint),
+    Mount('/static', StaticFiles(directory=os.path.join(WEBAPP_DIR, 'static')), name='static'),
+])
@@ -0,0 +1,162 @@
+import json
+
+from config.settings import settings
+from models.schemas import UserInput
+from agents.orchestrator import orchestrator
+from interface.jobs import job_workers
+from utils.admission import admission
+from utils.job_queue import QUEUED, job_store
+from utils.metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_SHED
+from utils.log import get_logger
+from utils.tracing import tracer
+
+logger = get_logger("webapp")
+
+# Shared by the Flask app (webapp/app.py) and the ASGI app (webapp/asgi.py) so both keep the same contract
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+DEADLINE_HEADER = 'X-Deadline-Ms'
+
+# Incoming W3C trace context, and the trace id echoed back so a slow response can be found in the traces
+TRACEPARENT_HEADER = 'traceparent'
+TRACE_ID_HEADER = 'X-Trace-Id'
+
+# Prometheus text exposition format served by /metrics
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def parse_user_input(data):
+    """Validates the request payload and builds a UserInput.
+
+    Raises ValueError with the user-facing message when the payload is invalid.
+    """
+    if not data or 'problem' not in data:
+        raise ValueError("El campo 'problem' es obligatorio.")
+
+    problem = data['problem']
+    context = data.get('context') # Context is optional
+
+    if not isinstance(problem, str) or len(problem.strip()) < 5:
+        raise ValueError("El problema debe ser un texto de al menos 5 caracteres.")
+    if context is not None and not isinstance(context, str):
+        raise ValueError("El contexto debe ser un texto.")
+
+    return UserInput(problem=problem.strip(), context=context.strip() if context else None)
+
+def parse_time_budget(header_value, query_value):
+    """Returns the time budget in seconds from the deadline header or query parameter.
+
+    Both carry milliseconds; the header wins. Falls back to WEB_DEFAULT_DEADLINE_MS
+    (None means no deadline). Raises ValueError with the user-facing message when invalid.
+    """
+    value = header_value if header_value is not None else query_value
+    if value is None:
+        deadline_ms = settings.WEB_DEFAULT_DEADLINE_MS
+    else:
+        try:
+            deadline_ms = float(value)
+        except ValueError:
+            deadline_ms = 0
+        if deadline_ms <= 0:
+            raise ValueError("El plazo debe ser un número positivo de milisegundos.")
+    return deadline_ms / 1000 if deadline_ms else None
+
+ERROR_MESSAGE = "Ocurrió un error procesando tu solicitud."
+JOB_NOT_FOUND_MESSAGE = "Trabajo no encontrado."
+OVERLOADED_MESSAGE = "El servidor está ocupado; inténtalo de nuevo en unos segundos."
+
+def format_sse(event, data):
+    """Formats one Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_scamper_events(user_input):
+    """Yields the SSE frames for one SCAMPER analysis as ideas and techniques complete."""
+    yield format_sse("start", {"original_problem": user_input.problem})
+    try:
+        async for event, payload in orchestrator.stream_user_input(user_input):
+            if event == "idea":
+                technique, idea = payload
+                yield format_sse("idea", {"technique": technique.value, "idea": idea})
+            elif event == "result":
+                yield format_sse("result", payload.model_dump(mode="json"))
+            else:
+                yield format_sse("summary", {"summary": payload})
+        yield format_sse("done", {})
+    except Exception as e:
+        logger.exception("Error in /api/scamper/stream: %s", e)
+        yield format_sse("error", {"error": ERROR_MESSAGE})
+
+def record_request(endpoint, status):
+    """Counts one answered API request in the HTTP metrics."""
+    HTTP_REQUESTS.inc(endpoint=endpoint, status=str(status))
+
+async def track_events(endpoint, events, ticket=None):
+    """Keeps a streamed response counted as in flight (and admitted) until its last frame is sent."""
+    with HTTP_IN_FLIGHT.track_inprogress(endpoint=endpoint):
+        try:
+            async for frame in events:
+                yield frame
+        finally:
+            await events.aclose()
+            if ticket is not None:
+                ticket.release()
+
+def start_request_span(endpoint, traceparent):
+    """Opens the root span of one API request, continuing the caller's trace when it sent one."""
+    return tracer.start_span(f"POST {endpoint}", traceparent=traceparent, endpoint=endpoint)
+
+def trace_headers(span):
+    """Response headers carrying the trace id (none when tracing is off)."""
+    return {TRACE_ID_HEADER: span.trace_id} if span.trace_id else {}
+
+def submit_job(user_input):
+    """Queues one analysis for the background job workers and returns the 202 body.
+
+    Blocking (SQLite): the ASGI app calls it in a thread.
+    """
+    job_id = job_store.enqueue(user_input)
+    # With SCAMPER_JOB_WORKERS=0 jobs wait for a separate `main.py --job-worker` process
+    job_workers.start()
+    job_workers.notify()
+    return {"id": job_id, "status": QUEUED, "status_url": f"/api/jobs/{job_id}"}
+
+def get_job_status(job_id):
+    """Returns the JSON body and HTTP status for GET /api/jobs/<id>.
+
+    Also starts the workers, so a restarted Flask process resumes draining the queue
+    as soon as clients poll. Blocking (SQLite): the ASGI app calls it in a thread.
+    """
+    try:
+        job_workers.start()
+        job = job_store.get(job_id)
+    except Exception as e:
+        logger.exception("Error in /api/jobs: %s", e)
+        return {"error": ERROR_MESSAGE}, 500
+    if job is None:
+        return {"error": JOB_NOT_FOUND_MESSAGE}, 404
+    return job, 200
+
+def admit_request():
+    """Asks admission control for a slot; the caller releases the returned ticket when the analysis ends."""
+    return admission.admit()
+
+def shed_request(endpoint, ticket, data, allow_job=False):
+    """Returns the JSON body, HTTP status and headers for a request admission control turned away.
+
+    With SCAMPER_ADMISSION_OVERFLOW=job (and allow_job, i.e. the plain JSON endpoint) the
+    analysis goes to the job queue as a 202; otherwise, or if queueing fails, it is a quick
+    429 with Retry-After. Blocking (SQLite): the ASGI app calls it in a thread.
+    """
+    if allow_job and settings.ADMISSION_OVERFLOW == "job":
+        try:
+            body = submit_job(parse_user_input(data))
+        except ValueError as e:
+            return {"error": str(e)}, 400, {}
+        except Exception as e:
+            logger.exception("Error queueing shed %s request: %s", endpoint, e)
+        else:
+            HTTP_SHED.inc(endpoint=endpoint, reason=ticket.reason, action="job")
+            return body, 202, {'Location': body['status_url']}
+
+    HTTP_SHED.inc(endpoint=endpoint, reason=ticket.reason, action="rejected")
+    return {"error": OVERLOADED_MESSAGE}, 429, {'Retry-After': str(admission.retry_after)}
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Lanzador de producción de la interfaz web SCAMPER
+
+Sirve la aplicación ASGI (webapp/asgi.py) con uvicorn y varios procesos worker,
+cada uno con su propio bucle de eventos persistente:
+
+    python webapp/serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import os
+import sys
+
+import uvicorn
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor ASGI del Sistema SCAMPER")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz de escucha")
+    parser.add_argument("--port", type=int, default=8000, help="Puerto de escucha")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Número de procesos worker")
+    parser.add_argument("--log-level", default="info", help="Nivel de log de uvicorn")
+    args = parser.parse_args()
+
+    # Los workers importan la aplicación por nombre, así que necesitan la raíz del proyecto en el path
+    sys.path.insert(0, PROJECT_ROOT)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get("PYTHONPATH")]))
+
+    uvicorn.run(
+        "webapp.asgi:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -44,24 +44,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
         try {
-            const response = await fetch('/api/scamper', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ problem: problem.trim(), context: context.trim() }),
-            });
-
-            const data = await response.json(); // Attempt to parse JSON regardless of response.ok
-
-            if (!response.ok) {
-                // Use error message from API if available, otherwise a generic one
-                const errorMsg = data && data.error ? data.error : \`Error del servidor: \${response.status}\`;
-                throw new Error(errorMsg);
+            if (window.ReadableStream && window.TextDecoder) {
+                await streamResults(problem.trim(), context.trim());
+            } else {
+                await fetchResults(problem.trim(), context.trim());
             }
-
-            displayResults(data);
-
         } catch (error) {
             console.error('Error fetching SCAMPER results:', error);
             displayError(error.message || 'No se pudo conectar al servidor o procesar la solicitud.');
@@ -70,10 +57,95 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    async function fetchResults(problem, context) {
+        const response = await fetch('/api/scamper', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ problem: problem, context: context }),
+        });
+
+        const data = await response.json(); // Attempt to parse JSON regardless of response.ok
+
+        if (!response.ok) {
+            // Use error message from API if available, otherwise a generic one
+            const errorMsg = data && data.error ? data.error : `Error del servidor: ${response.status}`;
+            throw new Error(errorMsg);
+        }
+
+        displayResults(data);
+    }
+
+    // Renders each technique card as soon as the server emits it (Server-Sent Events over fetch)
+    async function streamResults(problem, context) {
+        const response = await fetch('/api/scamper/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+            },
+            body: JSON.stringify({ problem: problem, context: context }),
+        });
+
+        if (!response.ok) {
+            const data = await response.json().catch(() => null);
+            const errorMsg = data && data.error ? data.error : `Error del servidor: ${response.status}`;
+            throw new Error(errorMsg);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary = buffer.indexOf('\n\n');
+            while (boundary !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                handleStreamEvent(parseStreamFrame(frame));
+                boundary = buffer.indexOf('\n\n');
+            }
+        }
+    }
+
+    function parseStreamFrame(frame) {
+        let eventName = 'message';
+        const dataLines = [];
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                eventName = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        return { event: eventName, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : {} };
+    }
+
+    function handleStreamEvent({ event, data }) {
+        if (event === 'start') {
+            renderProblem(data.original_problem);
+        } else if (event === 'idea') {
+            appendIdea(data.technique, data.idea);
+        } else if (event === 'result') {
+            renderTechnique(data);
+        } else if (event === 'summary') {
+            renderSummary(data.summary);
+        } else if (event === 'error') {
+            throw new Error(data.error || 'Ocurrió un error procesando tu solicitud.');
+        }
+    }
+
     function displayError(message) {
         scamperOutput.innerHTML = ''; // Clear any partial results
         summarySection.style.display = 'none';
-        errorMessageContainer.innerHTML = \`<p>\${message}</p>\`;
+        errorMessageContainer.innerHTML = `<p>${message}</p>`;
         errorMessageContainer.style.display = 'block';
         resultsSection.scrollIntoView({ behavior: 'smooth' });
     }
@@ -82,63 +154,111 @@ document.addEventListener('DOMContentLoaded', () => {
         scamperOutput.innerHTML = ''; // Clear loading/previous error messages
         errorMessageContainer.style.display = 'none';
 
+        renderProblem(data.original_problem);
+
+        if (data.results && Array.isArray(data.results)) {
+            data.results.forEach(renderTechnique);
+        } else {
+             displayError("La respuesta del servidor no contiene resultados válidos.");
+             return; // Stop further processing if results are not as expected
+        }
+
+        renderSummary(data.summary);
+        resultsSection.scrollIntoView({ behavior: 'smooth' });
+    }
+
+    function renderProblem(originalProblem) {
+        if (!originalProblem) {
+            return;
+        }
+        const problemAnalyzedContainer = document.createElement('div');
+        problemAnalyzedContainer.classList.add('problem-analyzed-container'); // For styling if needed
 
-        if (data.original_problem) {
-            const problemAnalyzedContainer = document.createElement('div');
-            problemAnalyzedContainer.classList.add('problem-analyzed-container'); // For styling if needed
+        const problemTitle = document.createElement('h3');
+        problemTitle.textContent = 'Problema Analizado:';
 
-            const problemTitle = document.createElement('h3');
-            problemTitle.textContent = 'Problema Analizado:';
+        const problemParagraph = document.createElement('p');
+        problemParagraph.textContent = originalProblem;
 
-            const problemParagraph = document.createElement('p');
-            problemParagraph.textContent = data.original_problem;
+        problemAnalyzedContainer.appendChild(problemTitle);
+        problemAnalyzedContainer.appendChild(problemParagraph);
+        scamperOutput.appendChild(problemAnalyzedContainer);
+    }
 
-            problemAnalyzedContainer.appendChild(problemTitle);
-            problemAnalyzedContainer.appendChild(problemParagraph);
-            scamperOutput.appendChild(problemAnalyzedContainer);
+    function getTechniqueName(technique) {
+        // Use .value if technique is an enum-like object, or direct access if it's a string
+        const techniqueKey = (technique && typeof technique === 'string' ? technique.toLowerCase() : technique.value.toLowerCase());
+        return techniqueDisplayNames[techniqueKey] || techniqueKey.toUpperCase();
+    }
+
+    // Returns the card for a technique, creating an empty one the first time
+    function getTechniqueCard(technique) {
+        let techniqueDiv = scamperOutput.querySelector(`.result-technique[data-technique="${technique}"]`);
+        if (!techniqueDiv) {
+            techniqueDiv = document.createElement('div');
+            techniqueDiv.classList.add('result-technique');
+            techniqueDiv.dataset.technique = technique;
+            techniqueDiv.innerHTML = `
+                <h4>${getTechniqueName(technique)}</h4>
+                <p class="explanation"></p>
+                <div class="ideas-section">
+                    <h5>💡 Ideas Generadas:</h5>
+                    <ul class="ideas-list"></ul>
+                </div>
+            `;
+            scamperOutput.appendChild(techniqueDiv);
         }
+        return techniqueDiv;
+    }
 
-        if (data.results && Array.isArray(data.results)) {
-            data.results.forEach(result => {
-                if (result && result.technique && result.explanation && Array.isArray(result.ideas)) {
-                    const techniqueDiv = document.createElement('div');
-                    techniqueDiv.classList.add('result-technique');
-
-                    // Use .value if technique is an enum-like object, or direct access if it's a string
-                    const techniqueKey = (result.technique && typeof result.technique === 'string' ? result.technique.toLowerCase() : result.technique.value.toLowerCase());
-                    const techniqueName = techniqueDisplayNames[techniqueKey] || techniqueKey.toUpperCase();
-
-
-                    let ideasHtml = '<ul class="ideas-list">'; // Added class for styling
-                    result.ideas.forEach(idea => {
-                        ideasHtml += \`<li>\${idea}</li>\`;
-                    });
-                    ideasHtml += '</ul>';
-
-                    techniqueDiv.innerHTML = \`
-                        <h4>\${techniqueName}</h4>
-                        <p class="explanation">\${result.explanation}</p>
-                        <div class="ideas-section">
-                            <h5>💡 Ideas Generadas:</h5>
-                            \${ideasHtml}
-                        </div>
-                    \`;
-                    scamperOutput.appendChild(techniqueDiv);
-                }
-            });
-        } else {
-             displayError("La respuesta del servidor no contiene resultados válidos.");
-             return; // Stop further processing if results are not as expected
+    function appendIdea(technique, idea) {
+        const ideaItem = document.createElement('li');
+        ideaItem.textContent = idea;
+        getTechniqueCard(technique).querySelector('.ideas-list').appendChild(ideaItem);
+    }
+
+    function renderTechnique(result) {
+        if (!(result && result.technique && result.explanation && Array.isArray(result.ideas))) {
+            return;
         }
+        const techniqueKey = typeof result.technique === 'string' ? result.technique : result.technique.value;
+        const techniqueDiv = getTechniqueCard(techniqueKey);
 
+        // The final result replaces any ideas streamed so far
+        techniqueDiv.querySelector('.explanation').textContent = result.explanation;
+        const ideasList = techniqueDiv.querySelector('.ideas-list');
+        ideasList.innerHTML = '';
+        result.ideas.forEach(idea => {
+            const ideaItem = document.createElement('li');
+            ideaItem.textContent = idea;
+            ideasList.appendChild(ideaItem);
+        });
 
-        if (data.summary) {
-            summaryText.textContent = data.summary;
+        // Failed or timed-out techniques carry a typed error instead of ideas
+        const failed = Boolean(result.status) && result.status !== 'ok';
+        techniqueDiv.classList.toggle('technique-failed', failed);
+        if (failed && result.error) {
+            const errorItem = document.createElement('li');
+            errorItem.className = 'technique-error';
+            errorItem.textContent = result.error;
+            ideasList.appendChild(errorItem);
+        }
+
+        // Ideas served from an old cached answer while the model is unavailable
+        if (result.stale) {
+            const staleItem = document.createElement('li');
+            staleItem.className = 'technique-stale';
+            staleItem.textContent = 'El modelo no está disponible: ideas guardadas de una consulta anterior.';
+            ideasList.appendChild(staleItem);
+        }
+    }
+
+    function renderSummary(summary) {
+        if (summary) {
+            summaryText.textContent = summary;
             summarySection.style.display = 'block';
         } else {
             summarySection.style.display = 'none';
         }
-
-        resultsSection.scrollIntoView({ behavior: 'smooth' });
     }
 });